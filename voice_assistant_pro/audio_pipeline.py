@@ -0,0 +1,390 @@
+import math
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import warnings
+from array import array
+from collections import deque, namedtuple
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:  # removed from the stdlib in Python 3.13
+    audioop = None
+
+# one finished phrase of raw PCM, numbered in capture order
+Segment = namedtuple('Segment', 'seq data sample_rate sample_width started')
+
+# recognition outcome for a segment; exactly one of text/error is set
+Transcript = namedtuple('Transcript', 'segment text error elapsed')
+
+_STOP = object()
+
+
+def frame_rms(frame, sample_width):
+    """Root-mean-square energy of a PCM frame (same scale as audioop.rms)."""
+    if audioop is not None:
+        return audioop.rms(frame, sample_width)
+    if sample_width != 2 or not frame:
+        return 0
+    samples = array('h', frame[:len(frame) - len(frame) % 2])
+    return int(math.sqrt(sum(s * s for s in samples) / len(samples))) if samples else 0
+
+
+class RingBuffer:
+    """Bounded frame queue between the capture thread and the segmenter.
+
+    When the consumer falls behind, the oldest frame is overwritten and
+    counted in ``dropped`` so capture itself never blocks. With
+    ``block=True`` (offline sources, which can wait) push waits for room
+    instead and nothing is lost.
+    """
+
+    def __init__(self, capacity, block=False):
+        self.capacity = capacity
+        self.block = block
+        self.dropped = 0
+        self._frames = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._frames)
+
+    def push(self, frame):
+        with self._cond:
+            if self.block:
+                while len(self._frames) == self.capacity and not self._closed:
+                    self._cond.wait()
+            if len(self._frames) == self.capacity:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._cond.notify_all()
+
+    def pop(self, timeout=None):
+        """Return the oldest frame, or None once closed and drained / on timeout."""
+        with self._cond:
+            if not self._frames and not self._closed:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+            frame = self._frames.popleft()
+            if self.block:
+                self._cond.notify_all()
+            return frame
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed and not self._frames
+
+
+class ListenSettings:
+    """Segmentation settings with speech_recognition.Recognizer's defaults.
+
+    Used in place of an ``sr.Recognizer`` when the pipeline runs headless
+    without speech_recognition installed.
+    """
+    energy_threshold = 300
+    dynamic_energy_threshold = True
+    dynamic_energy_adjustment_damping = 0.15
+    dynamic_energy_ratio = 1.5
+    pause_threshold = 0.8
+    phrase_threshold = 0.3
+    non_speaking_duration = 0.5
+
+
+def calibrate(source, settings, duration=1.5):
+    """Set the energy threshold from ``duration`` seconds of background audio.
+
+    Same adjustment as ``sr.Recognizer.adjust_for_ambient_noise`` but works
+    with any source that has ``stream.read``.
+    """
+    seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+    elapsed = 0.0
+    while elapsed < duration:
+        frame = source.stream.read(source.CHUNK)
+        if not frame:
+            break
+        elapsed += seconds_per_chunk
+        energy = frame_rms(frame, source.SAMPLE_WIDTH)
+        damping = settings.dynamic_energy_adjustment_damping ** seconds_per_chunk
+        target = energy * settings.dynamic_energy_ratio
+        settings.energy_threshold = settings.energy_threshold * damping + target * (1 - damping)
+
+
+class RecordedAudioSource:
+    """Replays a WAV or raw PCM file in place of the microphone.
+
+    The file is memory-mapped and served in ``chunk``-frame reads, so large
+    recordings are not loaded into memory. Raw PCM needs ``sample_rate`` and
+    ``sample_width``; WAV files carry their own. Audio must be mono. With
+    ``realtime=True`` reads are paced like a live microphone. Either way
+    the recording can wait, so StreamingListener applies backpressure
+    rather than dropping audio (``offline``).
+    """
+
+    offline = True
+
+    def __init__(self, path, chunk=1024, sample_rate=16000, sample_width=2, realtime=False):
+        self.path = path
+        self.CHUNK = chunk
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.realtime = realtime
+        self.stream = None
+        self._file = None
+        self._map = None
+        self._start = 0
+        self._end = 0
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if self._map[:4] == b'RIFF' and self._map[8:12] == b'WAVE':
+            self._parse_wav()
+        else:
+            self._start, self._end = 0, len(self._map)
+        self.stream = _MappedStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _parse_wav(self):
+        data = self._map
+        pos = 12
+        channels = 1
+        while pos + 8 <= len(data):
+            chunk_id, chunk_size = struct.unpack('<4sI', data[pos:pos + 8])
+            body = pos + 8
+            if chunk_id == b'fmt ':
+                fmt, channels, rate, _, _, bits = struct.unpack('<HHIIHH', data[body:body + 16])
+                if fmt not in (1, 0xFFFE):
+                    raise ValueError(f"{self.path}: only PCM WAV files are supported")
+                self.SAMPLE_RATE = rate
+                self.SAMPLE_WIDTH = bits // 8
+            elif chunk_id == b'data':
+                self._start, self._end = body, min(body + chunk_size, len(data))
+                break
+            pos = body + chunk_size + (chunk_size & 1)
+        if channels != 1:
+            raise ValueError(f"{self.path}: expected a mono recording, got {channels} channels")
+
+
+class _MappedStream:
+    def __init__(self, source):
+        self._source = source
+        self._pos = source._start
+        self._t0 = None
+
+    def read(self, frames):
+        src = self._source
+        if src.realtime:
+            if self._t0 is None:
+                self._t0 = time.monotonic()
+            due = self._t0 + (self._pos - src._start) / (src.SAMPLE_RATE * src.SAMPLE_WIDTH)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        end = min(self._pos + frames * src.SAMPLE_WIDTH, src._end)
+        data = src._map[self._pos:end]
+        self._pos = end
+        return data
+
+
+class StreamingListener:
+    """Producer/consumer audio pipeline over a single open input stream.
+
+    One thread reads fixed-size chunks from ``source`` (an open
+    ``sr.Microphone`` or anything with ``stream.read``, ``CHUNK``,
+    ``SAMPLE_RATE`` and ``SAMPLE_WIDTH``) into a ring buffer. A segmenter
+    thread cuts phrases out of it using the recognizer's energy threshold and
+    pause settings, and ``workers`` recognition threads run ``recognize(segment)``
+    on finished phrases while capture continues. Transcripts are delivered in
+    capture order through ``transcripts()``. An optional ``gate(segment)``
+    (e.g. a vad.VoiceActivityDetector) runs on the segmenter thread, and
+    phrases it rejects never reach ``recognize``.
+
+    A live microphone can not wait, so when a stage falls behind the oldest
+    audio is dropped (and counted). Sources with ``offline = True`` (a
+    replayed recording) are throttled instead: a full ring buffer or phrase
+    queue blocks the stage feeding it and every phrase is recognized.
+    """
+
+    def __init__(self, source, recognizer, recognize, workers=2, ring_seconds=10.0,
+                 max_segments=8, phrase_time_limit=8.0, gate=None):
+        self.source = source
+        self.recognizer = recognizer
+        self.recognize = recognize
+        self.gate = gate
+        self.phrase_time_limit = phrase_time_limit
+        self.chunk = source.CHUNK
+        self.sample_rate = source.SAMPLE_RATE
+        self.sample_width = source.SAMPLE_WIDTH
+        self.seconds_per_chunk = self.chunk / self.sample_rate
+        self.lossless = getattr(source, 'offline', False)
+        self.ring = RingBuffer(max(1, int(ring_seconds / self.seconds_per_chunk)), block=self.lossless)
+        self.segments = queue.Queue(maxsize=max_segments)
+        self.results = queue.Queue()
+        self.counters = {'frames': 0, 'segments': 0, 'gated': 0, 'dropped_segments': 0,
+                         'recognized': 0, 'errors': 0}
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._capture, name='capture', daemon=True),
+                         threading.Thread(target=self._segment, name='segmenter', daemon=True)]
+        self._threads += [threading.Thread(target=self._recognize, name=f'recognizer-{i}', daemon=True)
+                          for i in range(max(1, workers))]
+        self._workers = max(1, workers)
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """Stop capturing; waits for the capture thread so the source can be closed."""
+        self._stop.set()
+        # wakes a capture thread waiting for room in the ring
+        self.ring.close()
+        if self._threads[0].is_alive():
+            self._threads[0].join(timeout)
+
+    def stats(self):
+        """Queue depths and drop counters, for diagnostics."""
+        stats = dict(self.counters)
+        stats.update({
+            'ring_depth': len(self.ring),
+            'ring_capacity': self.ring.capacity,
+            'dropped_frames': self.ring.dropped,
+            'segment_queue': self.segments.qsize(),
+            'transcript_queue': self.results.qsize(),
+        })
+        return stats
+
+    def transcripts(self):
+        """Yield Transcripts in capture order until the pipeline stops."""
+        pending = {}
+        next_seq = 0
+        finished = 0
+        while finished < self._workers:
+            item = self.results.get()
+            if item is _STOP:
+                finished += 1
+                continue
+            pending[item.segment.seq] = item
+            while next_seq in pending:
+                yield pending.pop(next_seq)
+                next_seq += 1
+
+    def _capture(self):
+        stream = self.source.stream
+        try:
+            while not self._stop.is_set():
+                frame = stream.read(self.chunk)
+                if not frame:
+                    break
+                self.counters['frames'] += 1
+                self.ring.push(frame)
+        except Exception as e:
+            print(f"[Error] audio capture stopped: {e}")
+        finally:
+            self.ring.close()
+
+    def _segment(self):
+        r = self.recognizer
+        spc = self.seconds_per_chunk
+        pause_chunks = int(math.ceil(r.pause_threshold / spc))
+        min_phrase_chunks = int(math.ceil(r.phrase_threshold / spc))
+        max_chunks = int(math.ceil(self.phrase_time_limit / spc)) if self.phrase_time_limit else None
+        preroll = deque(maxlen=max(1, int(math.ceil(r.non_speaking_duration / spc))))
+        frames = []
+        speech = silent = 0
+        seq = 0
+        started = None
+        while True:
+            frame = self.ring.pop(timeout=0.5)
+            if frame is None:
+                if self.ring.closed or self._stop.is_set():
+                    break
+                continue
+            energy = frame_rms(frame, self.sample_width)
+            loud = energy > r.energy_threshold
+            if not frames:
+                if not loud:
+                    # adapt the threshold to background noise between phrases
+                    if r.dynamic_energy_threshold:
+                        damping = r.dynamic_energy_adjustment_damping ** spc
+                        target = energy * r.dynamic_energy_ratio
+                        r.energy_threshold = r.energy_threshold * damping + target * (1 - damping)
+                    preroll.append(frame)
+                    continue
+                frames.extend(preroll)
+                preroll.clear()
+                started = time.time()
+                speech = silent = 0
+            frames.append(frame)
+            if loud:
+                speech += 1
+                silent = 0
+            else:
+                silent += 1
+            if silent > pause_chunks or (max_chunks and len(frames) >= max_chunks):
+                if speech >= min_phrase_chunks and self._emit(seq, frames, started):
+                    seq += 1
+                frames = []
+        if frames and speech >= min_phrase_chunks:
+            self._emit(seq, frames, started)
+        for _ in range(self._workers):
+            self.segments.put(_STOP)
+
+    def _emit(self, seq, frames, started):
+        # sequence numbers are only consumed by queued segments, so the
+        # transcript reordering never waits on a dropped one
+        self.counters['segments'] += 1
+        segment = Segment(seq, b''.join(frames), self.sample_rate, self.sample_width, started)
+        if self.gate is not None:
+            try:
+                if not self.gate(segment):
+                    self.counters['gated'] += 1
+                    return False
+            except Exception as e:
+                print(f"[Warning] speech gate failed, recognizing anyway: {e}")
+        while True:
+            try:
+                if not self.lossless:
+                    self.segments.put_nowait(segment)
+                else:
+                    self.segments.put(segment, timeout=0.5)
+                return True
+            except queue.Full:
+                if not self.lossless or self._stop.is_set():
+                    self.counters['dropped_segments'] += 1
+                    return False
+
+    def _recognize(self):
+        while True:
+            segment = self.segments.get()
+            if segment is _STOP:
+                self.results.put(_STOP)
+                return
+            start = time.perf_counter()
+            try:
+                text = self.recognize(segment)
+                error = None
+                self.counters['recognized'] += 1
+            except Exception as e:
+                text, error = None, e
+                self.counters['errors'] += 1
+            self.results.put(Transcript(segment, text, error, time.perf_counter() - start))
@@ -0,0 +1,144 @@
+"""Headless batch mode: replay transcript files through VoiceAgent.
+
+Reads plain text (one command per line) or JSONL (objects with a "text"
+field; any "id" is passed through) from a file or stdin and writes one JSON
+result per input line. Input is processed in chunks across a process pool,
+each worker holding its own VoiceAgent, and results keep the input order.
+
+    python batch.py commands.jsonl --dry-run -o results.jsonl
+    cat commands.txt | python batch.py - --dry-run --workers 8
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+
+from main import VoiceAgent
+
+_agent = None
+_dry_run = True
+
+
+def _init_worker(dry_run):
+    global _agent, _dry_run
+    _dry_run = dry_run
+    # skills print as they load and run; keep that out of the result stream
+    with contextlib.redirect_stdout(io.StringIO()):
+        _agent = VoiceAgent()
+
+
+def parse_line(lineno, line):
+    """Return (lineno, id, text) for a plain or JSONL input line, or None."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return lineno, None, line
+        return lineno, record.get('id'), str(record.get('text') or '')
+    return lineno, None, line
+
+
+def process_record(record):
+    lineno, rid, text = record
+    result = {'line': lineno, 'text': text}
+    if rid is not None:
+        result['id'] = rid
+    start = time.perf_counter()
+    try:
+        resolved = _agent.resolve(text)
+        result.update(resolved or {'skill': None, 'phrase': None, 'slots': None})
+        if not _dry_run and resolved is not None:
+            result['result'] = _agent.handle_voice_command(text)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['elapsed_us'] = round((time.perf_counter() - start) * 1e6, 1)
+    return result
+
+
+def process_chunk(records):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [process_record(r) for r in records]
+
+
+def chunked(records, size):
+    it = iter(records)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_records(stream):
+    for lineno, line in enumerate(stream, 1):
+        record = parse_line(lineno, line)
+        if record is not None:
+            yield record
+
+
+def run(stream, out, workers, chunk_size, dry_run):
+    """Process every record from stream, writing JSON lines to out. Returns a summary."""
+    chunks = chunked(read_records(stream), chunk_size)
+    counts = Counter()
+    start = time.perf_counter()
+    if workers <= 1:
+        _init_worker(dry_run)
+        results = map(process_chunk, chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(dry_run,))
+        # imap keeps chunk order while up to `workers` chunks run at once
+        results = pool.imap(process_chunk, chunks)
+    try:
+        for chunk in results:
+            for result in chunk:
+                counts[result.get('skill') or ('error' if 'error' in result else 'no_match')] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    return {'commands': total, 'seconds': elapsed,
+            'per_second': total / elapsed if elapsed else 0.0, 'by_skill': dict(counts)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay transcripts through the Tanu skill dispatcher")
+    parser.add_argument('input', help="transcript file (text or JSONL), or - for stdin")
+    parser.add_argument('-o', '--output', help="write JSONL results here (default: stdout)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="resolve skill and slots only; do not run any skill")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help="commands sent to a worker at a time (default: 2000)")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = run(stream, out, args.workers, args.chunk_size, args.dry_run)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"[Batch] {summary['commands']} commands in {summary['seconds']:.2f}s "
+          f"({summary['per_second']:.0f}/s)", file=sys.stderr)
+    for skill, n in sorted(summary['by_skill'].items(), key=lambda kv: -kv[1]):
+        print(f"  {skill}: {n}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Cold-start time of main.py, from process launch to ready-to-listen.
+
+Launches ``main.py --startup-only`` in a fresh interpreter per run, once
+per startup mode, and reports the wall time together with the stage
+breakdown main.py records (imports, skill registration, time to ready).
+Runs replay a second of silence through the stub recognizer, so no
+microphone or network is needed; microphone calibration (1.5 s, skipped
+by --fast-start once saved) is therefore not part of the numbers.
+
+    python benchmarks/bench_cold_start.py --json cold_start.json
+    python benchmarks/bench_cold_start.py --compare cold_start.json   # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(os.path.dirname(BENCH_DIR), 'main.py')
+
+MODES = {
+    'default': [],
+    'lazy': ['--lazy'],
+    'fast_start': ['--fast-start'],
+}
+
+
+def write_silence(path, seconds=1.0, rate=16000):
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b'\0\0' * int(seconds * rate))
+
+
+def run_once(flags, audio, metrics_path, recognizer):
+    cmd = [sys.executable, MAIN, '--startup-only', '--recognizer', recognizer,
+           '--audio-file', audio, '--metrics-json', metrics_path] + flags
+    env = dict(os.environ, TANU_WHATSAPP_QUEUE='', TANU_OUTBOX='')
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+    wall = time.perf_counter() - start
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        stages = json.load(f)['collectors'].get('startup', {})
+    return dict(stages, wall=wall)
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def run(runs, recognizer):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        audio = os.path.join(tmp, 'silence.wav')
+        metrics_path = os.path.join(tmp, 'metrics.json')
+        write_silence(audio)
+        for mode, flags in MODES.items():
+            # one untimed run writes the skill registry and warms the page cache
+            run_once(flags, audio, metrics_path, recognizer)
+            samples = [run_once(flags, audio, metrics_path, recognizer) for _ in range(runs)]
+            keys = sorted({k for s in samples for k in s})
+            results[mode] = {k: median([s[k] for s in samples if k in s]) * 1e3 for k in keys}
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """Return the modes whose median wall time regressed by more than threshold x."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['modes']
+    regressions = []
+    for mode, stats in results.items():
+        old = baseline.get(mode)
+        if old and old['wall'] > 0 and stats['wall'] > old['wall'] * threshold:
+            regressions.append((mode, old['wall'], stats['wall']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.py cold start")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--recognizer', default='stub',
+                        help="recognizer to start with; a speech_recognition engine adds its import")
+    parser.add_argument('--json', metavar='PATH', help="write machine-readable results here")
+    parser.add_argument('--compare', metavar='BASELINE', help="fail if wall time regressed vs this results file")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="allowed slowdown factor for --compare (default: 1.25)")
+    args = parser.parse_args()
+
+    modes = run(args.runs, args.recognizer)
+    columns = ['wall', 'imports', 'skill registration', 'total']
+    print(f"{'mode':<12} " + ' '.join(f"{c + ' ms':>24}" for c in columns))
+    for mode, stats in modes.items():
+        print(f"{mode:<12} " + ' '.join(f"{stats.get(c, 0.0):>24.1f}" for c in columns))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'runs': args.runs,
+                'recognizer': args.recognizer,
+                'modes': modes,
+            }, f, indent=2)
+
+    if args.compare:
+        regressions = compare(modes, args.compare, args.threshold)
+        for mode, old, new in regressions:
+            print(f"[Regression] {mode}: {old:.1f}ms -> {new:.1f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Fuzzy name lookup latency of the contacts store at address-book scale.
+
+Builds a throwaway database of synthetic contacts, then times exact and
+mangled-name lookups (dropped letters, words run together, first name only).
+
+Run from the voice_assistant_pro folder:
+    python benchmarks/bench_contacts.py --contacts 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skills._contacts import ContactStore
+
+SYLLABLES = ['ka', 'ri', 'to', 'mo', 'na', 'le', 'vi', 'sa', 'du', 'pe', 'ro', 'ta', 'mi',
+             'zu', 'ha', 'be', 'no', 'an', 'el', 'jo', 'shi', 'ra', 'ku', 'de', 'li', 'su']
+
+
+def make_name(rng):
+    word = lambda: ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+    return ' '.join(word() for _ in range(rng.randint(2, 3)))
+
+
+KINDS = ('exact', 'dropped letter', 'run together', 'first name only')
+
+
+def mangle(name, rng):
+    """(kind, spoken) for one way a recognizer may return a name."""
+    words = name.lower().split()
+    kind = rng.choice(KINDS)
+    if kind == 'exact':
+        return kind, name
+    if kind == 'dropped letter':
+        i = rng.randrange(len(words))
+        w = words[i]
+        if len(w) > 3:
+            j = rng.randrange(1, len(w))
+            words[i] = w[:j - 1] + w[j:]
+        return kind, ' '.join(words)
+    if kind == 'run together':
+        return kind, ''.join(words[:2])
+    return kind, words[0]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+    return pick(0.50), pick(0.95), pick(0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    names = list({make_name(rng) for _ in range(args.contacts)})
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ContactStore(os.path.join(tmp, 'contacts.db'))
+        start = time.perf_counter()
+        store.add_many((n, f"+91{rng.randint(10 ** 9, 10 ** 10 - 1)}", '') for n in names)
+        print(f"imported {len(store)} contacts in {time.perf_counter() - start:.1f}s")
+
+        samples, by_kind = [], {kind: [] for kind in KINDS}
+        tried, correct = Counter(), Counter()
+        for _ in range(args.lookups):
+            name = rng.choice(names)
+            kind, spoken = mangle(name, rng)
+            t = time.perf_counter()
+            match = store.resolve(spoken, field='phone')
+            samples.append(time.perf_counter() - t)
+            by_kind[kind].append(samples[-1])
+            tried[kind] += 1
+            # only the contact the name was made from counts
+            if match and match['name'] == name:
+                correct[kind] += 1
+        store.close()
+    p50, p95, p99 = percentiles(samples)
+    print(f"lookup  p50 {p50:.0f} us  p95 {p95:.0f} us  p99 {p99:.0f} us")
+    print(f"resolved to the expected contact: {sum(correct.values())}/{args.lookups}")
+    for kind in KINDS:
+        p50, p95, _ = percentiles(by_kind[kind] or [0.0])
+        print(f"  {kind:<16} {correct[kind]:>5}/{tried[kind]:<5}  p50 {p50:5.0f} us  p95 {p95:5.0f} us")
+    print("(a first name alone is usually shared by several contacts, so at most one of them can be right)")
+
+
+if __name__ == '__main__':
+    main()
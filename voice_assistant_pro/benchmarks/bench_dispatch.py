@@ -0,0 +1,224 @@
+"""End-to-end benchmark of the VoiceAgent command dispatch path.
+
+Runs a corpus of transcripts through VoiceAgent.handle_voice_command with
+every side effect (subprocess.Popen, webbrowser.open, pywhatkit, smtplib)
+replaced by recording stubs, and reports p50/p95/p99 latency for phrase
+matching, slot extraction and total dispatch, plus load_skills startup time.
+
+    python benchmarks/bench_dispatch.py --json results.json
+    python benchmarks/bench_dispatch.py --compare results.json   # exit 1 on regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import types
+import webbrowser
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, 'corpus.txt')
+
+# per-skill slot extraction entry points (skills without one report no slot stage)
+SLOT_EXTRACTORS = {
+    'email_sender': 'extract_email_details',
+    'whatsapp_message': 'extract_contact_and_message',
+    'youtube_player': 'extract_query',
+}
+
+
+class SideEffects:
+    """Replaces every outward-facing call with a recorder while in use."""
+
+    def __init__(self):
+        self.calls = []
+        self._saved = []
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        for obj, attr, value in reversed(self._saved):
+            setattr(obj, attr, value)
+        self._saved = []
+
+    def patch(self, obj, attr, value):
+        self._saved.append((obj, attr, getattr(obj, attr)))
+        setattr(obj, attr, value)
+
+    def record(self, kind):
+        def stub(*args, **kwargs):
+            self.calls.append((kind, args))
+            return True
+        return stub
+
+    def install(self):
+        effects = self
+
+        class RecordingPopen:
+            def __init__(self, args, *a, **kw):
+                effects.calls.append(('subprocess.Popen', (args,)))
+
+        class RecordingSMTP:
+            def __init__(self, host='', port=0, *a, **kw):
+                effects.calls.append(('smtplib.SMTP', (host, port)))
+
+            def starttls(self, *a, **kw):
+                return 220, b'ready'
+
+            def login(self, user, password):
+                return 235, b'ok'
+
+            def sendmail(self, from_addr, to_addrs, msg, *a, **kw):
+                effects.calls.append(('smtplib.sendmail', (from_addr, to_addrs)))
+                return {}
+
+            def noop(self):
+                return 250, b'ok'
+
+            def rset(self):
+                return 250, b'ok'
+
+            def quit(self):
+                return 221, b'bye'
+
+            close = quit
+
+        pywhatkit = types.ModuleType('pywhatkit')
+        pywhatkit.sendwhatmsg = self.record('pywhatkit.sendwhatmsg')
+        pywhatkit.sendwhatmsg_instantly = self.record('pywhatkit.sendwhatmsg_instantly')
+
+        def playonyt(query, *args, **kwargs):
+            # returns the video URL like the real lookup, so the YouTube cache stores it
+            effects.calls.append(('pywhatkit.playonyt', (query,)))
+            return f"https://www.youtube.com/watch?v={abs(hash(query)) % 10 ** 11:011d}"
+
+        pywhatkit.playonyt = playonyt
+        # left in place: skills cache the module after their first import
+        sys.modules['pywhatkit'] = pywhatkit
+
+        import smtplib
+        self.patch(smtplib, 'SMTP', RecordingSMTP)
+        self.patch(subprocess, 'Popen', RecordingPopen)
+        self.patch(webbrowser, 'open', self.record('webbrowser.open'))
+        os.environ.setdefault('SENDER_EMAIL', 'bench@example.com')
+        os.environ.setdefault('SENDER_PASSWORD', 'bench')
+        # keep queued WhatsApp deliveries, emails, resolved videos and the
+        # play history in memory, never in the user's .cache/
+        for name in ('TANU_WHATSAPP_QUEUE', 'TANU_OUTBOX', 'TANU_YOUTUBE_CACHE', 'TANU_YOUTUBE_HISTORY'):
+            os.environ[name] = ''
+        # videos are resolved by the playonyt stub above
+        os.environ.pop('TANU_YOUTUBE_RESOLVER', None)
+
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def percentiles(samples):
+    """Nearest-rank p50/p95/p99 in microseconds."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+    return {'p50_us': pick(0.50), 'p95_us': pick(0.95), 'p99_us': pick(0.99),
+            'mean_us': sum(ordered) / len(ordered) * 1e6, 'n': len(ordered)}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(corpus, iterations, startup_runs):
+    # imported after the stubs are installed
+    import main
+    from skill_registry import skill_name
+
+    quiet = io.StringIO()
+    samples = {'startup_eager': [], 'startup_lazy': [], 'phrase_match': [],
+               'slot_extraction': [], 'dispatch': []}
+    with contextlib.redirect_stdout(quiet):
+        main.VoiceAgent(lazy=True)  # make sure the lazy registry exists
+        for _ in range(startup_runs):
+            samples['startup_eager'].append(timed(main.VoiceAgent))
+            samples['startup_lazy'].append(timed(main.VoiceAgent, True))
+        agent = main.VoiceAgent()
+        for _ in range(iterations):
+            for text in corpus:
+                samples['phrase_match'].append(timed(agent.intent_index.match, text))
+                phrase, skill = agent.intent_index.match(text)
+                extractor = SLOT_EXTRACTORS.get(skill_name(skill)) if skill is not None else None
+                if extractor:
+                    samples['slot_extraction'].append(timed(getattr(skill, extractor), text))
+                samples['dispatch'].append(timed(agent.handle_voice_command, text))
+                quiet.seek(0)
+                quiet.truncate()
+    return {stage: percentiles(values) for stage, values in samples.items()}
+
+
+def compare(results, baseline_path, threshold):
+    """Return the stages whose p95 regressed by more than threshold x."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['stages']
+    regressions = []
+    for stage, stats in results.items():
+        old = baseline.get(stage)
+        if stats and old and old['p95_us'] > 0 and stats['p95_us'] > old['p95_us'] * threshold:
+            regressions.append((stage, old['p95_us'], stats['p95_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VoiceAgent dispatch path")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--startup-runs', type=int, default=10)
+    parser.add_argument('--json', metavar='PATH', help="write machine-readable results here")
+    parser.add_argument('--compare', metavar='BASELINE', help="fail if p95 regressed vs this results file")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="allowed p95 slowdown factor for --compare (default: 1.25)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    with SideEffects() as effects:
+        stages = run(corpus, args.iterations, args.startup_runs)
+
+    print(f"{'stage':<16} {'n':>6} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}")
+    for stage, stats in stages.items():
+        if stats:
+            print(f"{stage:<16} {stats['n']:>6} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f} {stats['p99_us']:>10.1f}")
+    kinds = sorted({kind for kind, _ in effects.calls})
+    print(f"side effects recorded: {len(effects.calls)} ({', '.join(kinds)})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'corpus': os.path.basename(args.corpus),
+                'utterances': len(corpus),
+                'iterations': args.iterations,
+                'stages': stages,
+            }, f, indent=2)
+
+    if args.compare:
+        regressions = compare(stages, args.compare, args.threshold)
+        for stage, old, new in regressions:
+            print(f"[Regression] {stage}: p95 {old:.1f}us -> {new:.1f}us")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Latency of fuzzy intent scoring as the number of phrases grows.
+
+Scores misheard utterances against synthetic phrase sets with the NumPy
+path and the pure-Python fallback used when NumPy is missing.
+
+Run from the voice_assistant_pro folder:
+    python benchmarks/bench_fuzzy_intent.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_intent import FuzzyIntentIndex
+from skills import _numpy
+
+WORDS = [
+    'open', 'launch', 'play', 'send', 'search', 'email', 'message', 'song', 'video',
+    'weather', 'chrome', 'notes', 'timer', 'alarm', 'light', 'kitchen', 'music', 'call',
+    'whatsapp', 'youtube', 'calendar', 'reminder', 'spotify', 'thermostat', 'garage',
+]
+UTTERANCES = [
+    "what's app send to +1234567890 see you at eight",
+    'send e-mail to user@example.com subject meeting message see you tomorrow',
+    'you tube lofi hip hop radio',
+    'wiki pedia alan turing',
+    'turn on the kitchen lites and set a timer for ten minutes',
+    'this sentence matches nothing at all',
+]
+
+
+def make_phrases(count, seed=7):
+    rng = random.Random(seed)
+    phrases = set()
+    while len(phrases) < count:
+        phrases.add(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + f" {rng.randint(0, count)}")
+    return sorted(phrases)
+
+
+def bench(phrases, repeat):
+    index = FuzzyIntentIndex()
+    for i, phrase in enumerate(phrases):
+        index.add(phrase, i)
+    start = time.perf_counter()
+    index.build()
+    build = time.perf_counter() - start
+    samples = []
+    for _ in range(repeat):
+        for text in UTTERANCES:
+            start = time.perf_counter()
+            index.match(text)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+    return build, samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    numpy = _numpy.load_numpy()
+    print(f"{'phrases':>8} {'backend':>8} {'build ms':>9} {'p50 us':>9} {'p99 us':>9}")
+    for count in (100, 1000, 5000, 20000):
+        phrases = make_phrases(count)
+        for name, np in (('numpy', numpy), ('python', None)):
+            if name == 'numpy' and numpy is None:
+                continue
+            _numpy.np = np
+            build, p50, p99 = bench(phrases, 50 if count <= 5000 else 10)
+            print(f"{count:>8} {name:>8} {build * 1e3:>9.1f} {p50 * 1e6:>9.0f} {p99 * 1e6:>9.0f}")
+    _numpy.np = numpy
+
+
+if __name__ == '__main__':
+    main()
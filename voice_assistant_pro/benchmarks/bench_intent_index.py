@@ -0,0 +1,71 @@
+"""Dispatch latency of the linear phrase scan vs the compiled IntentIndex.
+
+Run from the voice_assistant_pro folder:
+    python benchmarks/bench_intent_index.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_index import IntentIndex
+
+WORDS = [
+    'open', 'launch', 'play', 'send', 'search', 'email', 'message', 'song', 'video',
+    'weather', 'chrome', 'notes', 'timer', 'alarm', 'light', 'kitchen', 'music', 'call',
+]
+UTTERANCES = [
+    'open chrome please',
+    'play song shape of you on youtube',
+    'send whatsapp message to +1234567890 see you at eight',
+    'send email to user@example.com subject meeting message see you tomorrow',
+    'what is the weather like in the kitchen today',
+    'this sentence matches nothing at all',
+]
+
+
+def make_phrases(count, seed=7):
+    rng = random.Random(seed)
+    phrases = set()
+    while len(phrases) < count:
+        n = rng.randint(2, 4)
+        phrases.add(' '.join(rng.choice(WORDS) + str(rng.randint(0, count)) for _ in range(n)))
+    return sorted(phrases)
+
+
+def linear_match(phrases, text):
+    text_l = text.lower()
+    for phrase in phrases:
+        if phrase in text_l:
+            return phrase
+    return None
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in UTTERANCES:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(UTTERANCES))
+
+
+def main():
+    print(f"{'phrases':>8} {'build ms':>10} {'linear us':>11} {'index us':>10}")
+    for count in (10, 100, 1000, 10000, 50000):
+        phrases = make_phrases(count)
+        start = time.perf_counter()
+        index = IntentIndex()
+        for phrase in phrases:
+            index.add(phrase, phrase)
+        index.build()
+        build_ms = (time.perf_counter() - start) * 1e3
+        repeat = max(1, 20000 // count)
+        linear_us = time_per_call(lambda t: linear_match(phrases, t), repeat) * 1e6
+        index_us = time_per_call(index.match, 2000) * 1e6
+        print(f"{count:>8} {build_ms:>10.1f} {linear_us:>11.1f} {index_us:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Enqueue latency and drain throughput of the email outbox.
+
+Queues messages into an on-disk outbox (what the email skill does on the
+voice path), then drains them against the local SMTP stand-in with
+several batch sizes, so nothing leaves the machine:
+    python benchmarks/bench_outbox.py --messages 1000 --latency-ms 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_standin import StandInSMTPServer
+from skills._outbox import Outbox, SMTPTransport
+
+SENDER = 'bench@example.com'
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3 for q in (0.50, 0.99)]
+
+
+def run(messages, batch_size, latency):
+    server = StandInSMTPServer(latency=latency).start()
+    transport = SMTPTransport('127.0.0.1', server.port, SENDER, 'secret', starttls=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(transport, os.path.join(tmp, 'outbox.db'), batch_size=batch_size)
+        enqueue = []
+        for i in range(messages):
+            start = time.perf_counter()
+            outbox.enqueue(SENDER, f'user{i}@example.com', 'bench', 'hello from the benchmark')
+            enqueue.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        outbox.run_pending()
+        drain = time.perf_counter() - start
+        stats = outbox.stats()
+        outbox.close()
+    server.stop()
+    return enqueue, drain, stats, server.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=1.0,
+                        help="delay the stand-in adds before every reply")
+    parser.add_argument('--batch-sizes', default='1,10,50')
+    args = parser.parse_args()
+
+    for batch_size in (int(n) for n in args.batch_sizes.split(',')):
+        enqueue, drain, stats, server = run(args.messages, batch_size, args.latency_ms / 1e3)
+        p50, p99 = percentiles(enqueue)
+        print(f"batch {batch_size:<4} enqueue p50 {p50:.3f} ms  p99 {p99:.3f} ms   "
+              f"drain {args.messages / drain:8.1f} msg/s  sent={stats['sent']} failed={stats['failed']} "
+              f"connections={server['connections']}")
+
+
+if __name__ == '__main__':
+    main()
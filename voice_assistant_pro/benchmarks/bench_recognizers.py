@@ -0,0 +1,55 @@
+"""Side-by-side recognition latency of the recognizer backends.
+
+Replays a recording through the capture pipeline once per backend:
+    python benchmarks/bench_recognizers.py recording.wav --backends stub sphinx google
+Backends whose engine is not installed are reported and skipped.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_pipeline import ListenSettings, RecordedAudioSource, StreamingListener
+from recognizers import RecognitionRequestError, make_backend
+
+
+def run(path, backend, workers):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    with RecordedAudioSource(path) as source:
+        pipeline = StreamingListener(source, ListenSettings(), backend.recognize, workers=workers).start()
+        for transcript in pipeline.transcripts():
+            latencies.append(transcript.elapsed)
+            errors += transcript.error is not None
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('audio_file')
+    parser.add_argument('--backends', nargs='+', default=['stub', 'sphinx', 'google'])
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'segments':>8} {'errors':>6} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8} {'wall s':>7}")
+    for name in args.backends:
+        try:
+            backend = make_backend(name, transcripts=['stub transcript'] if name == 'stub' else None)
+        except (ValueError, RecognitionRequestError, AttributeError) as e:
+            print(f"{name:<10} skipped: {e}")
+            continue
+        latencies, errors, wall = run(args.audio_file, backend, args.workers)
+        if not latencies:
+            print(f"{name:<10} no speech segments found")
+            continue
+        ms = [x * 1e3 for x in latencies]
+        print(f"{name:<10} {len(ms):>8} {errors:>6} {statistics.mean(ms):>8.1f} "
+              f"{statistics.median(ms):>8.1f} {max(ms):>8.1f} {wall:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Load test for server.py: commands per second at N concurrent sessions.
+
+Each session connects, then sends corpus transcripts with up to
+``--window`` commands in flight and waits for every reply. Reports
+throughput and per-command round-trip latency for each session count.
+
+    python server.py --dry-run --port 8765 &
+    python benchmarks/bench_server.py --port 8765 --sessions 1,8,64
+
+or let the benchmark start (and stop) a dry-run server itself:
+    python benchmarks/bench_server.py --spawn --json server.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(os.path.dirname(BENCH_DIR), 'server.py')
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, 'corpus.txt')
+
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def percentiles(samples):
+    """Nearest-rank p50/p95/p99 in milliseconds."""
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
+
+
+async def connect(target):
+    if target['unix']:
+        return await asyncio.open_unix_connection(target['unix'], limit=16 * 1024 * 1024)
+    return await asyncio.open_connection(target['host'], target['port'], limit=16 * 1024 * 1024)
+
+
+async def session(target, commands, window, latencies, errors):
+    reader, writer = await connect(target)
+    hello = json.loads(await reader.readline())
+    assert hello.get('type') == 'hello', hello
+    sent = {}
+    slots = asyncio.Semaphore(window)
+
+    async def read_replies():
+        for _ in commands:
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.pop(reply['id']))
+            if not reply.get('ok'):
+                errors.append(reply.get('error'))
+            slots.release()
+
+    receiver = asyncio.create_task(read_replies())
+    for i, text in enumerate(commands):
+        await slots.acquire()
+        sent[i] = time.perf_counter()
+        writer.write((json.dumps({'id': i, 'text': text}) + '\n').encode('utf-8'))
+        await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_level(target, corpus, sessions, per_session, window):
+    latencies, errors = [], []
+    batches = [[corpus[(s + i) % len(corpus)] for i in range(per_session)] for s in range(sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*(session(target, batch, window, latencies, errors) for batch in batches))
+    wall = time.perf_counter() - start
+    return dict(percentiles(latencies), sessions=sessions, commands=len(latencies),
+                errors=len(errors), wall_s=wall, commands_per_s=len(latencies) / wall)
+
+
+def spawn_server(flags):
+    """Start server.py on a free port and return (process, port)."""
+    proc = subprocess.Popen([sys.executable, SERVER, '--port', '0'] + flags,
+                            stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(SERVER))
+    for line in proc.stdout:
+        if line.startswith('[Server] listening on '):
+            port = int(line.split()[3].rsplit(':', 1)[1])
+            return proc, port
+    proc.wait()
+    raise RuntimeError(f"server.py exited with {proc.returncode} before listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Tanu server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="connect to a unix socket instead of TCP")
+    parser.add_argument('--spawn', action='store_true',
+                        help="start a dry-run server.py on a free port for the duration of the run")
+    parser.add_argument('--server-flags', default='--dry-run',
+                        help="flags for the spawned server (default: --dry-run)")
+    parser.add_argument('--sessions', default='1,4,16,64',
+                        help="comma-separated concurrent session counts (default: 1,4,16,64)")
+    parser.add_argument('--commands', type=int, default=200, help="commands per session (default: 200)")
+    parser.add_argument('--window', type=int, default=4,
+                        help="commands a session keeps in flight (default: 4)")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--json', metavar='PATH', help="write machine-readable results here")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    target = {'host': args.host, 'port': args.port, 'unix': args.unix}
+    proc = None
+    if args.spawn:
+        proc, target['port'] = spawn_server(args.server_flags.split())
+        target['unix'] = None
+    try:
+        levels = [asyncio.run(run_level(target, corpus, int(n), args.commands, args.window))
+                  for n in args.sessions.split(',')]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{'sessions':>8} {'commands/s':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for level in levels:
+        print(f"{level['sessions']:>8} {level['commands_per_s']:>12.0f} {level['p50_ms']:>9.2f} "
+              f"{level['p95_ms']:>9.2f} {level['p99_ms']:>9.2f} {level['errors']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'commands_per_session': args.commands,
+                'window': args.window,
+                'levels': levels,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Messages per second with and without the pooled SMTP session manager.
+
+Runs against the local stand-in server, so nothing leaves the machine:
+    python benchmarks/bench_smtp_pool.py --messages 200 --latency-ms 2
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_standin import StandInSMTPServer
+from skills._smtp_pool import SMTPPool
+
+SENDER = 'bench@example.com'
+MESSAGE = 'Subject: bench\r\n\r\nhello from the benchmark\r\n'
+
+
+def per_message(port, count):
+    # what EmailSenderSkill did before pooling: connect, login, send, quit
+    for i in range(count):
+        server = smtplib.SMTP('127.0.0.1', port)
+        server.login(SENDER, 'secret')
+        server.sendmail(SENDER, f'user{i}@example.com', MESSAGE)
+        server.quit()
+
+
+def pooled(port, count):
+    pool = SMTPPool('127.0.0.1', port, SENDER, 'secret', starttls=False)
+    for i in range(count):
+        pool.send(SENDER, f'user{i}@example.com', MESSAGE)
+    pool.close()
+    return pool.stats
+
+
+def pooled_batch(port, count):
+    pool = SMTPPool('127.0.0.1', port, SENDER, 'secret', starttls=False)
+    pool.send_many([(SENDER, f'user{i}@example.com', MESSAGE) for i in range(count)])
+    pool.close()
+    return pool.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=1.0,
+                        help="delay the stand-in adds before every reply")
+    args = parser.parse_args()
+
+    for label, fn in (('per-message connection', per_message),
+                      ('pooled send()', pooled),
+                      ('pooled send_many()', pooled_batch)):
+        server = StandInSMTPServer(latency=args.latency_ms / 1e3).start()
+        start = time.perf_counter()
+        fn(server.port, args.messages)
+        elapsed = time.perf_counter() - start
+        server.stop()
+        print(f"{label:<24} {args.messages / elapsed:8.1f} msg/s  "
+              f"connections={server.stats['connections']} received={server.stats['messages']}")
+
+
+if __name__ == '__main__':
+    main()
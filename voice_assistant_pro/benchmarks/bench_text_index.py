@@ -0,0 +1,77 @@
+"""Build and query cost of the offline search index.
+
+Indexes a synthetic corpus with Zipf-distributed words (so a few terms
+have very long postings, like real text), then times BM25 queries of one
+to three words against the memory-mapped index.
+
+Run from the voice_assistant_pro folder:
+    python benchmarks/bench_text_index.py --documents 200000
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skills._text_index import TextIndex, TextIndexWriter
+
+
+def make_corpus(count, vocabulary, rng):
+    words = [f"term{i}" for i in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(vocabulary)))
+    pick = lambda: words[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+    for i in range(count):
+        yield {'title': f"{pick()} {pick()}", 'text': ' '.join(pick() for _ in range(rng.randint(20, 120))),
+               'url': f"doc://{i}"}
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', type=int, default=200000)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--block-postings', type=int, default=2_000_000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    # generated up front so only indexing is timed
+    corpus = list(make_corpus(args.documents, args.vocabulary, rng))
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'index')
+        start = time.perf_counter()
+        writer = TextIndexWriter(directory, args.block_postings)
+        writer.add_many(corpus)
+        runs = len(writer._runs) + 1
+        writer.close()
+        build = time.perf_counter() - start
+        print(f"indexed {args.documents} docs in {build:.1f}s ({args.documents / build:.0f} docs/s, "
+              f"{runs} blocks), postings {os.path.getsize(os.path.join(directory, 'postings.bin')) / 1e6:.1f} MB, "
+              f"index {folder_size(directory) / 1e6:.1f} MB")
+
+        index = TextIndex(directory)
+        samples = {1: [], 2: [], 3: []}
+        for _ in range(args.queries):
+            for size in samples:
+                # mostly mid-frequency words, as real questions are
+                query = ' '.join(f"term{int(rng.paretovariate(0.6)) % args.vocabulary}" for _ in range(size))
+                t = time.perf_counter()
+                index.search(query, 3)
+                samples[size].append(time.perf_counter() - t)
+        index.close()
+    for size, values in samples.items():
+        values.sort()
+        p50, p95 = values[len(values) // 2], values[int(len(values) * 0.95)]
+        print(f"{size}-word query  p50 {p50 * 1e3:.2f} ms  p95 {p95 * 1e3:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""How many recognizer calls the VAD gate saves, and what it costs per phrase.
+
+Builds a recording of synthetic speech-like phrases (voiced harmonics with
+a syllable-rate envelope) mixed with typical false triggers (clicks, bursts
+of hiss, a steady hum) over room noise, replays it through the capture
+pipeline with and without the gate, and times the gate itself with and
+without NumPy. Real recordings can be checked with ``python vad.py FILE``.
+
+    python benchmarks/bench_vad.py --phrases 40
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vad
+from audio_pipeline import ListenSettings, RecordedAudioSource, StreamingListener
+from skills import _numpy
+
+RATE = 16000
+
+
+def speech(seconds, rng):
+    f0 = rng.uniform(100, 220)
+    syllable = rng.uniform(3.0, 5.0)
+    out = []
+    for i in range(int(seconds * RATE)):
+        t = i / RATE
+        envelope = abs(math.sin(math.pi * syllable * t)) ** 0.7
+        pitch = f0 * (1 + 0.05 * math.sin(2 * math.pi * 0.8 * t))
+        out.append(envelope * sum(math.sin(2 * math.pi * k * pitch * t) / k for k in range(1, 6)) * 0.15)
+    return out
+
+
+def click(seconds, rng):
+    n = int(0.03 * RATE)
+    return [rng.uniform(-0.8, 0.8) * (1 - i / n) for i in range(n)] + [0.0] * int((seconds - 0.03) * RATE)
+
+
+def hiss(seconds, rng):
+    return [rng.gauss(0, 0.15) for _ in range(int(seconds * RATE))]
+
+
+def hum(seconds, rng):
+    return [0.3 * math.sin(2 * math.pi * 100 * i / RATE) for i in range(int(seconds * RATE))]
+
+
+KINDS = {'speech': speech, 'click': click, 'hiss': hiss, 'hum': hum}
+
+
+def make_recording(path, phrases, rng):
+    """Write the WAV; returns the kind of every event in order."""
+    samples, events = [], []
+    noise = lambda seconds: [rng.gauss(0, 0.003) for _ in range(int(seconds * RATE))]
+    samples += noise(2.0)
+    for _ in range(phrases):
+        kind = rng.choice(['speech', 'speech', 'click', 'hiss', 'hum'])
+        events.append(kind)
+        clip = KINDS[kind](rng.uniform(1.0, 2.0), rng)
+        samples += [s + rng.gauss(0, 0.003) for s in clip]
+        samples += noise(1.5)
+    pcm = array('h', (max(-32768, min(32767, int(s * 32767))) for s in samples))
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(pcm.tobytes())
+    return events
+
+
+def replay(path, gate):
+    segments = []
+    with RecordedAudioSource(path) as source:
+        pipeline = StreamingListener(source, ListenSettings(), segments.append, workers=1, gate=gate).start()
+        for _ in pipeline.transcripts():
+            pass
+    return pipeline.stats(), segments
+
+
+def time_gate(segments, repeat):
+    detector = vad.VoiceActivityDetector()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for segment in segments:
+            detector.classify(segment.data, segment.sample_rate, segment.sample_width)
+    return (time.perf_counter() - start) / (repeat * len(segments))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--phrases', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mixed.wav')
+        events = make_recording(path, args.phrases, rng)
+        ungated, segments = replay(path, None)
+        detector = vad.VoiceActivityDetector()
+        gated, _ = replay(path, detector)
+
+    print(f"events: {args.phrases} ({events.count('speech')} speech)")
+    print(f"without gate: {ungated['segments']} phrases recognized")
+    print(f"with gate:    {detector.counters['forwarded']} recognized, {detector.counters['gated']} dropped "
+          + ' '.join(f"{k[6:]}={v}" for k, v in detector.counters.items() if k.startswith('gated_') and k != 'gated_seconds'))
+    print(f"recognizer calls saved: {ungated['segments'] - detector.counters['forwarded']} "
+          f"({detector.counters['gated_seconds']:.1f}s of audio)")
+
+    if _numpy.load_numpy() is not None:
+        print(f"gate cost per phrase, NumPy:       {time_gate(segments, args.repeat) * 1e3:.3f} ms")
+    numpy, _numpy.np = _numpy.np, None
+    try:
+        print(f"gate cost per phrase, pure Python: {time_gate(segments, 1) * 1e3:.3f} ms")
+    finally:
+        _numpy.np = numpy
+
+
+if __name__ == '__main__':
+    main()
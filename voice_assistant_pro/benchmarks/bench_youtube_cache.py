@@ -0,0 +1,84 @@
+"""Per-play latency of "play X" with and without the YouTube resolution cache.
+
+Replays a stream of play requests where a few favourites come back often
+(Zipf-distributed over a catalogue of queries) against a stand-in resolver
+that sleeps like the YouTube results-page fetch, so nothing leaves the
+machine. Runs cold, then again after restarting from the saved cache, and
+once more after pre-warming from the recorded play history:
+    python benchmarks/bench_youtube_cache.py --plays 300 --latency-ms 800
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skills._video_cache import VideoCache
+
+
+def stand_in(latency):
+    def resolve(query):
+        time.sleep(latency)
+        return f"https://www.youtube.com/watch?v={abs(hash(query)) % 10 ** 11:011d}"
+    return resolve
+
+
+def requests(plays, catalogue, skew, rng):
+    weights = [1 / (rank + 1) ** skew for rank in range(catalogue)]
+    songs = [f"song number {n}" for n in range(catalogue)]
+    # spoken with varying case, as the recognizer returns it
+    return [rng.choice([q, q.title(), q.upper()]) for q in rng.choices(songs, weights, k=plays)]
+
+
+def replay(cache, stream):
+    total = 0.0
+    for query in stream:
+        cache.record(query)
+        start = time.perf_counter()
+        cache.resolve(query)
+        total += time.perf_counter() - start
+    return total / len(stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plays', type=int, default=300)
+    parser.add_argument('--catalogue', type=int, default=200, help="distinct queries")
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent of query popularity")
+    parser.add_argument('--latency-ms', type=float, default=50.0,
+                        help="time the stand-in resolver takes per lookup")
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    resolver = stand_in(args.latency_ms / 1e3)
+    first, second = requests(args.plays, args.catalogue, args.skew, rng), \
+        requests(args.plays, args.catalogue, args.skew, rng)
+    print(f"uncached: {args.latency_ms:8.2f} ms per play (every play looks the video up)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path, history = os.path.join(tmp, 'cache.json'), os.path.join(tmp, 'history.tsv')
+        cache = VideoCache(resolver, path, history)
+        mean = replay(cache, first)
+        print(f"cold:     {mean * 1e3:8.2f} ms per play  hit rate {cache.stats()['hit_rate']:.0%}")
+
+        cache = VideoCache(resolver, path, history)
+        mean = replay(cache, second)
+        print(f"restart:  {mean * 1e3:8.2f} ms per play  hit rate {cache.stats()['hit_rate']:.0%}  "
+              f"({len(cache)} queries loaded from disk)")
+
+        os.remove(path)
+        cache = VideoCache(resolver, path, history)
+        start = time.perf_counter()
+        resolved, _ = cache.warm(top=50)
+        warm = time.perf_counter() - start
+        cache = VideoCache(resolver, path, history)
+        mean = replay(cache, second)
+        print(f"warmed:   {mean * 1e3:8.2f} ms per play  hit rate {cache.stats()['hit_rate']:.0%}  "
+              f"(top {resolved} queries resolved ahead in {warm:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
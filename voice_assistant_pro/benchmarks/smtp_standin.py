@@ -0,0 +1,88 @@
+"""Minimal local SMTP server used as a stand-in for benchmarks.
+
+Speaks just enough ESMTP for smtplib (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), accepts any credentials and counts the messages it
+receives. ``latency`` adds a delay before each reply to mimic a remote server.
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.server.stats['connections'] += 1
+        self.reply('220 localhost stand-in ESMTP')
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('ascii', 'replace').rstrip('\r\n')
+            cmd = line[:4].upper()
+            if cmd == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250-AUTH PLAIN LOGIN')
+                self.reply('250 8BITMIME')
+            elif cmd == 'HELO':
+                self.reply('250 localhost')
+            elif cmd == 'AUTH':
+                if line.upper().startswith('AUTH LOGIN'):
+                    # username and password prompts; whatever is sent is accepted
+                    for _ in range(2 - (len(line.split()) > 2)):
+                        self.reply('334 VXNlcm5hbWU6')
+                        self.rfile.readline()
+                self.reply('235 2.7.0 Authentication successful')
+            elif cmd in ('MAIL', 'RCPT', 'RSET'):
+                self.reply('250 OK')
+            elif cmd == 'NOOP':
+                self.server.stats['noops'] += 1
+                self.reply('250 OK')
+            elif cmd == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                self.server.stats['messages'] += 1
+                self.reply('250 OK queued')
+            elif cmd == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.stats = {'connections': 0, 'messages': 0, 'noops': 0}
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = StandInSMTPServer(port=8025)
+    print(f"SMTP stand-in listening on 127.0.0.1:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,235 @@
+"""Compound commands: "open chrome and play song shape of you and search python tutorial".
+
+An utterance is cut at connectors ("and", "then", commas) wherever the
+next part starts with a registered intent phrase, and each part must
+resolve to a skill on its own; otherwise the parts are glued back, so
+"search salt and pepper" or "email a@x.com and b@y.com ..." stay single
+commands. Skills that set ``compound_safe = True`` (they only open or
+queue something) run concurrently with their neighbours, so a plan takes
+as long as its slowest step. Any other skill gets a stage of its own, and
+"then" / "after that" make a step wait for, and be skipped after a failure
+of, the stage before it.
+
+A step of any other skill that has filled one of its ``free_text_slots``
+(an email body, a WhatsApp message) takes the rest of the utterance:
+"email bob subject plans message lets meet and play music together" sends
+the whole sentence rather than playing "together" on YouTube.
+"""
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+from executor import SkillResult
+from metrics import METRICS
+from skill_registry import skill_name
+
+# a connector with the whitespace (and comma) around it
+_CONNECTOR = re.compile(r'\s*,?\s+(?:and\s+then|then|after\s+that|and\s+also|and|also)\s+|\s*[,;]\s+',
+                        re.IGNORECASE)
+_SEQUENTIAL = re.compile(r'\bthen\b|\bafter\s+that\b', re.IGNORECASE)
+
+# text is the part of the utterance the skill handles
+Step = namedtuple('Step', 'skill phrase slots text')
+
+
+def split_candidates(text):
+    """Cut text at every connector: [(connector, part), ...], the first connector ''."""
+    parts = []
+    last, connector = 0, ''
+    for m in _CONNECTOR.finditer(text):
+        if m.start() > last:
+            parts.append((connector, text[last:m.start()]))
+            last, connector = m.end(), m.group()
+    parts.append((connector, text[last:]))
+    return [(c, p) for c, p in parts if p.strip()]
+
+
+def starts_with_phrase(intent_index, text):
+    """True if text begins with a whole registered intent phrase."""
+    text = text.lstrip().lower()
+    for start, end, _ in intent_index.find_all(text):
+        if start == 0 and (end == len(text) or not text[end].isalnum()):
+            return True
+    return False
+
+
+def _usable(resolved):
+    skill, _, slots, _ = resolved
+    return skill is not None and (bool(slots) or not hasattr(skill, 'parse_intent'))
+
+
+def _takes_rest(resolved):
+    # free text of a skill that must run alone: any connector after it is
+    # more likely dictated than a new command
+    skill, _, slots, _ = resolved
+    if not slots or getattr(skill, 'compound_safe', False):
+        return False
+    return any(slots.get(name) for name in getattr(skill, 'free_text_slots', ()))
+
+
+def build_plan(text, intent_index, resolve):
+    """Return a CommandPlan for a compound command, or None for a single one.
+
+    resolve(text) returns (skill, phrase, slots, text) like VoiceAgent._resolve.
+    """
+    parts = split_candidates(text)
+    if len(parts) < 2:
+        return None
+    # glue parts that do not start a new command onto the previous one
+    segments = []
+    for connector, part in parts:
+        if segments and not starts_with_phrase(intent_index, part):
+            segments[-1][1] += connector + part
+        else:
+            segments.append([connector, part])
+    if len(segments) < 2:
+        return None
+
+    resolved = []
+    for connector, part in segments:
+        if resolved and _takes_rest(resolved[-1][2]):
+            prev_connector, prev_text, _ = resolved[-1]
+            merged = resolve(prev_text + connector + part)
+            if _usable(merged):
+                resolved[-1] = (prev_connector, prev_text + connector + part, merged)
+                continue
+        step = resolve(part)
+        if resolved and not _usable(step):
+            # "whatsapp john search the docs and email me": "email me" is not
+            # a command of its own but the end of the message
+            prev_connector, prev_text, _ = resolved[-1]
+            merged = resolve(prev_text + connector + part)
+            if _usable(merged) or step[0] is None:
+                resolved[-1] = (prev_connector, prev_text + connector + part, merged)
+                continue
+        resolved.append((connector, part, step))
+    if len(resolved) < 2 or any(step[0] is None for _, _, step in resolved):
+        return None
+
+    steps, stages = [], []
+    for connector, _, (skill, phrase, slots, part) in resolved:
+        safe = getattr(skill, 'compound_safe', False)
+        after = bool(_SEQUENTIAL.search(connector))
+        if not stages or after or not safe or not stages[-1][2]:
+            # (waits for the previous stage, step indexes, runs concurrently)
+            stages.append((after, [], safe))
+        stages[-1][1].append(len(steps))
+        steps.append(Step(skill, phrase, slots, part.strip()))
+    return CommandPlan(steps, [(after, indexes) for after, indexes, _ in stages])
+
+
+def _failed(outcome):
+    return outcome.error is not None or outcome.result is False
+
+
+class CommandPlan:
+    """Steps of a compound command grouped into stages that run in order.
+
+    ``stages`` is a list of (after, indexes): the steps of a stage run at
+    once; ``after`` stages are skipped when a step of the stage before them
+    failed (raised, timed out or returned False).
+    """
+
+    def __init__(self, steps, stages):
+        self.steps = steps
+        self.stages = stages
+
+    def __len__(self):
+        return len(self.steps)
+
+    def describe(self):
+        """One line per plan: "+" joins concurrent steps, "->" separates stages."""
+        stages = [' + '.join(f"{skill_name(self.steps[i].skill)}({self.steps[i].text})" for i in indexes)
+                  for _, indexes in self.stages]
+        return ' -> '.join(stages)
+
+    def resolved(self):
+        """Per-step {'skill', 'phrase', 'slots', 'text'} dicts, in spoken order."""
+        return [{'skill': skill_name(s.skill), 'phrase': s.phrase, 'slots': s.slots, 'text': s.text}
+                for s in self.steps]
+
+    def run(self, executor=None):
+        """Run the plan.
+
+        With a SkillExecutor, returns a Future of the SkillResults in spoken
+        order, completed when the last stage finishes. Without one the steps
+        run one after another on this thread and their results are returned.
+        """
+        if executor is None:
+            return self._run_inline()
+        done = Future()
+        outcomes = [None] * len(self.steps)
+        lock = threading.Lock()
+
+        def launch(n):
+            while n < len(self.stages):
+                after, indexes = self.stages[n]
+                if not (after and any(_failed(outcomes[i]) for i in self.stages[n - 1][1])):
+                    break
+                for i in indexes:
+                    outcomes[i] = self._skipped(i)
+                n += 1
+            if n == len(self.stages):
+                done.set_result(outcomes)
+                return
+            indexes = self.stages[n][1]
+            left = [len(indexes)]
+
+            def finished(i, future):
+                # a cancelled step counts as failed so the plan still completes
+                outcomes[i] = (self._skipped(i, "the executor shut down") if future.cancelled()
+                               else future.result())
+                with lock:
+                    left[0] -= 1
+                    last = left[0] == 0
+                if last:
+                    launch(n + 1)
+
+            for i in indexes:
+                step = self.steps[i]
+                try:
+                    future = executor.submit(step.skill, step.text, step.slots or None)
+                except RuntimeError:
+                    # the executor's pool was shut down before this stage started
+                    future = Future()
+                    future.cancel()
+                future.add_done_callback(lambda f, i=i: finished(i, f))
+
+        launch(0)
+        return done
+
+    def _run_inline(self):
+        outcomes = [None] * len(self.steps)
+        for n, (after, indexes) in enumerate(self.stages):
+            skip = after and any(_failed(outcomes[i]) for i in self.stages[n - 1][1])
+            for i in indexes:
+                outcomes[i] = self._skipped(i) if skip else self._call(self.steps[i])
+        results = []
+        for outcome in outcomes:
+            if outcome.error is not None:
+                print(f"[Error] skill {outcome.skill}: {outcome.error}")
+            elif outcome.result is not None:
+                print(outcome.result)
+            results.append(outcome.result)
+        return results
+
+    @staticmethod
+    def _call(step):
+        name = skill_name(step.skill)
+        start = time.perf_counter()
+        result = error = None
+        try:
+            if step.slots:
+                result = METRICS.call_skill(name, step.skill.run_intent, step.slots)
+            else:
+                result = METRICS.call_skill(name, step.skill.handle_intent, step.text)
+        except Exception as e:
+            error = e
+        return SkillResult(name, step.text, result, error, False, time.perf_counter() - start)
+
+    def _skipped(self, i, reason="an earlier step failed"):
+        step = self.steps[i]
+        return SkillResult(skill_name(step.skill), step.text, None,
+                           RuntimeError(f"skipped: {reason}"), False, 0.0)
@@ -0,0 +1,180 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import METRICS
+from skill_registry import skill_name
+
+DEFAULT_TIMEOUT = float(os.getenv('TANU_SKILL_TIMEOUT', '60'))
+
+# outcome of one skill call; error is the exception raised (if any)
+SkillResult = namedtuple('SkillResult', 'skill text result error timed_out elapsed')
+
+
+class _Job:
+    __slots__ = ('skill', 'name', 'text', 'slots', 'future', 'timer', 'started', 'lock', 'context')
+
+    def __init__(self, skill, name, text, slots=None):
+        self.skill = skill
+        self.name = name
+        self.text = text
+        self.slots = slots
+        self.future = Future()
+        self.timer = None
+        self.started = None
+        self.lock = threading.Lock()
+        # the submitter's context variables (e.g. where a server session's
+        # output goes) stay visible to the skill on the worker thread
+        self.context = contextvars.copy_context()
+
+
+class SkillExecutor:
+    """Runs skill handlers on a bounded thread pool off the listen loop.
+
+    Each skill may occupy at most ``per_skill_limit`` workers; further calls
+    to that skill wait in a per-skill queue (up to ``max_pending``) instead of
+    in the shared pool, so one slow skill cannot starve the others. A call
+    that outlives its deadline is reported as timed out; Python threads can
+    not be killed, so its worker slot is only released when it returns.
+
+    The deadline is the skill's ``timeout`` attribute if it has one, else
+    ``default_timeout``. ``on_result`` receives a SkillResult for every call,
+    from a worker or timer thread.
+    """
+
+    def __init__(self, max_workers=4, per_skill_limit=2, max_pending=16,
+                 default_timeout=DEFAULT_TIMEOUT, on_result=None):
+        self.per_skill_limit = max(1, per_skill_limit)
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+        self.on_result = on_result
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='skill')
+        self._lock = threading.Lock()
+        self._running = {}
+        self._pending = {}
+
+    def submit(self, skill, text, slots=None):
+        """Queue a skill call and return a Future of its SkillResult.
+
+        With slots the skill runs run_intent(slots) instead of handling text.
+        """
+        job = _Job(skill, skill_name(skill), text, slots)
+        with self._lock:
+            if self._running.get(job.name, 0) < self.per_skill_limit:
+                self._running[job.name] = self._running.get(job.name, 0) + 1
+                start = True
+            else:
+                queue = self._pending.setdefault(job.name, deque())
+                if len(queue) >= self.max_pending:
+                    start = None
+                else:
+                    queue.append(job)
+                    start = False
+        if start is None:
+            self._finish(job, None, RuntimeError(f"skill {job.name} is busy"), False, 0.0)
+        elif start:
+            self._start(job)
+        return job.future
+
+    def stats(self):
+        """Return per-skill running and pending counts."""
+        with self._lock:
+            names = set(self._running) | set(self._pending)
+            return {name: {'running': self._running.get(name, 0),
+                           'pending': len(self._pending.get(name, ()))} for name in names}
+
+    def shutdown(self, wait=False):
+        """Stop taking calls; calls that have not started yet resolve as cancelled."""
+        with self._lock:
+            dropped = [job for queue in self._pending.values() for job in queue]
+            self._pending.clear()
+        for job in dropped:
+            self._cancel(job)
+        # calls already handed to the pool are cancelled there; _start's
+        # callback releases their slots and resolves their futures
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _start(self, job):
+        # the job holds a running slot of its skill
+        try:
+            queued = self._pool.submit(job.context.run, self._run, job)
+        except RuntimeError:
+            # pool already shut down
+            self._release(job.name)
+            self._cancel(job)
+            return
+
+        def dropped(future):
+            # cancelled by shutdown before a worker picked it up
+            if future.cancelled():
+                self._release(job.name)
+                self._cancel(job)
+
+        queued.add_done_callback(dropped)
+
+    def _cancel(self, job):
+        self._finish(job, None, RuntimeError(f"skill {job.name} cancelled: executor shut down"), False, 0.0)
+
+    def _run(self, job):
+        try:
+            timeout = getattr(job.skill, 'timeout', None) or self.default_timeout
+        except Exception:
+            # a lazy skill that fails to import; the call below reports why
+            timeout = self.default_timeout
+        job.started = time.perf_counter()
+        if timeout:
+            job.timer = threading.Timer(timeout, self._expire, (job,))
+            job.timer.daemon = True
+            job.timer.start()
+        result = error = None
+        try:
+            if job.slots is not None:
+                result = METRICS.call_skill(job.name, job.skill.run_intent, job.slots)
+            else:
+                result = METRICS.call_skill(job.name, job.skill.handle_intent, job.text)
+        except Exception as e:
+            error = e
+        finally:
+            if job.timer is not None:
+                job.timer.cancel()
+            self._release(job.name)
+        if not self._finish(job, result, error, False, time.perf_counter() - job.started):
+            print(f"[Warning] skill {job.name} finished after its deadline; result dropped")
+
+    def _expire(self, job):
+        METRICS.count(job.name, 'timeouts')
+        self._finish(job, None, TimeoutError(f"skill {job.name} timed out"), True,
+                     time.perf_counter() - job.started)
+
+    def _finish(self, job, result, error, timed_out, elapsed):
+        # first outcome wins: either the handler returned or the deadline hit
+        with job.lock:
+            if job.future.done():
+                return False
+            outcome = SkillResult(job.name, job.text, result, error, timed_out, elapsed)
+            job.future.set_result(outcome)
+        if self.on_result is not None:
+            try:
+                self.on_result(outcome)
+            except Exception as e:
+                print(f"[Error] result callback raised: {e}")
+        return True
+
+    def _release(self, name):
+        # hand the freed slot straight to the next queued call of the same skill
+        with self._lock:
+            queue = self._pending.get(name)
+            if queue:
+                nxt = queue.popleft()
+                if not queue:
+                    del self._pending[name]
+            else:
+                nxt = None
+                self._running[name] -= 1
+                if not self._running[name]:
+                    del self._running[name]
+        if nxt is not None:
+            self._start(nxt)
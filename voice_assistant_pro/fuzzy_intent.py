@@ -0,0 +1,159 @@
+import re
+from collections import Counter, namedtuple
+
+from skills._numpy import load_numpy
+
+# NumPy, bound from load_numpy() when an index is built
+np = None
+
+FuzzyMatch = namedtuple('FuzzyMatch', 'phrase value score text')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """Lowercase and drop everything but letters and digits, spaces included.
+
+    Recognizers split and punctuate words unpredictably ("what's app",
+    "e-mail"); without separators both sides compare as plain letter runs.
+    """
+    return _NON_ALNUM.sub('', text.lower())
+
+
+class FuzzyIntentIndex:
+    """Character n-gram scoring of an utterance against every intent phrase.
+
+    A phrase scores the fraction of its n-grams that occur anywhere in the
+    normalized utterance. Phrase n-grams are compiled once into an inverted
+    index (n-gram -> phrase ids); scoring is a NumPy bincount over the
+    postings of the utterance's n-grams, scaled by each phrase's n-gram
+    count, so its cost grows with the utterance and not the phrase count.
+    Used when the exact IntentIndex finds nothing. The index is compiled by
+    build(), or on the first scores() call, and is safe to query from
+    several threads meanwhile.
+    """
+
+    def __init__(self, n=3, threshold=0.6):
+        self.n = n
+        self.threshold = threshold
+        self._phrases = []
+        self._values = []
+        self._grams = []
+        self._ids = {}
+        self._built = True
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def _ngrams(self, norm):
+        n = self.n
+        return {norm[i:i + n] for i in range(len(norm) - n + 1)}
+
+    def add(self, phrase, value):
+        """Register a phrase; phrases too short for two n-grams are skipped."""
+        phrase = phrase.lower()
+        grams = self._ngrams(normalize(phrase))
+        if len(grams) < 2:
+            return
+        pid = self._ids.get(phrase)
+        if pid is None:
+            self._ids[phrase] = len(self._phrases)
+            self._phrases.append(phrase)
+            self._values.append(value)
+            self._grams.append(grams)
+            self._built = False
+        else:
+            self._values[pid] = value
+
+    def build(self):
+        """Compile the n-gram -> phrase postings into flat arrays."""
+        global np
+        if self._built:
+            return
+        np = load_numpy()
+        postings = {}
+        for pid, grams in enumerate(self._grams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(pid)
+        gram_ids = {}
+        indptr, indices = [0], []
+        for gram, pids in postings.items():
+            gram_ids[gram] = len(gram_ids)
+            indices.extend(pids)
+            indptr.append(len(indices))
+        if np is not None:
+            self._indptr = np.asarray(indptr, dtype=np.int64)
+            self._indices = np.asarray(indices, dtype=np.int32)
+            self._inv_len = 1.0 / np.asarray([len(g) for g in self._grams], dtype=np.float64)
+            self._lengths = np.asarray([len(p) for p in self._phrases], dtype=np.int32)
+        # published last, so a concurrent scores() never sees half an index
+        self._gram_ids, self._postings = gram_ids, postings
+        self._built = True
+
+    def scores(self, text):
+        """Score of every phrase (in add order) against text."""
+        self.build()
+        grams = self._ngrams(normalize(text))
+        if np is None:
+            counts = Counter(pid for gram in grams for pid in self._postings.get(gram, ()))
+            return [counts[pid] / len(g) for pid, g in enumerate(self._grams)]
+        gids = [self._gram_ids[g] for g in grams if g in self._gram_ids]
+        if not gids:
+            return np.zeros(len(self._phrases))
+        indptr = self._indptr
+        hits = np.concatenate([self._indices[indptr[g]:indptr[g + 1]] for g in gids])
+        return np.bincount(hits, minlength=len(self._phrases)) * self._inv_len
+
+    def rank(self, text, limit=5):
+        """Top (score, phrase, value) candidates, best first; longer phrases win ties."""
+        if not self._phrases:
+            return []
+        scores = self.scores(text)
+        if np is not None:
+            top = np.flatnonzero(scores > 0)
+            order = top[np.lexsort((-self._lengths[top], -scores[top]))].tolist()
+        else:
+            order = sorted((pid for pid, s in enumerate(scores) if s > 0),
+                           key=lambda pid: (-scores[pid], -len(self._phrases[pid])))
+        return [(float(scores[pid]), self._phrases[pid], self._values[pid]) for pid in order[:limit]]
+
+    def match(self, text):
+        """Best candidate at or above the threshold as a FuzzyMatch, or None.
+
+        FuzzyMatch.text is the utterance with the misheard span replaced by
+        the phrase, so the skill's own templates can parse it.
+        """
+        ranked = self.rank(text, 1)
+        if not ranked or ranked[0][0] < self.threshold:
+            return None
+        score, phrase, value = ranked[0]
+        return FuzzyMatch(phrase, value, score, self.correct(text, phrase))
+
+    def correct(self, text, phrase):
+        """Replace the part of text that best matches phrase with phrase itself."""
+        norm_chars, offsets = [], []
+        for i, ch in enumerate(text.lower()):
+            if ch.isascii() and ch.isalnum():
+                norm_chars.append(ch)
+                offsets.append(i)
+        norm = ''.join(norm_chars)
+        grams = self._grams[self._ids[phrase]]
+        n = self.n
+        hits = [i for i in range(len(norm) - n + 1) if norm[i:i + n] in grams]
+        if not hits:
+            return text
+        # densest run of hits no longer than the phrase (plus a little slack)
+        span = len(normalize(phrase)) + 2
+        best, lo = (0, hits[0], hits[0]), 0
+        for hi, end in enumerate(hits):
+            while end - hits[lo] + n > span:
+                lo += 1
+            if hi - lo + 1 > best[0]:
+                best = (hi - lo + 1, hits[lo], end)
+        start, end = offsets[best[1]], offsets[best[2] + n - 1] + 1
+        # widen to whole words: "watsapp" matches from its "a"
+        while start > 0 and text[start - 1].isalnum():
+            start -= 1
+        while end < len(text) and text[end].isalnum():
+            end += 1
+        return text[:start] + phrase + text[end:]
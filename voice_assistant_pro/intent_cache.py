@@ -0,0 +1,60 @@
+import hashlib
+import os
+
+from skills._cache import LRUCache
+
+
+def normalize(text):
+    """Cache key for an utterance: case-folded with whitespace collapsed."""
+    return ' '.join(text.casefold().split())
+
+
+def skills_fingerprint(skill_dir):
+    """Hash of the skill sources' names, sizes and mtimes.
+
+    A persisted cache is only reused when this matches, so editing any skill
+    (or a shared skills/_*.py helper) invalidates it.
+    """
+    h = hashlib.sha1()
+    try:
+        names = sorted(f for f in os.listdir(skill_dir) if f.endswith('.py'))
+    except OSError:
+        return ''
+    for fname in names:
+        st = os.stat(os.path.join(skill_dir, fname))
+        h.update(f"{fname}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+class IntentCache:
+    """Normalized utterance -> (skill name, phrase, parsed slots).
+
+    Sits in front of dispatch so a repeated command skips phrase matching and
+    the skill's slot parsing. Slots keep the casing of the first utterance
+    that produced them. Only commands whose skill could parse them are
+    cached.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600.0, path=None):
+        self._cache = LRUCache(max_size, ttl, path)
+        self.fingerprint = None
+
+    def get(self, text):
+        return self._cache.get(normalize(text))
+
+    def put(self, text, resolved):
+        self._cache.put(normalize(text), resolved)
+
+    def invalidate(self, fingerprint=None):
+        """Drop every entry, e.g. after skills were (re)loaded."""
+        self._cache.clear()
+        self.fingerprint = fingerprint
+
+    def stats(self):
+        return self._cache.stats()
+
+    def load(self):
+        return self._cache.load(self.fingerprint)
+
+    def save(self):
+        self._cache.save(self.fingerprint)
@@ -0,0 +1,104 @@
+from collections import deque
+
+
+class IntentIndex:
+    """Aho-Corasick automaton over intent phrases.
+
+    All phrases are compiled once into a trie with failure links, so a single
+    pass over the utterance reports every phrase occurrence no matter how many
+    phrases are registered.
+    """
+
+    def __init__(self):
+        # node 0 is the root; each node keeps its outgoing edges, its failure
+        # link and the phrases that end at it (own output + failure outputs)
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = {}
+        self._out = [()]
+        self._values = {}
+        self._built = True
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, phrase):
+        return phrase.lower() in self._values
+
+    def add(self, phrase, value):
+        """Register a phrase; a later add of the same phrase replaces its value."""
+        phrase = phrase.lower()
+        if not phrase:
+            return
+        if phrase not in self._values:
+            node = 0
+            for ch in phrase:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._own[node] = phrase
+            self._built = False
+        self._values[phrase] = value
+
+    def build(self):
+        """Compute failure links breadth-first and merge output sets."""
+        if self._built:
+            return
+        empty = ()
+        out = [empty] * len(self._goto)
+        for node, phrase in self._own.items():
+            out[node] = (phrase,)
+        goto, fail = self._goto, self._fail
+        queue = deque()
+        for nxt in goto[0].values():
+            fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f
+                if out[f]:
+                    out[nxt] = out[nxt] + out[f]
+        self._out = out
+        self._built = True
+
+    def find_all(self, text):
+        """Return every (start, end, phrase) occurrence in text, in scan order."""
+        self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for phrase in out[node]:
+                    hits.append((i + 1 - len(phrase), i + 1, phrase))
+        return hits
+
+    def match(self, text):
+        """Return (phrase, value) for the most specific hit, or (None, None).
+
+        The longest phrase wins; among equally long phrases the one with more
+        words wins, then the one that appears first in the utterance.
+        """
+        best = None
+        best_key = None
+        for start, end, phrase in self.find_all(text):
+            key = (len(phrase), phrase.count(' '), -start)
+            if best_key is None or key > best_key:
+                best, best_key = phrase, key
+        if best is None:
+            return None, None
+        return best, self._values[best]
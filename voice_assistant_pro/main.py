@@ -1,147 +1,639 @@
+import argparse
+import contextvars
 import os
 import sys
 import importlib
 import importlib.util
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
-# Add speech recognition import (optional)
-try:
-    import speech_recognition as sr
-except Exception:
-    sr = None
+from startup import StartupProfile, load_calibration, save_calibration
+
+# created before the other imports so --profile-startup can time them
+PROFILE = StartupProfile(enabled=__name__ == '__main__' and '--profile-startup' in sys.argv[1:])
+PROFILE.start('imports')
+
+from audio_pipeline import ListenSettings, RecordedAudioSource, StreamingListener, calibrate
+from command_plan import build_plan
+from executor import SkillExecutor
+from fuzzy_intent import FuzzyIntentIndex
+from intent_cache import IntentCache, skills_fingerprint
+from intent_index import IntentIndex
+from metrics import METRICS
+from recognizers import (BACKENDS, RecognitionRequestError, UnknownSpeech, load_speech_recognition,
+                         make_backend)
+from skill_registry import LazySkill, SkillRegistry, skill_name
+from skill_watcher import SkillWatcher
+from skills import _grammar
+from vad import REASONS, VoiceActivityDetector, WakeWord, strip_wake_word
+
+PROFILE.stop('imports')
+
+# slot extraction time is reported by the shared skill grammar
+_grammar.observer = lambda seconds: METRICS.observe('slot_extraction', seconds)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, '.cache')
+SKILL_REGISTRY_PATH = os.path.join(CACHE_DIR, 'skill_registry.json')
+INTENT_CACHE_PATH = os.path.join(CACHE_DIR, 'intent_cache.json')
+CALIBRATION_PATH = os.path.join(CACHE_DIR, 'calibration.json')
+
+
+def _resumable(skill):
+    return callable(getattr(skill, 'resume', None))
 
 class VoiceAgent:
-    def __init__(self):
+    def __init__(self, lazy=False, executor=None, intent_cache=None, fuzzy_threshold=0.6):
+        # lazy: index skills from the cached registry and import each skill
+        # module only when one of its phrases first matches
+        self.lazy = lazy
+        # executor: optional SkillExecutor; when set, commands are resolved
+        # and skills run off the caller's thread and handle_voice_command
+        # returns a Future
+        self.executor = executor
+        self._dispatcher = None
+        # intent_cache: optional IntentCache of resolved commands; cleared
+        # whenever skills are loaded
+        self.intent_cache = intent_cache
+        # fuzzy_threshold: minimum n-gram score for the fuzzy matcher that
+        # runs when no phrase matches exactly; None disables it
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_index = None
+        self.skill_dir = os.path.join(BASE_DIR, 'skills')
         self.skills = {}
+        self.skills_by_name = {}
+        self._reload_lock = threading.Lock()
+        self.intent_index = IntentIndex()
         self.load_skills()
 
     def load_skills(self):
         """Dynamically load all skill modules from the skills/ folder."""
-        skill_dir = os.path.join(os.path.dirname(__file__), 'skills')
+        skill_dir = self.skill_dir
         if not os.path.isdir(skill_dir):
             print(f"[Warning] skills directory not found: {skill_dir}")
             return
 
-        for fname in os.listdir(skill_dir):
+        registry = SkillRegistry(SKILL_REGISTRY_PATH) if self.lazy else None
+        seen = set()
+        handles = {}
+        for fname in sorted(os.listdir(skill_dir)):
             if fname.endswith('.py') and not fname.startswith('_'):
                 name = fname[:-3]
                 path = os.path.join(skill_dir, fname)
-                try:
-                    spec = importlib.util.spec_from_file_location(f"skills.{name}", path)
-                    if spec and spec.loader:
-                        mod = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(mod)
-                    else:
-                        print(f"[Warning] could not load spec for {fname}")
+                seen.add(fname)
+                if registry is not None:
+                    entry = registry.lookup(fname, path)
+                    if entry is not None:
+                        loader = lambda name=name, path=path: self._import_skill(name, path)
+                        handles[name] = LazySkill(name, entry['phrases'], loader,
+                                                 entry.get('resumable', False))
                         continue
-                except Exception as e:
-                    print(f"[Error] failed to import {fname}: {e}")
+                handle = self._import_skill(name, path)
+                if handle is None:
                     continue
+                if registry is not None:
+                    registry.update(fname, path, name, handle.intent_phrases,
+                                    getattr(handle, 'phrase_sources', ()), _resumable(handle))
+                handles[name] = handle
 
-                if hasattr(mod, 'register_skill'):
-                    try:
-                        handle = mod.register_skill()
-                    except Exception as e:
-                        print(f"[Error] register_skill() failed in {fname}: {e}")
-                        continue
-                    if hasattr(handle, 'intent_phrases') and hasattr(handle, 'handle_intent'):
-                        for phrase in handle.intent_phrases:
-                            if isinstance(phrase, str):
-                                # normalize stored phrases to lowercase for matching
-                                self.skills[phrase.lower()] = handle
-                    else:
-                        print(f"[Warning] skill {fname} missing intent_phrases or handle_intent")
+        if registry is not None:
+            registry.prune(seen)
+            registry.save()
+
+        self._install(handles)
+        if self.intent_cache is not None:
+            self.intent_cache.load()
+
+    def reload_skill(self, fname):
+        """Re-import one skills/ file and swap its phrases in; returns True on success.
+
+        Other skills keep their loaded modules. A module that fails to import
+        or register leaves its previous version serving; a deleted file
+        unloads the skill. Commands keep being dispatched meanwhile.
+        """
+        name = fname[:-3]
+        path = os.path.join(self.skill_dir, fname)
+        with self._reload_lock:
+            handles = dict(self.skills_by_name)
+            if os.path.exists(path):
+                handle = self._import_skill(name, path, fresh=True)
+                if handle is None:
+                    print(f"[Warning] reload of {fname} failed; keeping the previous version")
+                    return False
+                handles[name] = handle
+                action = 'reloaded' if name in self.skills_by_name else 'loaded'
+            elif handles.pop(name, None) is not None:
+                action = 'unloaded'
+            else:
+                return True
+            if self.lazy:
+                registry = SkillRegistry(SKILL_REGISTRY_PATH)
+                if name in handles:
+                    registry.update(fname, path, name, handles[name].intent_phrases,
+                                    getattr(handles[name], 'phrase_sources', ()),
+                                    _resumable(handles[name]))
+                else:
+                    registry.prune({n + '.py' for n in handles})
+                registry.save()
+            self._install(dict(sorted(handles.items())))
+        print(f"[Skills] {action} {name}")
+        return True
+
+    def _install(self, handles):
+        """Build phrase tables and indexes for handles (name -> skill) and swap them in.
+
+        Everything is built aside and assigned at the end, so a command being
+        dispatched sees either the old or the new set of skills. On phrase
+        clashes the skill whose file sorts last wins.
+        """
+        skills = {}
+        for handle in handles.values():
+            for phrase in handle.intent_phrases:
+                if isinstance(phrase, str):
+                    # normalize stored phrases to lowercase for matching
+                    skills[phrase.lower()] = handle
+
+        # compile every phrase into one automaton so dispatch is a single scan
+        index = IntentIndex()
+        for phrase, handle in skills.items():
+            index.add(phrase, handle)
+        index.build()
+
+        fuzzy = None
+        if self.fuzzy_threshold is not None:
+            fuzzy = FuzzyIntentIndex(threshold=self.fuzzy_threshold)
+            for phrase, handle in skills.items():
+                fuzzy.add(phrase, handle)
+            if not self.lazy:
+                # lazy agents compile it (and import NumPy) on the first miss
+                fuzzy.build()
+
+        self.skills, self.skills_by_name = skills, handles
+        self.intent_index, self.fuzzy_index = index, fuzzy
+        if self.intent_cache is not None:
+            self.intent_cache.invalidate(skills_fingerprint(self.skill_dir))
+
+    def _import_skill(self, name, path, fresh=False):
+        """Execute a skill module and return its registered handle, or None.
+
+        fresh compiles from source, skipping __pycache__: a .pyc written in the
+        same second as an edit of the same size would otherwise be reused.
+        """
+        fname = os.path.basename(path)
+        try:
+            spec = importlib.util.spec_from_file_location(f"skills.{name}", path)
+            if spec and spec.loader:
+                mod = importlib.util.module_from_spec(spec)
+                if fresh:
+                    with open(path, 'rb') as f:
+                        exec(compile(f.read(), path, 'exec'), mod.__dict__)
+                else:
+                    spec.loader.exec_module(mod)
+            else:
+                print(f"[Warning] could not load spec for {fname}")
+                return None
+        except Exception as e:
+            print(f"[Error] failed to import {fname}: {e}")
+            return None
+
+        if not hasattr(mod, 'register_skill'):
+            return None
+        try:
+            handle = mod.register_skill()
+        except Exception as e:
+            print(f"[Error] register_skill() failed in {fname}: {e}")
+            return None
+        if not (hasattr(handle, 'intent_phrases') and hasattr(handle, 'handle_intent')):
+            print(f"[Warning] skill {fname} missing intent_phrases or handle_intent")
+            return None
+        return handle
+
+    def _resolve(self, text):
+        """Return (skill, phrase, slots, text), consulting the intent cache first.
+
+        text is the command as the skill should see it: after a fuzzy match
+        the misheard phrase is replaced by the registered one.
+        """
+        cache = self.intent_cache
+        if cache is not None:
+            with METRICS.time('intent_cache'):
+                hit = cache.get(text)
+            if hit is not None:
+                name, phrase, slots = hit
+                skill = self.skills_by_name.get(name)
+                if skill is not None:
+                    return skill, phrase, dict(slots), text
+        key = text
+        with METRICS.time('match'):
+            phrase, skill = self.intent_index.match(text)
+        slots = self._parse(skill, text)
+        if not slots and self.fuzzy_index is not None:
+            # nothing heard exactly, or a phrase heard inside a command its
+            # skill can not parse ("send e-mail to ... message ...")
+            with METRICS.time('fuzzy_match'):
+                fuzzy = self.fuzzy_index.match(text)
+            if fuzzy is not None and fuzzy.phrase != phrase:
+                fuzzy_slots = self._parse(fuzzy.value, fuzzy.text)
+                if skill is None or fuzzy_slots:
+                    phrase, skill, slots, text = fuzzy.phrase, fuzzy.value, fuzzy_slots, fuzzy.text
+        if skill is None:
+            return None, None, None, text
+        if cache is not None and slots and hasattr(skill, 'run_intent'):
+            cache.put(key, [skill_name(skill), phrase, dict(slots)])
+        return skill, phrase, slots, text
+
+    @staticmethod
+    def _parse(skill, text):
+        # a lazy skill is imported here on first use, which may fail too
+        try:
+            parse = getattr(skill, 'parse_intent', None)
+            return parse(text) if parse is not None else None
+        except Exception as e:
+            print(f"[Error] skill {skill_name(skill)} could not parse the command: {e}")
+            return None
+
+    def plan(self, text):
+        """Return a CommandPlan when text holds several commands, else None."""
+        if not text:
+            return None
+        return build_plan(text, self.intent_index, self._resolve)
+
+    def resolve(self, text):
+        """Resolve text to its skill and slots without running the skill.
+
+        Returns {'skill', 'phrase', 'slots'} or None when no phrase matches.
+        slots is None for skills without parse_intent or that can not parse
+        the command. A compound command also gets 'steps', one such dict
+        (plus the 'text' it covers) per command, and reports its first step.
+        """
+        if not text:
+            return None
+        plan = self.plan(text)
+        if plan is not None:
+            steps = plan.resolved()
+            return {'skill': steps[0]['skill'], 'phrase': steps[0]['phrase'],
+                    'slots': steps[0]['slots'], 'steps': steps}
+        skill, phrase, slots, _ = self._resolve(text)
+        if skill is None:
+            return None
+        return {'skill': skill_name(skill), 'phrase': phrase, 'slots': slots}
 
     def handle_voice_command(self, text):
-        """Try all skill handlers; fallback to typing or failure."""
+        """Try all skill handlers; fallback to typing or failure.
+
+        With an executor the command is resolved on the dispatch thread (one,
+        so commands start in the order heard) and a Future of the outcome is
+        returned at once: a slow parse_intent or a skill's first import does
+        not hold up the caller, usually the listen loop.
+        """
         if not text:
             return None
-        text_l = text.lower()
-        for phrase, skill in self.skills.items():
-            if phrase in text_l:
-                try:
-                    result = skill.handle_intent(text)
-                    if result is not None:
-                        print(result)
-                    return result
-                except Exception as e:
-                    print(f"[Error] skill handler raised: {e}")
-                    return None
+        if self.executor is None:
+            return self._dispatch(text)
+        if self._dispatcher is None:
+            self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dispatch')
+        done = Future()
+
+        def dispatch():
+            future = self._dispatch(text)
+            if future is None:
+                done.set_result(None)
+            else:
+                future.add_done_callback(lambda f: done.set_result(None if f.cancelled() else f.result()))
+
+        self._dispatcher.submit(contextvars.copy_context().run, dispatch)
+        return done
+
+    def resume(self):
+        """Let skills pick up work a previous run left queued (unsent messages, emails).
+
+        Only the interactive entry points call this, so batch workers, dry
+        runs and benchmarks never send what an earlier session queued. Lazy
+        skills are imported only if the registry says they can resume.
+        """
+        for name, handle in self.skills_by_name.items():
+            if isinstance(handle, LazySkill) and not (handle.loaded or handle.resumable):
+                continue
+            try:
+                resume = getattr(handle, 'resume', None)
+                if resume is not None:
+                    resume()
+            except Exception as e:
+                print(f"[Warning] skill {name} could not resume its queue: {e}")
+
+    def close(self, wait=False):
+        """Stop the dispatch thread; wait lets commands heard so far start first."""
+        if self._dispatcher is not None:
+            self._dispatcher.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _dispatch(self, text):
+        try:
+            return self._run_command(text)
+        except Exception as e:
+            print(f"[Error] could not handle command: {e}")
+            return None
+
+    def _run_command(self, text):
+        plan = self.plan(text)
+        if plan is not None:
+            # several commands in one breath: independent ones run at once
+            print(f"[Plan] {plan.describe()}")
+            return plan.run(self.executor)
+        heard = text
+        skill, phrase, slots, text = self._resolve(text)
+        if skill is not None:
+            if text != heard:
+                print(f"[Interpreted as]: {text}")
+            if self.executor is not None:
+                return self.executor.submit(skill, text, slots or None)
+            try:
+                if slots:
+                    # already parsed (or cached): skip the skill's own parsing
+                    result = METRICS.call_skill(skill_name(skill), skill.run_intent, slots)
+                else:
+                    result = METRICS.call_skill(skill_name(skill), skill.handle_intent, text)
+                if result is not None:
+                    print(result)
+                return result
+            except Exception as e:
+                print(f"[Error] skill handler raised: {e}")
+                return None
         print(f"[No skill handler found for]: {text}")
         return None
 
-def listen_loop(agent):
-    if sr is None:
+def report_result(outcome):
+    """Print a SkillResult delivered by the SkillExecutor."""
+    if outcome.timed_out:
+        print(f"[Error] skill {outcome.skill} timed out after {outcome.elapsed:.1f}s")
+    elif outcome.error is not None:
+        print(f"[Error] skill handler raised: {outcome.error}")
+    elif outcome.result is not None:
+        print(outcome.result)
+
+def typed_loop(agent, startup_only=False):
+    """Read commands from the keyboard until exit/quit/stop."""
+    print("[Fallback] Use text input (type 'exit', 'quit', or 'stop' to quit).")
+    PROFILE.ready()
+    if startup_only:
+        return
+    try:
+        while True:
+            cmd = input("You (type): ")
+            if not cmd:
+                continue
+            if cmd.strip().lower() in ('exit', 'quit', 'stop'):
+                print("Goodbye.")
+                break
+            agent.handle_voice_command(cmd)
+    except KeyboardInterrupt:
+        print("\nExiting.")
+
+def listen_loop(agent, workers=2, backend='google', audio_file=None, transcripts=None,
+                reuse_calibration=False, startup_only=False, vad=None, wake_word=None):
+    """Capture -> recognize -> dispatch until exit, Ctrl+C or end of audio_file.
+
+    backend names a recognizer backend (see recognizers.make_backend);
+    audio_file replays a WAV/raw PCM recording instead of the microphone, so
+    with the 'stub' backend the whole path runs without a mic or network.
+    reuse_calibration skips the ambient noise calibration when a recent one
+    was saved for the same microphone; startup_only returns once ready.
+    vad (a VoiceActivityDetector) drops phrases without speech before they
+    are recognized; with wake_word only commands starting with it are run.
+    """
+    # a replayed recording with the stub backend never touches speech_recognition
+    sr = None if audio_file and backend == 'stub' else load_speech_recognition()
+    if sr is None and audio_file is None:
         print("[Notice] speech_recognition not installed. Install with: pip install SpeechRecognition")
-        print("[Fallback] Use text input (type 'exit', 'quit', or 'stop' to quit).")
-        try:
-            while True:
-                cmd = input("You (type): ")
-                if not cmd:
-                    continue
-                if cmd.strip().lower() in ('exit', 'quit', 'stop'):
-                    print("Goodbye.")
-                    break
-                agent.handle_voice_command(cmd)
-        except KeyboardInterrupt:
-            print("\nExiting.")
+        typed_loop(agent, startup_only)
         return
 
-    recognizer = sr.Recognizer()
-    # adjust for ambient noise once
+    # segmentation settings; a plain ListenSettings when running headless
+    settings = sr.Recognizer() if sr is not None else ListenSettings()
     try:
-        with sr.Microphone() as source:
-            print("Calibrating microphone for ambient noise... (stay quiet)")
-            recognizer.adjust_for_ambient_noise(source, duration=1.5)
+        recognizer = make_backend(backend, settings if sr is not None else None,
+                                  transcripts=transcripts)
+    except (ValueError, RecognitionRequestError) as e:
+        print(f"[Error] {e}")
+        typed_loop(agent, startup_only)
+        return
+
+    # open the input once; the capture thread keeps it open for the session
+    try:
+        source = RecordedAudioSource(audio_file) if audio_file else sr.Microphone()
+        source.__enter__()
     except Exception as e:
         print(f"[Error] Cannot access microphone: {e}")
-        print("[Fallback] Use text input (type 'exit', 'quit', or 'stop' to quit).")
         # fallback to typed input
-        try:
-            while True:
-                cmd = input("You (type): ")
-                if not cmd:
-                    continue
-                if cmd.strip().lower() in ('exit', 'quit', 'stop'):
-                    print("Goodbye.")
-                    break
-                agent.handle_voice_command(cmd)
-        except KeyboardInterrupt:
-            print("\nExiting.")
+        typed_loop(agent, startup_only)
         return
 
-    print("=" * 60)
-    print("[Tanu - Ready to listen!]")
-    print("Say 'exit', 'quit', or 'stop' to stop Tanu")
-    print("Press Ctrl+C to force exit")
-    print("=" * 60)
-    print()
+    pipeline = None
+    device = f"{getattr(source, 'device_index', None)}@{source.SAMPLE_RATE}"
     try:
-        while True:
-            try:
-                with sr.Microphone() as source:
-                    print("Listening...")
-                    audio = recognizer.listen(source, timeout=6, phrase_time_limit=8)
-                try:
-                    text = recognizer.recognize_google(audio)
-                    print(f"You (heard): {text}")
-                    if text.strip().lower() in ('exit', 'quit', 'stop'):
-                        print("Goodbye.")
-                        break
-                    agent.handle_voice_command(text)
-                except sr.UnknownValueError:
+        if audio_file is None:
+            saved = load_calibration(CALIBRATION_PATH, device) if reuse_calibration else None
+            if saved is not None:
+                settings.energy_threshold = saved
+                print(f"Using saved microphone calibration (energy threshold {saved:.0f})")
+            else:
+                # adjust for ambient noise once
+                print("Calibrating microphone for ambient noise... (stay quiet)")
+                with METRICS.time('calibration'), PROFILE.stage('calibration'):
+                    calibrate(source, settings, duration=1.5)
+                save_calibration(CALIBRATION_PATH, settings.energy_threshold, device)
+
+        print("=" * 60)
+        print("[Tanu - Ready to listen!]")
+        print("Say 'exit', 'quit', or 'stop' to stop Tanu")
+        print("Press Ctrl+C to force exit")
+        print("=" * 60)
+        print()
+        PROFILE.ready()
+        if startup_only:
+            return
+        # capture, phrase segmentation and recognition run on their own
+        # threads, so speech is still recorded while a phrase is recognized
+        gate = None
+        if vad is not None:
+            def gate(segment):
+                with METRICS.time('vad'):
+                    reason = vad.check(segment)
+                if reason is not None:
+                    # shown as it happens, so a command the gate swallowed is noticed
+                    seconds = len(segment.data) / (segment.sample_rate * segment.sample_width)
+                    print(f"[VAD] dropped segment ({seconds:.1f} s, {REASONS[reason]})")
+                return reason is None
+        pipeline = StreamingListener(source, settings, recognizer.recognize, workers=workers,
+                                     phrase_time_limit=8, gate=gate).start()
+        # queue depths and drops, live in the metrics snapshot and /metrics
+        METRICS.add_collector('pipeline', pipeline.stats)
+        print("Listening..." if wake_word is None else f"Listening for \"{wake_word}\"...")
+        awake_until = 0.0
+        for transcript in pipeline.transcripts():
+            segment = transcript.segment
+            METRICS.observe('listen', len(segment.data) / (segment.sample_rate * segment.sample_width))
+            METRICS.observe('recognize', transcript.elapsed)
+            if transcript.error is not None:
+                if isinstance(transcript.error, UnknownSpeech):
                     # couldn't understand audio
                     print("[Could not understand audio]")
-                except sr.RequestError as e:
-                    print(f"[Speech API error]: {e}")
-                    # optionally fallback to keyboard input
-            except sr.WaitTimeoutError:
-                # no speech detected within timeout
-                # continue listening loop
+                elif isinstance(transcript.error, RecognitionRequestError):
+                    print(f"[Speech API error]: {transcript.error}")
+                else:
+                    print(f"[Error] recognition failed: {transcript.error}")
                 continue
+            text = transcript.text
+            print(f"You (heard): {text}")
+            if wake_word is not None:
+                command = strip_wake_word(text, wake_word)
+                if command is not None:
+                    # a command may follow in the next phrase: "Tanu." ... "open chrome"
+                    awake_until = time.time() + 5.0
+                    text = command
+                elif time.time() > awake_until:
+                    print(f"[Ignored: say \"{wake_word}\" first]")
+                    continue
+                if not text.strip():
+                    continue
+            if text.strip().lower() in ('exit', 'quit', 'stop'):
+                print("Goodbye.")
+                break
+            agent.handle_voice_command(text)
     except KeyboardInterrupt:
         print("\nExiting.")
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+            stats = pipeline.stats()
+            if stats['dropped_frames'] or stats['dropped_segments']:
+                print(f"[Pipeline] dropped {stats['dropped_frames']} frames, "
+                      f"{stats['dropped_segments']} phrases")
+            if stats['gated']:
+                print(f"[VAD] {stats['gated']} of {stats['segments']} phrases had no speech "
+                      f"and were not sent to the recognizer")
+            if audio_file is None:
+                # the threshold kept adapting to the room; start from it next time
+                save_calibration(CALIBRATION_PATH, settings.energy_threshold, device)
+        source.__exit__(None, None, None)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tanu voice assistant")
+    parser.add_argument('--lazy', action='store_true',
+                        help="start from the cached skill registry and import skills on first use")
+    parser.add_argument('--sync', action='store_true',
+                        help="run skills on the listen thread instead of the worker pool")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="size of the skill worker pool (default: 4)")
+    parser.add_argument('--per-skill-limit', type=int, default=2,
+                        help="max concurrent calls of a single skill (default: 2)")
+    parser.add_argument('--skill-timeout', type=float, default=None,
+                        help="per-call deadline in seconds (default: $TANU_SKILL_TIMEOUT or 60)")
+    parser.add_argument('--recognizer-workers', type=int, default=2,
+                        help="phrases recognized concurrently while capture continues (default: 2)")
+    parser.add_argument('--recognizer', default='google', choices=['stub'] + sorted(BACKENDS),
+                        help="speech recognition backend (default: google)")
+    parser.add_argument('--audio-file', metavar='PATH',
+                        help="replay a mono WAV or 16 kHz/16-bit raw PCM file instead of the microphone")
+    parser.add_argument('--stub-transcripts', metavar='PATH',
+                        help="transcripts returned by the stub recognizer, one per line")
+    parser.add_argument('--fast-start', action='store_true',
+                        help="start listening sooner: implies --lazy and reuses the saved microphone "
+                             "calibration instead of measuring ambient noise")
+    parser.add_argument('--recalibrate', action='store_true',
+                        help="with --fast-start, measure ambient noise even if a calibration was saved")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long imports, skill registration and calibration took")
+    parser.add_argument('--startup-only', action='store_true',
+                        help="exit as soon as Tanu is ready to listen (for timing startup)")
+    parser.add_argument('--watch-skills', action='store_true',
+                        help="reload a skill as soon as its file in skills/ is added, edited or removed")
+    parser.add_argument('--fuzzy-threshold', type=float, default=0.6,
+                        help="min score (0-1) for matching misheard phrases like \"what's app\" (default: 0.6)")
+    parser.add_argument('--no-fuzzy', action='store_true',
+                        help="only run a skill when one of its phrases is heard exactly")
+    parser.add_argument('--vad', action='store_true',
+                        help="drop captured phrases without speech before recognition (off by default: "
+                             "its thresholds are not yet validated on real recordings)")
+    # sending every phrase is the default now; still accepted for old scripts
+    parser.add_argument('--no-vad', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--vad-margin', type=float, default=10.0, metavar='DB',
+                        help="how far above the background noise speech must be (default: 10 dB)")
+    parser.add_argument('--wake-word', nargs='?', const='tanu', metavar='WORD',
+                        help="only run commands that start with WORD (default word: tanu)")
+    parser.add_argument('--wake-samples', nargs='+', metavar='WAV',
+                        help="recordings of the wake word; phrases not starting with it are not even recognized")
+    parser.add_argument('--intent-cache-size', type=int, default=1024,
+                        help="resolved commands kept in the intent cache; 0 disables it (default: 1024)")
+    parser.add_argument('--intent-cache-ttl', type=float, default=3600,
+                        help="seconds a cached command stays valid (default: 3600)")
+    parser.add_argument('--persist-intent-cache', action='store_true',
+                        help="keep the intent cache in .cache/ across restarts")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="write a JSON snapshot of per-stage timings here on exit")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--profile-slow', type=float, metavar='SECONDS',
+                        help="stack-sample skill calls and keep profiles of those slower than this")
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help="write slow-command profiles (folded stacks) to this folder")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    agent = VoiceAgent()
-    listen_loop(agent)
\ No newline at end of file
+    args = parse_args()
+    if args.fast_start:
+        args.lazy = True
+    METRICS.add_collector('startup', PROFILE.summary)
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    if args.profile_slow is not None:
+        METRICS.profile_threshold = args.profile_slow
+        METRICS.profile_dir = args.profile_dir
+    executor = None
+    if not args.sync:
+        executor = SkillExecutor(max_workers=args.workers, per_skill_limit=args.per_skill_limit,
+                                 on_result=report_result)
+        if args.skill_timeout is not None:
+            executor.default_timeout = args.skill_timeout
+    intent_cache = None
+    if args.intent_cache_size > 0:
+        intent_cache = IntentCache(args.intent_cache_size, args.intent_cache_ttl,
+                                   INTENT_CACHE_PATH if args.persist_intent_cache else None)
+        METRICS.add_collector('intent_cache', intent_cache.stats)
+    with PROFILE.stage('skill registration'):
+        agent = VoiceAgent(lazy=args.lazy, executor=executor, intent_cache=intent_cache,
+                           fuzzy_threshold=None if args.no_fuzzy else args.fuzzy_threshold)
+    if not args.startup_only:
+        agent.resume()
+    watcher = None
+    if args.watch_skills:
+        watcher = SkillWatcher(agent.skill_dir, agent.reload_skill).start()
+        print(f"[Skills] watching {agent.skill_dir} ({watcher.backend})")
+    vad = None
+    if args.vad and not args.no_vad:
+        wake = None
+        if args.wake_samples:
+            try:
+                wake = WakeWord.from_files(args.wake_samples)
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"[Warning] wake word samples not used: {e}")
+        vad = VoiceActivityDetector(margin_db=args.vad_margin, wake_word=wake)
+        METRICS.add_collector('vad', vad.stats)
+    elif args.wake_samples:
+        print("[Warning] --wake-samples needs the VAD gate; ignored without --vad")
+    try:
+        listen_loop(agent, workers=args.recognizer_workers, backend=args.recognizer,
+                    audio_file=args.audio_file, transcripts=args.stub_transcripts,
+                    reuse_calibration=args.fast_start and not args.recalibrate,
+                    startup_only=args.startup_only, vad=vad, wake_word=args.wake_word)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        # a replayed recording ends on its own; let its commands finish
+        agent.close(wait=args.audio_file is not None)
+        if executor is not None:
+            executor.shutdown(wait=args.audio_file is not None)
+        if intent_cache is not None:
+            intent_cache.save()
+        if args.metrics_json:
+            METRICS.write_json(args.metrics_json)
\ No newline at end of file
@@ -0,0 +1,289 @@
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+
+def _metric_name(name):
+    """A Prometheus-safe metric name part: anything but [a-zA-Z0-9_] becomes '_'."""
+    return re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# upper bounds (seconds) of the latency buckets shared by every stage
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two adds."""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {('+Inf' if b == float('inf') else repr(b)): n for b, n in zip(BUCKETS, self.counts)},
+        }
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval.
+
+    Stacks are kept in folded form ("outer;inner;leaf" -> samples), the
+    input format of flamegraph tools.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class Metrics:
+    """Per-stage latency histograms and per-skill call counters.
+
+    Stages used by the agent: calibration, listen, recognize, intent_cache,
+    match, slot_extraction and skill (labelled with the skill name). When
+    ``profile_threshold`` is set, every skill call is stack-sampled and the
+    folded stacks of calls slower than the threshold are kept in
+    ``slow_profiles`` (and written to ``profile_dir`` if given).
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.profile_threshold = None
+        self.profile_interval = 0.005
+        self.profile_dir = None
+        self.slow_profiles = deque(maxlen=20)
+        self.started = time.time()
+        self._histograms = {}
+        self._skills = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage, skill):
+        key = (stage, skill)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, stage, seconds, skill=None):
+        if self.enabled:
+            self._histogram(stage, skill).observe(seconds)
+
+    @contextmanager
+    def time(self, stage, skill=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, skill)
+
+    def _counters(self, skill):
+        counters = self._skills.get(skill)
+        if counters is None:
+            with self._lock:
+                counters = self._skills.setdefault(skill, {'calls': 0, 'errors': 0, 'failures': 0, 'timeouts': 0})
+        return counters
+
+    def count(self, skill, field):
+        if self.enabled:
+            self._counters(skill)[field] += 1
+
+    def add_collector(self, name, fn):
+        """Include fn()'s dict of numbers in snapshots as ``name``.
+
+        Used for components that keep their own counters (e.g. the intent
+        cache); each numeric value is exported as a tanu_<name>_<key> gauge.
+        """
+        with self._lock:
+            self._collectors[name] = fn
+
+    def _collect(self):
+        with self._lock:
+            collectors = list(self._collectors.items())
+        return {name: fn() for name, fn in collectors}
+
+    def call_skill(self, skill, fn, *args):
+        """Run a skill handler, recording its latency, outcome and slow profile."""
+        if not self.enabled:
+            return fn(*args)
+        sampler = None
+        if self.profile_threshold is not None:
+            sampler = StackSampler(threading.get_ident(), self.profile_interval).start()
+        counters = self._counters(skill)
+        counters['calls'] += 1
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            counters['errors'] += 1
+            raise
+        else:
+            if result is False:
+                counters['failures'] += 1
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self._histogram('skill', skill).observe(elapsed)
+            if sampler is not None:
+                stacks = sampler.stop()
+                if elapsed >= self.profile_threshold:
+                    self._keep_profile(skill, elapsed, stacks)
+
+    def _keep_profile(self, skill, elapsed, stacks):
+        profile = {'skill': skill, 'elapsed': elapsed, 'time': time.time(), 'stacks': dict(stacks)}
+        self.slow_profiles.append(profile)
+        print(f"[Metrics] slow command in {skill}: {elapsed:.2f}s ({sum(stacks.values())} samples)")
+        if self.profile_dir:
+            try:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                path = os.path.join(self.profile_dir, f"{skill}-{int(profile['time'] * 1000)}.folded")
+                with open(path, 'w', encoding='utf-8') as f:
+                    for stack, n in stacks.most_common():
+                        f.write(f"{stack} {n}\n")
+            except OSError as e:
+                print(f"[Warning] could not write profile: {e}")
+
+    def snapshot(self):
+        """Return every histogram and counter as a JSON-serialisable dict."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            skills = {name: dict(c) for name, c in self._skills.items()}
+        stages = {}
+        for (stage, skill), hist in sorted(histograms, key=lambda kv: (kv[0][0], kv[0][1] or '')):
+            key = f"{stage}:{skill}" if skill else stage
+            stages[key] = hist.to_dict()
+        for counters in skills.values():
+            counters['error_rate'] = counters['errors'] / counters['calls'] if counters['calls'] else 0.0
+        return {'started': self.started, 'time': time.time(), 'stages': stages, 'skills': skills,
+                'collectors': self._collect(), 'slow_profiles': len(self.slow_profiles)}
+
+    def write_json(self, path):
+        """Atomically write snapshot() to path."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp, path)
+
+    def prometheus_text(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            skills = {name: dict(c) for name, c in self._skills.items()}
+        lines = ['# HELP tanu_stage_seconds Time spent in each stage of a command.',
+                 '# TYPE tanu_stage_seconds histogram']
+        for (stage, skill), hist in histograms:
+            labels = f'stage="{_label_value(stage)}"' + (f',skill="{_label_value(skill)}"' if skill else '')
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'tanu_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'tanu_stage_seconds_sum{{{labels}}} {hist.sum}')
+            lines.append(f'tanu_stage_seconds_count{{{labels}}} {hist.count}')
+        for field in ('calls', 'errors', 'failures', 'timeouts'):
+            lines.append(f'# TYPE tanu_skill_{field}_total counter')
+            for name, counters in skills.items():
+                lines.append(f'tanu_skill_{field}_total{{skill="{_label_value(name)}"}} {counters[field]}')
+        for name, values in self._collect().items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    # collector keys are free text ("skill registration")
+                    metric = f'tanu_{_metric_name(name)}_{_metric_name(key)}'
+                    lines.append(f'# TYPE {metric} gauge')
+                    lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve prometheus_text() at http://host:port/metrics from a daemon thread."""
+        # imported here: http.server is slow to import and rarely needed
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+
+# process-wide metrics used by the agent, executor and skill grammar
+METRICS = Metrics()
@@ -0,0 +1,113 @@
+import time
+
+# speech_recognition, imported on first use by load_speech_recognition()
+sr = None
+_sr_loaded = False
+
+
+def load_speech_recognition():
+    """Import speech_recognition on first use; None when it isn't installed.
+
+    It is the slowest import on the startup path, so it is only paid for
+    when a speech_recognition engine or microphone is actually needed.
+    """
+    global sr, _sr_loaded
+    if not _sr_loaded:
+        try:
+            import speech_recognition
+        except Exception:
+            speech_recognition = None
+        sr, _sr_loaded = speech_recognition, True
+    return sr
+
+
+class UnknownSpeech(Exception):
+    """The backend heard the segment but could not turn it into text."""
+
+
+class RecognitionRequestError(Exception):
+    """The backend itself failed (network, quota, missing engine...)."""
+
+
+class RecognizerBackend:
+    """Turns a finished audio Segment into text.
+
+    Subclasses implement ``recognize(segment)`` and raise UnknownSpeech or
+    RecognitionRequestError; ``local`` tells whether the engine works offline.
+    """
+    name = 'base'
+    local = True
+
+    def recognize(self, segment):
+        raise NotImplementedError
+
+
+class SpeechRecognitionBackend(RecognizerBackend):
+    """Adapter for one of speech_recognition's ``recognize_*`` engines."""
+
+    def __init__(self, method, recognizer=None, local=False, **options):
+        if load_speech_recognition() is None:
+            raise RecognitionRequestError("speech_recognition not installed. Install with: pip install SpeechRecognition")
+        self.name = method
+        self.local = local
+        self.recognizer = recognizer or sr.Recognizer()
+        self._recognize = getattr(self.recognizer, f'recognize_{method}')
+        self.options = options
+
+    def recognize(self, segment):
+        audio = sr.AudioData(segment.data, segment.sample_rate, segment.sample_width)
+        try:
+            return self._recognize(audio, **self.options)
+        except sr.UnknownValueError as e:
+            raise UnknownSpeech(str(e)) from e
+        except sr.RequestError as e:
+            raise RecognitionRequestError(str(e)) from e
+
+
+class StubBackend(RecognizerBackend):
+    """Deterministic offline backend for tests and benchmarks.
+
+    Returns ``transcripts[segment.seq]`` (cycling when there are fewer
+    transcripts than segments), so the result only depends on the segment
+    order and not on which worker recognizes it. ``delay`` simulates engine
+    latency in seconds.
+    """
+    name = 'stub'
+
+    def __init__(self, transcripts=None, delay=0.0):
+        self.transcripts = list(transcripts or [])
+        self.delay = delay
+
+    @classmethod
+    def from_file(cls, path, delay=0.0):
+        """Load one transcript per line (blank lines are skipped)."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls([line.strip() for line in f if line.strip()], delay)
+
+    def recognize(self, segment):
+        if self.delay:
+            time.sleep(self.delay)
+        if not self.transcripts:
+            raise UnknownSpeech(f"no stub transcript for segment {segment.seq}")
+        return self.transcripts[segment.seq % len(self.transcripts)]
+
+
+BACKENDS = {
+    # name: (speech_recognition engine, works offline)
+    'google': ('google', False),
+    'sphinx': ('sphinx', True),
+    'whisper': ('whisper', True),
+    'vosk': ('vosk', True),
+}
+
+
+def make_backend(name, recognizer=None, transcripts=None, **options):
+    """Build a backend by name: 'stub' or one of BACKENDS."""
+    if name == 'stub':
+        if isinstance(transcripts, str):
+            return StubBackend.from_file(transcripts, **options)
+        return StubBackend(transcripts, **options)
+    if name not in BACKENDS:
+        raise ValueError(f"unknown recognizer backend {name!r} (choose from stub, {', '.join(BACKENDS)})")
+    method, local = BACKENDS[name]
+    return SpeechRecognitionBackend(method, recognizer, local=local, **options)
@@ -0,0 +1,351 @@
+"""Serve one VoiceAgent to many thin clients (kiosks, room devices).
+
+Clients connect over TCP or a unix socket and exchange JSON lines. Each
+request carries either a transcript or a chunk of recorded speech:
+
+    {"id": 1, "text": "open calculator"}
+    {"id": 2, "audio": "<base64 PCM>", "sample_rate": 16000, "sample_width": 2}
+
+and gets one reply per request, matched by id (replies can come out of
+order when a session has several commands in flight):
+
+    {"id": 1, "ok": true, "heard": "open calculator", "skill": "open_app",
+     "phrase": "open calculator", "slots": {...}, "result": true,
+     "output": "[Opened Calculator]\\n", "elapsed": 0.012}
+
+A compound command ("open chrome and search python") also gets "steps",
+one entry per command with its own skill, slots and result.
+
+Skills are loaded once and shared by every session. Resolving a command
+and recognizing audio run on worker threads, and skills on the shared
+SkillExecutor (per-skill limits and deadlines included), so the event loop
+only moves bytes. A session stops reading once it has ``session_inflight``
+commands running, so a fast client is slowed down by TCP instead of
+queueing without bound; ``max_inflight`` caps commands across sessions.
+
+    python server.py --port 8765
+    python server.py --unix /tmp/tanu.sock --dry-run
+"""
+import argparse
+import asyncio
+import base64
+import contextvars
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_pipeline import Segment
+from executor import SkillExecutor
+from intent_cache import IntentCache
+from main import INTENT_CACHE_PATH, VoiceAgent
+from metrics import METRICS
+from recognizers import BACKENDS, RecognitionRequestError, UnknownSpeech, make_backend
+from skill_registry import skill_name
+
+# where print() output of the command being handled goes (None: the console)
+_output = contextvars.ContextVar('tanu_output', default=None)
+
+EXIT_WORDS = ('exit', 'quit', 'stop')
+
+
+class _RoutedStdout:
+    """sys.stdout replacement sending each command's prints to its session."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buf = _output.get()
+        return (buf if buf is not None else self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, attr):
+        return getattr(self._stream, attr)
+
+
+class VoiceServer:
+    """Line-JSON sessions over asyncio streams, all dispatching to one agent.
+
+    The agent should have a SkillExecutor unless ``dry_run`` is set, in
+    which case commands are only resolved (skill, phrase and slots) and no
+    skill runs. ``recognizer`` is a recognizers backend used for audio
+    requests; without one they are answered with an error.
+    """
+
+    def __init__(self, agent, recognizer=None, dry_run=False, session_inflight=4,
+                 max_inflight=64, recognizer_workers=2):
+        self.agent = agent
+        self.recognizer = recognizer
+        self.dry_run = dry_run
+        self.session_inflight = max(1, session_inflight)
+        self._global = asyncio.Semaphore(max(1, max_inflight))
+        self._recognize_pool = ThreadPoolExecutor(recognizer_workers, thread_name_prefix='recognize')
+        self._session_ids = itertools.count(1)
+        self._segments = itertools.count()
+        self._counts = {'sessions': 0, 'sessions_total': 0, 'inflight': 0,
+                        'commands': 0, 'errors': 0}
+
+    def stats(self):
+        return dict(self._counts)
+
+    async def serve(self, host='127.0.0.1', port=8765, unix=None):
+        """Start listening; returns the asyncio Server."""
+        # a base64 recording of a long phrase is far over the default 64 KiB line limit
+        limit = 16 * 1024 * 1024
+        if unix:
+            return await asyncio.start_unix_server(self.session, unix, limit=limit)
+        return await asyncio.start_server(self.session, host, port, limit=limit)
+
+    def close(self):
+        self._recognize_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def session(self, reader, writer):
+        """Serve one client until it disconnects or says exit."""
+        sid = next(self._session_ids)
+        inflight = asyncio.Semaphore(self.session_inflight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self._counts['sessions'] += 1
+        self._counts['sessions_total'] += 1
+        try:
+            await self._send(writer, write_lock, {'type': 'hello', 'session': sid,
+                                                  'skills': len(self.agent.skills_by_name),
+                                                  'dry_run': self.dry_run})
+            while True:
+                # backpressure: stop reading while this session is at its limit
+                await inflight.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError) as e:
+                    inflight.release()
+                    await self._send(writer, write_lock, {'ok': False, 'error': f"bad request: {e}"})
+                    break
+                if not line:
+                    inflight.release()
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    inflight.release()
+                    await self._send(writer, write_lock, {'ok': False, 'error': f"bad request: {e}"})
+                    continue
+                if str(request.get('text', '')).strip().lower() in EXIT_WORDS:
+                    inflight.release()
+                    await asyncio.gather(*tasks)
+                    await self._send(writer, write_lock, {'id': request.get('id'), 'ok': True, 'bye': True})
+                    break
+                task = asyncio.create_task(self._command(request, writer, write_lock, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._counts['sessions'] -= 1
+            writer.close()
+
+    async def _command(self, request, writer, write_lock, inflight):
+        start = time.perf_counter()
+        reply = {'id': request.get('id')}
+        # prints made while handling this command (here, on the resolve
+        # thread and on the skill worker) are collected into the reply
+        buf = io.StringIO()
+        _output.set(buf)
+        try:
+            async with self._global:
+                self._counts['inflight'] += 1
+                try:
+                    reply.update(await self._handle(request))
+                finally:
+                    self._counts['inflight'] -= 1
+        except Exception as e:
+            reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            inflight.release()
+        self._counts['commands'] += 1
+        if not reply.get('ok'):
+            self._counts['errors'] += 1
+        reply['output'] = buf.getvalue()
+        reply['elapsed'] = time.perf_counter() - start
+        METRICS.observe('command', reply['elapsed'])
+        try:
+            await self._send(writer, write_lock, reply)
+        except ConnectionError:
+            pass
+
+    async def _handle(self, request):
+        loop = asyncio.get_running_loop()
+        if 'audio' in request:
+            if self.recognizer is None:
+                return {'ok': False, 'error': "no speech recognizer configured"}
+            segment = Segment(next(self._segments), base64.b64decode(request['audio']),
+                              int(request.get('sample_rate', 16000)), int(request.get('sample_width', 2)),
+                              time.time())
+            started = time.perf_counter()
+            try:
+                text = await loop.run_in_executor(self._recognize_pool, contextvars.copy_context().run,
+                                                  self.recognizer.recognize, segment)
+            except UnknownSpeech:
+                return {'ok': False, 'error': "could not understand audio"}
+            except RecognitionRequestError as e:
+                return {'ok': False, 'error': f"speech API error: {e}"}
+            METRICS.observe('recognize', time.perf_counter() - started)
+        else:
+            text = str(request.get('text') or '').strip()
+        if not text:
+            return {'ok': False, 'error': "empty command"}
+        resolved, future = await asyncio.to_thread(self._dispatch, text)
+        reply = {'ok': True, 'heard': text}
+        reply.update(resolved)
+        if future is not None and 'steps' in resolved:
+            outcomes = await asyncio.wrap_future(future)
+            for step, outcome in zip(reply['steps'], outcomes):
+                step['result'] = outcome.result
+                if outcome.error is not None:
+                    step.update(error=str(outcome.error), timed_out=outcome.timed_out)
+                    reply['ok'] = False
+        elif future is not None:
+            outcome = await asyncio.wrap_future(future)
+            reply['text'] = outcome.text
+            reply['result'] = outcome.result
+            if outcome.error is not None:
+                reply.update(ok=False, error=str(outcome.error), timed_out=outcome.timed_out)
+        return reply
+
+    def _dispatch(self, text):
+        """Resolve text and, unless dry_run, submit it; runs on a worker thread."""
+        plan = self.agent.plan(text)
+        if plan is not None:
+            steps = plan.resolved()
+            resolved = {'skill': steps[0]['skill'], 'phrase': steps[0]['phrase'],
+                        'slots': steps[0]['slots'], 'steps': steps}
+            return resolved, None if self.dry_run else plan.run(self.agent.executor)
+        skill, phrase, slots, text = self.agent._resolve(text)
+        if skill is None:
+            return {'skill': None, 'phrase': None, 'slots': None}, None
+        resolved = {'skill': skill_name(skill), 'phrase': phrase, 'slots': slots}
+        if self.dry_run:
+            return resolved, None
+        return resolved, self.agent.executor.submit(skill, text, slots or None)
+
+    async def _send(self, writer, lock, message):
+        data = (json.dumps(message, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        async with lock:
+            writer.write(data)
+            # waits while the client is slow to read
+            await writer.drain()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Tanu to many clients over a local socket")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port; 0 picks a free one (default: 8765)")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a unix socket instead of TCP")
+    parser.add_argument('--lazy', action='store_true',
+                        help="start from the cached skill registry and import skills on first use")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="resolve skill and slots only; do not run any skill")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="size of the skill worker pool (default: 8)")
+    parser.add_argument('--per-skill-limit', type=int, default=4,
+                        help="max concurrent calls of a single skill (default: 4)")
+    parser.add_argument('--skill-timeout', type=float, default=None,
+                        help="per-call deadline in seconds (default: $TANU_SKILL_TIMEOUT or 60)")
+    parser.add_argument('--session-inflight', type=int, default=4,
+                        help="commands one session may have running before it is throttled (default: 4)")
+    parser.add_argument('--max-inflight', type=int, default=64,
+                        help="commands running across all sessions (default: 64)")
+    parser.add_argument('--recognizer', default='google', choices=['stub'] + sorted(BACKENDS),
+                        help="speech recognition backend for audio requests (default: google)")
+    parser.add_argument('--stub-transcripts', metavar='PATH',
+                        help="transcripts returned by the stub recognizer, one per line")
+    parser.add_argument('--recognizer-workers', type=int, default=2,
+                        help="audio requests recognized at once (default: 2)")
+    parser.add_argument('--fuzzy-threshold', type=float, default=0.6,
+                        help="min score (0-1) for matching misheard phrases like \"what's app\" (default: 0.6)")
+    parser.add_argument('--no-fuzzy', action='store_true',
+                        help="only run a skill when one of its phrases is heard exactly")
+    parser.add_argument('--intent-cache-size', type=int, default=1024,
+                        help="resolved commands kept in the intent cache; 0 disables it (default: 1024)")
+    parser.add_argument('--intent-cache-ttl', type=float, default=3600,
+                        help="seconds a cached command stays valid (default: 3600)")
+    parser.add_argument('--persist-intent-cache', action='store_true',
+                        help="keep the intent cache in .cache/ across restarts")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="write a JSON snapshot of per-stage timings here on exit")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    return parser.parse_args(argv)
+
+
+async def run(args):
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    executor = None
+    if not args.dry_run:
+        executor = SkillExecutor(max_workers=args.workers, per_skill_limit=args.per_skill_limit,
+                                 max_pending=args.max_inflight)
+        if args.skill_timeout is not None:
+            executor.default_timeout = args.skill_timeout
+    intent_cache = None
+    if args.intent_cache_size > 0:
+        intent_cache = IntentCache(args.intent_cache_size, args.intent_cache_ttl,
+                                   INTENT_CACHE_PATH if args.persist_intent_cache else None)
+        METRICS.add_collector('intent_cache', intent_cache.stats)
+    agent = VoiceAgent(lazy=args.lazy, executor=executor, intent_cache=intent_cache,
+                       fuzzy_threshold=None if args.no_fuzzy else args.fuzzy_threshold)
+    if not args.dry_run:
+        agent.resume()
+    try:
+        recognizer = make_backend(args.recognizer, transcripts=args.stub_transcripts)
+    except (ValueError, RecognitionRequestError) as e:
+        print(f"[Warning] audio requests disabled: {e}")
+        recognizer = None
+
+    server = VoiceServer(agent, recognizer, dry_run=args.dry_run, session_inflight=args.session_inflight,
+                         max_inflight=args.max_inflight, recognizer_workers=args.recognizer_workers)
+    METRICS.add_collector('server', server.stats)
+    listener = await server.serve(args.host, args.port, args.unix)
+    where = args.unix or '%s:%d' % listener.sockets[0].getsockname()[:2]
+    print(f"[Server] listening on {where} ({len(agent.skills_by_name)} skills"
+          f"{', dry run' if args.dry_run else ''})", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+        if executor is not None:
+            executor.shutdown()
+        if intent_cache is not None:
+            intent_cache.save()
+        if args.unix:
+            try:
+                os.remove(args.unix)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.stdout = _RoutedStdout(sys.stdout)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n[Server] stopped")
+    finally:
+        if args.metrics_json:
+            METRICS.write_json(args.metrics_json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+
+REGISTRY_VERSION = 2
+
+
+def file_digest(path):
+    """Return the sha1 hex digest of a file's contents."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class LazySkill:
+    """Stand-in for a skill whose module has not been imported yet.
+
+    It carries the cached intent phrases so the skill can be indexed at
+    startup, and imports the real module the first time it is used.
+    """
+
+    def __init__(self, name, intent_phrases, loader, resumable=False):
+        self.name = name
+        self.intent_phrases = list(intent_phrases)
+        # the skill has a resume() method (see VoiceAgent.resume)
+        self.resumable = resumable
+        self._loader = loader
+        self._skill = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """Import the skill module (once) and return the real handle."""
+        if self._skill is None:
+            with self._lock:
+                if self._skill is None:
+                    skill = self._loader()
+                    if skill is None:
+                        raise ImportError(f"skill {self.name} could not be loaded")
+                    self._skill = skill
+        return self._skill
+
+    @property
+    def loaded(self):
+        return self._skill is not None
+
+    def handle_intent(self, text):
+        return self.resolve().handle_intent(text)
+
+    def __getattr__(self, attr):
+        # only called for attributes not set in __init__; forward to the real skill
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def skill_name(skill):
+    """Return the skill's module name (e.g. 'email_sender'), loaded or not."""
+    if isinstance(skill, LazySkill):
+        return skill.name
+    return type(skill).__module__.rpartition('.')[2]
+
+
+class SkillRegistry:
+    """On-disk cache of skill name, intent phrases, resumability and source signature.
+
+    Entries are keyed by file name and validated against the file's mtime and
+    size; when those changed but the content hash did not (e.g. a checkout
+    touched the file) the entry is still reused. Skills whose phrases are
+    generated from data files list them in ``phrase_sources``; a change to
+    any of those files also invalidates the entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == REGISTRY_VERSION:
+                self.entries = data.get('skills', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def lookup(self, fname, path):
+        """Return the cached entry for a skill file if it is still current."""
+        entry = self.entries.get(fname)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if any(_mtime_ns(source) != mtime for source, mtime in entry.get('sources', {}).items()):
+            return None
+        if entry.get('mtime_ns') == st.st_mtime_ns and entry.get('size') == st.st_size:
+            return entry
+        if entry.get('sha1') == file_digest(path):
+            entry['mtime_ns'] = st.st_mtime_ns
+            entry['size'] = st.st_size
+            self.dirty = True
+            return entry
+        return None
+
+    def update(self, fname, path, name, phrases, sources=(), resumable=False):
+        """Record the phrases of a freshly imported skill file."""
+        st = os.stat(path)
+        self.entries[fname] = {
+            'name': name,
+            'phrases': [p for p in phrases if isinstance(p, str)],
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha1': file_digest(path),
+            'sources': {source: _mtime_ns(source) for source in sources},
+            'resumable': resumable,
+        }
+        self.dirty = True
+
+    def prune(self, fnames):
+        """Drop entries for skill files that no longer exist."""
+        for fname in list(self.entries):
+            if fname not in fnames:
+                del self.entries[fname]
+                self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': REGISTRY_VERSION, 'skills': self.entries}, f, indent=1)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"[Warning] could not save skill registry: {e}")
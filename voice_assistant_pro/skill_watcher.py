@@ -0,0 +1,143 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')
+_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def is_skill_file(fname):
+    """Skill modules only: shared skills/_*.py helpers and editor temp files are ignored."""
+    return fname.endswith('.py') and not fname.startswith(('_', '.'))
+
+
+class _Inotify:
+    """Minimal inotify binding over libc via ctypes (Linux only)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), _MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f'inotify_add_watch failed for {directory}')
+
+    def read(self, timeout):
+        """File names with events, waiting up to timeout seconds for the first."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names, offset = set(), 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SkillWatcher:
+    """Calls on_change(fname) for each skill file added, edited or removed.
+
+    Uses inotify on Linux and falls back to polling the folder's mtimes
+    every ``interval`` seconds elsewhere (or when ``use_inotify`` is False).
+    Bursts of events (editors often write, rename and touch a file) are
+    collapsed: a file is reported once it has been quiet for ``debounce``
+    seconds and its content actually changed.
+    """
+
+    def __init__(self, directory, on_change, interval=1.0, debounce=0.3, use_inotify=None):
+        self.directory = directory
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux')
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._snapshot = self._scan()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self):
+        files = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return files
+        for fname in names:
+            if is_skill_file(fname):
+                try:
+                    st = os.stat(os.path.join(self.directory, fname))
+                except OSError:
+                    continue
+                files[fname] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def start(self):
+        notify = None
+        if self.use_inotify:
+            try:
+                notify = _Inotify(self.directory)
+            except (OSError, AttributeError, TypeError) as e:
+                print(f"[Warning] inotify unavailable ({e}); polling skills/ instead")
+        self.backend = 'inotify' if notify is not None else 'polling'
+        self._thread = threading.Thread(target=self._run, args=(notify,), name='skill-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self):
+        """Compare the folder with the last snapshot and report changed files."""
+        current = self._scan()
+        changed = {f for f in current.keys() | self._snapshot.keys()
+                   if current.get(f) != self._snapshot.get(f)}
+        self._snapshot = current
+        for fname in sorted(changed):
+            try:
+                self.on_change(fname)
+            except Exception as e:
+                print(f"[Error] skill reload of {fname} raised: {e}")
+        return changed
+
+    def _run(self, notify):
+        try:
+            while not self._stop.is_set():
+                if notify is None:
+                    self._stop.wait(self.interval)
+                    self.poll()
+                    continue
+                if not any(is_skill_file(f) for f in notify.read(self.interval)):
+                    continue
+                # let the burst settle before reading the files
+                while any(is_skill_file(f) for f in notify.read(self.debounce)):
+                    pass
+                self.poll()
+        finally:
+            if notify is not None:
+                notify.close()
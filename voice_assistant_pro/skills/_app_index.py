@@ -0,0 +1,370 @@
+"""Index of launchable applications, used by the open_app skill.
+
+Applications are collected once from the executables on PATH, desktop
+entries (.desktop files in the XDG application folders), the platform's
+application folders (Start Menu shortcuts, /Applications) and any folders
+listed in $TANU_APP_DIRS. Each app is stored under its spoken name
+("google chrome", "libreoffice writer"), so resolving "open X" is a dict
+lookup. The scan is cached per folder together with the folder's mtime; a
+refresh only stats the folders and rescans the ones that changed (an app
+was installed, removed or renamed). Intent phrases are generated for
+desktop entries, app folders and aliases. The hundreds of command-line
+tools on PATH are never launched by voice unless listed in
+$TANU_PATH_APPS (e.g. "htop,vlc"), and then only when the whole name is
+said, so a misheard "open the shutdown menu" cannot power the machine off.
+
+    python -m skills._app_index refresh
+    python -m skills._app_index lookup "google chrome"
+
+The index lives at $TANU_APP_INDEX (default .cache/app_index.json; an
+empty value keeps it in memory only).
+"""
+import argparse
+import json
+import os
+import re
+import shlex
+import sys
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'app_index.json')
+INDEX_VERSION = 1
+
+# verbs an intent phrase is generated with, and the shortest app name that
+# gets phrases (phrases match as substrings, so "open w" would fire on
+# "open weather"); shorter names can still be opened once routed here
+VERBS = ('open', 'launch', 'start')
+MIN_PHRASE_NAME = 3
+
+# friendly names -> candidate commands, first one found wins
+ALIASES = {
+    'win32': {
+        'notepad': ['notepad.exe'],
+        'calculator': ['calc.exe'],
+        'paint': ['mspaint.exe'],
+        'chrome': ['chrome.exe', r'%ProgramFiles%\Google\Chrome\Application\chrome.exe'],
+        'edge': ['msedge.exe', r'%ProgramFiles(x86)%\Microsoft\Edge\Application\msedge.exe'],
+        'firefox': ['firefox.exe', r'%ProgramFiles%\Mozilla Firefox\firefox.exe'],
+        'whatsapp': [r'%LOCALAPPDATA%\WhatsApp\WhatsApp.exe'],
+        'spotify': [r'%APPDATA%\Spotify\Spotify.exe'],
+        'word': [r'%ProgramFiles%\Microsoft Office\root\Office16\WINWORD.EXE'],
+        'excel': [r'%ProgramFiles%\Microsoft Office\root\Office16\EXCEL.EXE'],
+        'powerpoint': [r'%ProgramFiles%\Microsoft Office\root\Office16\POWERPNT.EXE'],
+    },
+    'linux': {
+        'chrome': ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'],
+        'edge': ['microsoft-edge', 'microsoft-edge-stable'],
+        'firefox': ['firefox', 'firefox-esr'],
+        'calculator': ['gnome-calculator', 'kcalc', 'galculator'],
+        'notepad': ['gnome-text-editor', 'gedit', 'kate', 'mousepad'],
+        'terminal': ['gnome-terminal', 'konsole', 'xfce4-terminal', 'x-terminal-emulator'],
+        'files': ['nautilus', 'dolphin', 'thunar'],
+        'word': ['libreoffice --writer'],
+        'excel': ['libreoffice --calc'],
+        'powerpoint': ['libreoffice --impress'],
+    },
+}
+
+_FIELD_CODE = re.compile(r'%[a-zA-Z]')
+
+
+def spoken_name(name):
+    """How a name is said: lowercase words, punctuation and separators dropped."""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', name.casefold()).split())
+
+
+# programs on PATH that may be opened by voice; every other tool found
+# there is indexed (aliases resolve through it) but never launched
+PATH_APPS = tuple(spoken_name(name) for name in re.split(r'[,%s]' % re.escape(os.pathsep),
+                                                          os.getenv('TANU_PATH_APPS', '')) if name.strip())
+
+
+def _platform():
+    return 'win32' if sys.platform == 'win32' else 'darwin' if sys.platform == 'darwin' else 'linux'
+
+
+def default_dirs():
+    """(folder, kind) pairs to scan, highest priority first."""
+    dirs = []
+    plat = _platform()
+    if plat == 'linux':
+        data_home = os.getenv('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        data_dirs = (os.getenv('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(':')
+        for base in [data_home] + data_dirs + ['/var/lib/flatpak/exports/share',
+                                               os.path.expanduser('~/.local/share/flatpak/exports/share')]:
+            dirs.append((os.path.join(base, 'applications'), 'desktop'))
+        dirs.append(('/var/lib/snapd/desktop/applications', 'desktop'))
+    elif plat == 'win32':
+        for var in ('APPDATA', 'ProgramData'):
+            base = os.getenv(var)
+            if base:
+                dirs.append((os.path.join(base, 'Microsoft', 'Windows', 'Start Menu', 'Programs'), 'dir'))
+    else:
+        dirs += [('/Applications', 'dir'), (os.path.expanduser('~/Applications'), 'dir')]
+    for extra in (os.getenv('TANU_APP_DIRS') or '').split(os.pathsep):
+        if extra:
+            dirs.append((os.path.expanduser(os.path.expandvars(extra)), 'dir'))
+    for directory in (os.getenv('PATH') or '').split(os.pathsep):
+        if directory:
+            dirs.append((directory, 'path'))
+    seen, out = set(), []
+    for directory, kind in dirs:
+        if directory not in seen:
+            seen.add(directory)
+            out.append((directory, kind))
+    return out
+
+
+def read_desktop_entry(path):
+    """(name, argv) of a launchable .desktop file, or None."""
+    fields, section = {}, None
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    section = line
+                elif section == '[Desktop Entry]' and '=' in line:
+                    key, _, value = line.partition('=')
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if fields.get('Type', 'Application') != 'Application' or 'Exec' not in fields:
+        return None
+    if fields.get('NoDisplay') == 'true' or fields.get('Hidden') == 'true':
+        return None
+    try:
+        argv = shlex.split(_FIELD_CODE.sub('', fields['Exec']).replace('%%', '%'))
+    except ValueError:
+        return None
+    if not argv or not fields.get('Name'):
+        return None
+    return fields['Name'], argv
+
+
+def _is_executable(entry):
+    try:
+        if not entry.is_file():
+            return False
+    except OSError:
+        return False
+    if sys.platform == 'win32':
+        exts = (os.getenv('PATHEXT') or '.EXE;.BAT;.CMD').lower().split(';')
+        return os.path.splitext(entry.name)[1].lower() in exts
+    return os.access(entry.path, os.X_OK)
+
+
+def scan_dir(directory, kind):
+    """Apps in one folder as {spoken name: entry} plus {file name: path} of executables.
+
+    An entry is {'name': display name, 'command': argv} or, for shortcuts
+    that only the OS can open, {'name': display name, 'file': path}.
+    Executables found on PATH are marked 'on_path'.
+    """
+    apps, executables = {}, {}
+    try:
+        entries = sorted(os.scandir(directory), key=lambda e: e.name)
+    except OSError:
+        return apps, executables
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        ext = ext.lower()
+        found = []
+        if ext == '.desktop':
+            desktop = read_desktop_entry(entry.path)
+            if desktop is not None:
+                name, argv = desktop
+                found.append((name, {'name': name, 'command': argv}))
+                found.append((os.path.basename(argv[0]), {'name': name, 'command': argv}))
+        elif kind == 'path':
+            if _is_executable(entry):
+                key = stem.lower() if sys.platform == 'win32' else entry.name
+                executables.setdefault(key, entry.path)
+                found.append((stem if sys.platform == 'win32' else entry.name,
+                              {'name': stem, 'command': [entry.path], 'on_path': True}))
+        elif ext == '.app':
+            found.append((stem, {'name': stem, 'command': ['open', '-a', entry.path]}))
+        elif ext in ('.lnk', '.url'):
+            found.append((stem, {'name': stem, 'file': entry.path}))
+        elif _is_executable(entry):
+            found.append((stem, {'name': stem, 'command': [entry.path]}))
+        for name, app in found:
+            spoken = spoken_name(name)
+            if spoken:
+                apps.setdefault(spoken, app)
+    return apps, executables
+
+
+class AppIndex:
+    """Spoken app name -> launch entry, cached per scanned folder.
+
+    refresh() stats every folder and rescans only those whose mtime
+    changed, so it is cheap enough to run on every startup and again when
+    a name is not found. Folder mtimes change when files are added,
+    removed or renamed, which is how package managers install apps; an
+    app edited in place keeps its old entry until its folder changes.
+    """
+
+    def __init__(self, path=None, dirs=None, path_apps=PATH_APPS):
+        self.path = path
+        self.dirs = dirs
+        self.path_apps = frozenset(path_apps)
+        self.apps = {}
+        self._scans = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self.apps)
+
+    def __contains__(self, name):
+        return spoken_name(name) in self.apps
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == INDEX_VERSION and data.get('platform') == _platform():
+            self._scans = data.get('dirs', {})
+            self.apps = data.get('apps', {})
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'platform': _platform(),
+                           'dirs': self._scans, 'apps': self.apps}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Warning] could not save app index: {e}")
+
+    def refresh(self):
+        """Rescan folders that changed since the last scan; True if the index changed."""
+        with self._lock:
+            dirs = self.dirs if self.dirs is not None else default_dirs()
+            scans, changed = {}, False
+            for directory, kind in dirs:
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    mtime = None
+                cached = self._scans.get(directory)
+                if cached is not None and cached['mtime_ns'] == mtime and cached['kind'] == kind:
+                    scans[directory] = cached
+                    continue
+                apps, executables = scan_dir(directory, kind) if mtime is not None else ({}, {})
+                scans[directory] = {'kind': kind, 'mtime_ns': mtime, 'apps': apps, 'executables': executables}
+                changed = True
+            changed = changed or scans.keys() != self._scans.keys()
+            if not changed:
+                return False
+            self._scans = scans
+            self.apps = self._merge(dirs, scans)
+            self.save()
+            return True
+
+    @staticmethod
+    def _merge(dirs, scans):
+        """Combine folder scans: aliases first, then folders in priority order."""
+        executables = {}
+        for directory, _ in dirs:
+            for fname, path in scans[directory]['executables'].items():
+                executables.setdefault(fname, path)
+        apps = {}
+        for alias, candidates in ALIASES.get(_platform(), {}).items():
+            for candidate in candidates:
+                argv = candidate.split() if not os.path.isabs(os.path.expandvars(candidate)) else [candidate]
+                program = os.path.expandvars(argv[0])
+                if os.path.isabs(program):
+                    program = program if os.path.isfile(program) else None
+                else:
+                    program = executables.get(program.lower() if sys.platform == 'win32' else program)
+                if program:
+                    apps[alias] = {'name': alias, 'command': [program] + argv[1:]}
+                    break
+        for directory, _ in dirs:
+            for spoken, app in scans[directory]['apps'].items():
+                apps.setdefault(spoken, app)
+        return apps
+
+    def lookup(self, name):
+        """Entry for an app by (spoken) name, or None."""
+        return self.apps.get(spoken_name(name))
+
+    def find(self, text):
+        """(spoken name, entry) of the app named at the start of text, or (None, None).
+
+        The longest name text starts with wins ("google chrome please").
+        A program found only on PATH must be the whole text and listed in
+        path_apps.
+        """
+        words = spoken_name(text).split()
+        for size in range(len(words), 0, -1):
+            name = ' '.join(words[:size])
+            app = self.apps.get(name)
+            if app is None:
+                continue
+            if app.get('on_path') and (size < len(words) or name not in self.path_apps):
+                continue
+            return name, app
+        return None, None
+
+    def phrases(self):
+        """Intent phrases ("open X", "launch X", "start X") for every app that may be opened."""
+        return [f"{verb} {name}" for name, app in sorted(self.apps.items())
+                if len(name) >= MIN_PHRASE_NAME and (not app.get('on_path') or name in self.path_apps)
+                for verb in VERBS]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Shared AppIndex at $TANU_APP_INDEX, refreshed when first created."""
+    global _index
+    path = os.getenv('TANU_APP_INDEX', DEFAULT_PATH)
+    with _index_lock:
+        if _index is None or _index.path != path:
+            _index = AppIndex(path)
+            _index.refresh()
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the Tanu application index")
+    parser.add_argument('--index', default=os.getenv('TANU_APP_INDEX', DEFAULT_PATH),
+                        help="index path (default: $TANU_APP_INDEX or .cache/app_index.json)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('refresh', help="rescan changed folders and list the folders indexed")
+    sub.add_parser('list', help="list every app and its command")
+    look = sub.add_parser('lookup', help="show the app a spoken name resolves to")
+    look.add_argument('name')
+    args = parser.parse_args(argv)
+
+    index = AppIndex(args.index)
+    changed = index.refresh()
+    if args.command == 'refresh':
+        for directory, scan in index._scans.items():
+            print(f"{len(scan['apps']):>6}  {scan['kind']:<8} {directory}")
+        print(f"[Apps] {len(index)} apps{' (updated)' if changed else ''} in {args.index or 'memory'}")
+    elif args.command == 'list':
+        for name, app in sorted(index.apps.items()):
+            print(f"{name}  ->  {' '.join(app['command']) if 'command' in app else app['file']}")
+    else:
+        name, app = index.find(args.name)
+        if app is None:
+            print(f"[Apps] no app called {args.name!r}")
+            sys.exit(1)
+        print(f"{name}  ->  {' '.join(app['command']) if 'command' in app else app['file']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and JSON persistence.
+
+    Entries expire ``ttl`` seconds after they were stored (never if ttl is
+    None) and the least recently used entry is evicted beyond ``max_size``.
+    Keys must be strings and values JSON-serialisable when ``path`` is set.
+    ``clock`` returns wall-clock seconds so expiry survives a restart.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, path=None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # one save at a time, so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] >= self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Live (key, value) pairs, least recently used first; order is unchanged."""
+        now = self.clock()
+        with self._lock:
+            return [(key, value) for key, (stored, value) in self._data.items()
+                    if self.ttl is None or now - stored < self.ttl]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self._data), 'max_size': self.max_size, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'expirations': self.expirations}
+
+    def save(self, meta=None):
+        """Write live entries (oldest first) to path; meta is stored alongside."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                items = [[key, stored, value] for key, (stored, value) in self._data.items()]
+            tmp = None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                # a temp file of its own: another process may be saving the same cache
+                fd, tmp = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(self.path) + '.',
+                                           dir=directory)
+                with open(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'meta': meta, 'entries': items}, f)
+                os.replace(tmp, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[Warning] could not save cache {self.path}: {e}")
+                if tmp is not None and os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def load(self, meta=None):
+        """Load entries saved with the same meta; returns the number loaded."""
+        if not self.path:
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('meta') != meta:
+            return 0
+        now = self.clock()
+        loaded = 0
+        with self._lock:
+            for key, stored, value in data.get('entries', []):
+                if self.ttl is None or now - stored < self.ttl:
+                    self._data[key] = (stored, value)
+                    self._data.move_to_end(key)
+                    loaded += 1
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return loaded
@@ -0,0 +1,333 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+from skills._lockfile import OwnerLock
+
+
+class PywhatkitTransport:
+    """Delivers a message through WhatsApp Web with pywhatkit.
+
+    sendwhatmsg_instantly opens the chat right away, so the only wait is the
+    page load (``wait_time``), spent on the scheduler thread.
+    """
+
+    def __init__(self, wait_time=15, tab_close=True, close_time=3):
+        self.wait_time = wait_time
+        self.tab_close = tab_close
+        self.close_time = close_time
+
+    def send(self, phone, text):
+        # imported here: pywhatkit is slow to import and may touch the network
+        import pywhatkit as pwt
+        pwt.sendwhatmsg_instantly(phone, text, wait_time=self.wait_time,
+                                  tab_close=self.tab_close, close_time=self.close_time)
+
+
+class DeliveryScheduler:
+    """Heap of timed message deliveries drained by one background thread.
+
+    schedule() returns immediately; the message is handed to
+    ``transport.send(phone, text)`` ``delay`` seconds later. A message to a
+    contact that already has one due within ``coalesce_window`` seconds is
+    appended to it, so a burst becomes a single send. Failed sends are
+    retried with exponential backoff up to ``max_attempts`` times.
+
+    The queue at ``path`` belongs to one process at a time, the one that
+    claim()s its lock file: the owner reloads it, writes it atomically on
+    every change (including a delivery being sent) and is the only one to
+    send from it. A scheduler that does not own ``path`` sends nothing and
+    hands what it schedules off to the owner through ``path``.incoming/,
+    which the owner picks up every ``poll_interval`` seconds (or on its
+    next start). Without a path the queue lives in memory. ``clock`` and
+    run_pending() let the queue be driven without the thread.
+    """
+
+    def __init__(self, transport, path=None, delay=60.0, coalesce_window=60.0,
+                 max_attempts=3, retry_delay=30.0, clock=time.time, on_result=None,
+                 claim=True, poll_interval=5.0):
+        self.transport = transport
+        self.path = path
+        self.delay = delay
+        self.coalesce_window = coalesce_window
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.poll_interval = poll_interval
+        # on_result(delivery, error): called once per delivery when it is
+        # sent (error None) or given up on
+        self.on_result = on_result
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self._heap = []         # (due, seq, id); entries whose id left _pending are stale
+        self._pending = {}      # id -> delivery dict
+        self._inflight = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.owner = False
+        self._owner_lock = None
+        if path and claim:
+            self.claim()
+
+    def claim(self):
+        """Become the process that sends the queue saved at path.
+
+        The owner reloads the saved deliveries (each is sent once due),
+        takes in those handed off by other processes and saves the queue
+        from then on. Returns False if another process owns it.
+        """
+        if not self.path:
+            return False
+        with self._cond:
+            if self.owner:
+                return True
+            lock = OwnerLock(self.path + '.lock')
+            if not lock.acquire():
+                return False
+            self._owner_lock, self.owner = lock, True
+            self._load()
+            self._ingest()
+            self._save()
+            self._cond.notify()
+        return True
+
+    def schedule(self, phone, text, delay=None):
+        """Queue text for phone and return a copy of its delivery record."""
+        due = self.clock() + (self.delay if delay is None else delay)
+        with self._cond:
+            if self.path and not self.owner:
+                return self._hand_off(phone, text, due)
+            delivery = self._add(phone, text, due)
+            self._save()
+            return dict(delivery)
+
+    def cancel(self, delivery_id):
+        """Drop a delivery that has not started sending; returns True if it was queued."""
+        with self._cond:
+            if self._pending.pop(delivery_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def pending(self):
+        """Queued deliveries in due order."""
+        with self._cond:
+            return sorted((dict(d) for d in self._pending.values()), key=lambda d: d['due'])
+
+    def run_pending(self):
+        """Send every delivery that is due now; returns how many were attempted."""
+        attempted = 0
+        if self.path and not self.owner:
+            return attempted
+        with self._cond:
+            self._ingest()
+        while True:
+            with self._cond:
+                delivery = self._pop_due(self.clock())
+            if delivery is None:
+                return attempted
+            self._deliver(delivery)
+            attempted += 1
+
+    def start(self):
+        with self._cond:
+            # a scheduler that hands its messages off has nothing to send
+            if self._thread is None and not self._closed and (self.owner or not self.path):
+                self._thread = threading.Thread(target=self._run, name='whatsapp-delivery', daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """Stop the thread; queued deliveries stay on disk for the next start."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            if self._owner_lock is not None:
+                self._owner_lock.release()
+                self._owner_lock, self.owner = None, False
+
+    def stats(self):
+        with self._cond:
+            return {'pending': len(self._pending), 'inflight': len(self._inflight),
+                    'sent': self.sent, 'failed': self.failed, 'coalesced': self.coalesced}
+
+    def _add(self, phone, text, due):
+        # append to a delivery for phone due within the window, else queue a new one
+        for delivery in self._pending.values():
+            if delivery['phone'] == phone and abs(delivery['due'] - due) <= self.coalesce_window:
+                delivery['text'] += '\n' + text
+                self.coalesced += 1
+                return delivery
+        delivery = {'id': uuid.uuid4().hex[:12], 'phone': phone, 'text': text,
+                    'due': due, 'attempts': 0}
+        self._push(delivery)
+        self._cond.notify()
+        return delivery
+
+    def _hand_off(self, phone, text, due):
+        # one file per message, renamed into place so the owner never reads half of it
+        delivery = {'id': uuid.uuid4().hex[:12], 'phone': phone, 'text': text,
+                    'due': due, 'attempts': 0}
+        inbox = self.path + '.incoming'
+        os.makedirs(inbox, exist_ok=True)
+        tmp = os.path.join(inbox, delivery['id'] + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(delivery, f)
+        os.replace(tmp, os.path.join(inbox, delivery['id'] + '.json'))
+        return dict(delivery)
+
+    def _ingest(self):
+        # queue what other processes handed off; called by the owner with the lock held
+        if not self.owner:
+            return
+        inbox = self.path + '.incoming'
+        try:
+            names = sorted(name for name in os.listdir(inbox) if name.endswith('.json'))
+        except OSError:
+            return
+        taken = []
+        for name in names:
+            file = os.path.join(inbox, name)
+            try:
+                with open(file, 'r', encoding='utf-8') as f:
+                    delivery = json.load(f)
+            except OSError:
+                continue
+            except ValueError:
+                delivery = None
+            if isinstance(delivery, dict) and {'phone', 'text', 'due'} <= delivery.keys():
+                self._add(delivery['phone'], delivery['text'], delivery['due'])
+            taken.append(file)
+        if taken:
+            self._save()
+            for file in taken:
+                try:
+                    os.remove(file)
+                except OSError:
+                    pass
+
+    def _push(self, delivery):
+        self._pending[delivery['id']] = delivery
+        heapq.heappush(self._heap, (delivery['due'], next(self._seq), delivery['id']))
+
+    def _next_due(self):
+        heap = self._heap
+        while heap and heap[0][2] not in self._pending:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def _pop_due(self, now):
+        due = self._next_due()
+        if due is None or due > now:
+            return None
+        delivery = self._pending.pop(heapq.heappop(self._heap)[2])
+        self._inflight[delivery['id']] = delivery
+        return delivery
+
+    def _deliver(self, delivery):
+        error = None
+        try:
+            self.transport.send(delivery['phone'], delivery['text'])
+        except Exception as e:
+            error = e
+        with self._cond:
+            self._inflight.pop(delivery['id'], None)
+            delivery['attempts'] += 1
+            final = error is None or delivery['attempts'] >= self.max_attempts
+            if error is None:
+                self.sent += 1
+            elif final:
+                self.failed += 1
+            else:
+                delivery['due'] = self.clock() + self.retry_delay * 2 ** (delivery['attempts'] - 1)
+                self._push(delivery)
+                self._cond.notify()
+            self._save()
+        if final and self.on_result is not None:
+            try:
+                self.on_result(dict(delivery), error)
+            except Exception as e:
+                print(f"[Warning] delivery callback raised: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    self._ingest()
+                    due = self._next_due()
+                    wait = None if due is None else due - self.clock()
+                    if wait is not None and wait <= 0:
+                        break
+                    if self.owner:
+                        # look for handed-off messages now and then
+                        wait = self.poll_interval if wait is None else min(wait, self.poll_interval)
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            self.run_pending()
+
+    def _save(self):
+        if not self.owner:
+            return
+        deliveries = list(self._inflight.values()) + list(self._pending.values())
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'deliveries': deliveries}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Warning] could not save delivery queue {self.path}: {e}")
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # a delivery that was mid-send when we stopped is sent again
+        for delivery in data.get('deliveries', []):
+            if isinstance(delivery, dict) and {'id', 'phone', 'text', 'due'} <= delivery.keys():
+                delivery.setdefault('attempts', 0)
+                self._push(delivery)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(path=None, resume=False, **kwargs):
+    """Return the shared, started WhatsApp scheduler, creating it on first use.
+
+    Only ``resume`` (the interactive assistant) claims the queue at path
+    and sends what was saved there; without it messages are handed off to
+    the process that owns the queue. Settings passed to an existing
+    scheduler (e.g. a changed delay) replace its current ones and apply to
+    messages queued from then on.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DeliveryScheduler(PywhatkitTransport(), path, claim=False, **kwargs)
+        else:
+            with _scheduler._cond:
+                for name, value in kwargs.items():
+                    if not hasattr(_scheduler, name):
+                        raise TypeError(f"get_scheduler() got an unexpected keyword argument {name!r}")
+                    setattr(_scheduler, name, value)
+        if resume and path and not _scheduler.claim():
+            print(f"[WhatsApp] another Tanu process is sending the queue at {path}; "
+                  f"messages queued here are handed to it")
+        return _scheduler.start()
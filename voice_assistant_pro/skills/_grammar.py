@@ -0,0 +1,50 @@
+import re
+import time
+
+# matches the opening of a named group so it can be renamed per template
+_NAMED_GROUP = re.compile(r'\(\?P<(\w+)>')
+
+# optional callable(seconds) told how long each match took (set by main.py)
+observer = None
+
+
+class SlotGrammar:
+    """Slot extraction for a skill's command templates.
+
+    Templates are declared once as ``(name, pattern)`` pairs whose slots are
+    named groups. They are compiled into a single alternation, so one search
+    over the utterance returns the matched template and its slots. Matching is
+    case-insensitive but the slots keep the casing of the original text.
+
+    Templates are tried in declaration order at each position, and the
+    leftmost match in the utterance wins.
+    """
+
+    def __init__(self, templates, flags=0):
+        self.templates = list(templates)
+        self._slots = []
+        parts = []
+        for i, (name, pattern) in enumerate(self.templates):
+            slots = _NAMED_GROUP.findall(pattern)
+            self._slots.append((name, [(slot, f't{i}_{slot}') for slot in slots]))
+            renamed = _NAMED_GROUP.sub(lambda m, i=i: f'(?P<t{i}_{m.group(1)}>', pattern)
+            parts.append(f'(?P<t{i}>{renamed})')
+        self._regex = re.compile('|'.join(parts), re.IGNORECASE | flags)
+
+    def match(self, text):
+        """Return (template_name, slots) for the utterance, or (None, {})."""
+        if observer is None:
+            return self._match(text)
+        start = time.perf_counter()
+        try:
+            return self._match(text)
+        finally:
+            observer(time.perf_counter() - start)
+
+    def _match(self, text):
+        m = self._regex.search(text.strip())
+        if not m:
+            return None, {}
+        # the template wrapper is the outermost group, so it closes last
+        name, slots = self._slots[int(m.lastgroup[1:])]
+        return name, {slot: (m.group(key) or '').strip() for slot, key in slots}
@@ -0,0 +1,63 @@
+"""Single-owner lock files for the queues every Tanu process can see.
+
+The WhatsApp queue and the email outbox live under .cache/ and are shared
+by the assistant, the server, batch workers and the benchmarks, but only
+one process may send from each: the one that took its lock. The lock is
+an OS file lock, so it goes away with the process that held it, even
+after a crash, and a stale lock file never blocks the next start.
+"""
+import os
+import sys
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+
+class OwnerLock:
+    """Non-blocking exclusive lock on ``path``, held until release() or exit."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """Take the lock; returns False if another process (or handle) holds it."""
+        if self._file is not None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            f = open(self.path, 'a+')
+        except OSError as e:
+            print(f"[Warning] could not open lock file {self.path}: {e}")
+            return False
+        try:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        f, self._file = self._file, None
+        if f is None:
+            return
+        try:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        f.close()
@@ -0,0 +1,22 @@
+"""NumPy, imported once on first use and shared by every module that can use it.
+
+Fuzzy intent matching, the VAD gate and the offline text index all run
+faster with NumPy but work without it. Each binds its ``np`` from
+load_numpy() when first used; setting ``np`` here to None before that
+forces the pure-Python paths (the benchmarks compare both).
+"""
+
+np = None
+_numpy_loaded = False
+
+
+def load_numpy():
+    """Import NumPy on first use (it is slow to import); None when missing."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np, _numpy_loaded = numpy, True
+    return np
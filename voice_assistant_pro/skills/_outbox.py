@@ -0,0 +1,414 @@
+"""Persistent outgoing email queue drained in batches by a background thread.
+
+The email skill only inserts rows into a SQLite table (WAL journal, so an
+enqueue is a small append rather than a rewrite); one thread picks up due
+messages in batches, sends each batch over a single pooled SMTP session
+and records the outcome. Temporary failures (dropped connection, 4xx
+replies) are retried with exponential backoff; permanent ones (5xx, bad
+credentials) and messages out of attempts are marked failed. Any process
+may queue messages, but only the one holding the outbox's lock file (the
+interactive assistant, or `drain`) sends them; when it starts it queues
+again a message that was being sent when the previous owner stopped.
+
+    python -m skills._outbox status
+    python -m skills._outbox bulk customers.csv --subject "We moved" --body "New address: ..."
+    python -m skills._outbox drain
+
+The database lives at $TANU_OUTBOX (default .cache/outbox.db; empty keeps
+the queue in memory).
+"""
+import argparse
+import os
+import re
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from skills._contacts import read_contacts
+from skills._lockfile import OwnerLock
+from skills._smtp_pool import get_pool
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'outbox.db')
+
+# sent messages are kept this long for `status`, then pruned by the next owner
+KEEP_SENT = 7 * 24 * 3600
+
+STATES = ('queued', 'sending', 'sent', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    batch INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    due REAL NOT NULL,
+    created REAL NOT NULL,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (state, due);
+"""
+
+_COLUMNS = ('id', 'batch', 'sender', 'recipient', 'subject', 'body', 'state', 'attempts', 'due', 'created', 'error')
+
+
+def build_message(sender, recipient, subject, body):
+    """Return the MIME text of a plain-text email."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg.as_string()
+
+
+def is_permanent(error):
+    """True if retrying the message can not help (5xx reply, bad login)."""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+class SMTPTransport:
+    """Sends batches over the shared SMTPPool of one account."""
+
+    def __init__(self, host, port, username='', password='', starttls=True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def send_many(self, messages):
+        # looked up per batch so a changed password gets a fresh pool
+        pool = get_pool(self.host, self.port, self.username, self.password, starttls=self.starttls)
+        return pool.send_many(messages)
+
+
+class Outbox:
+    """SQLite queue of emails, one row per recipient.
+
+    enqueue() stores a message for one or more recipients and wakes the
+    drain thread; rows of one call share a ``batch`` number so their
+    delivery can be followed together. The thread sends up to
+    ``batch_size`` due rows per SMTP session through
+    ``transport.send_many([(sender, recipient, mime), ...])``, which returns
+    None or an exception per message (see SMTPPool.send_many) and raises if
+    the session itself failed. Failed sends are retried after
+    ``retry_delay * 2 ** (attempts - 1)`` seconds, up to ``max_attempts``.
+
+    Only the outbox that claim()s the database's lock file sends; others
+    just queue and inspect, and the owner looks for their rows every
+    ``poll_interval`` seconds. An in-memory outbox always owns itself.
+
+    ``on_result(message, error)`` is called once per row when it is sent
+    (error None) or given up on. ``clock`` and run_pending() let the queue
+    be driven without the thread.
+    """
+
+    def __init__(self, transport, path=DEFAULT_PATH, batch_size=50, max_attempts=5,
+                 retry_delay=30.0, clock=time.time, on_result=None, claim=True, poll_interval=5.0):
+        self.transport = transport
+        self.path = path or ':memory:'
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # WAL with NORMAL sync only fsyncs at checkpoints: a committed
+        # enqueue survives a crash of Tanu, not of the machine
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        # no other process can see an in-memory database
+        self.owner = self.path == ':memory:'
+        self._owner_lock = None
+        if claim:
+            self.claim()
+
+    def claim(self):
+        """Become the process that sends this outbox; False if another one does.
+
+        The new owner queues again the rows a previous owner left 'sending'
+        (it stopped mid-send) and prunes old sent rows.
+        """
+        with self._cond:
+            if self.owner:
+                return True
+            lock = OwnerLock(self.path + '.lock')
+            if not lock.acquire():
+                return False
+            self._owner_lock, self.owner = lock, True
+            with self._db:
+                self._db.execute("UPDATE messages SET state = 'queued' WHERE state = 'sending'")
+                self._db.execute("DELETE FROM messages WHERE state = 'sent' AND due < ?",
+                                 (self.clock() - KEEP_SENT,))
+            self._cond.notify()
+        return True
+
+    def enqueue(self, sender, recipients, subject, body, delay=0.0):
+        """Queue one message per recipient; returns the batch number."""
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        now = self.clock()
+        with self._cond:
+            with self._db:
+                # other processes add batches too: number this one inside the transaction
+                self._db.execute('BEGIN IMMEDIATE')
+                batch = self._db.execute('SELECT COALESCE(MAX(batch), 0) + 1 FROM messages').fetchone()[0]
+                self._db.executemany(
+                    'INSERT INTO messages (batch, sender, recipient, subject, body, due, created) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(batch, sender, r, subject, body, now + delay, now) for r in recipients])
+            self._cond.notify()
+            return batch
+
+    def messages(self, state=None, batch=None, limit=None):
+        """Rows as dicts, oldest first, optionally filtered by state and batch."""
+        where, params = [], []
+        if state is not None:
+            where.append('state = ?')
+            params.append(state)
+        if batch is not None:
+            where.append('batch = ?')
+            params.append(batch)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM messages"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        with self._cond:
+            return [dict(zip(_COLUMNS, row)) for row in self._db.execute(sql, params)]
+
+    def stats(self, batch=None):
+        """Message count per state, for the whole queue or one batch."""
+        sql = 'SELECT state, COUNT(*) FROM messages'
+        params = ()
+        if batch is not None:
+            sql += ' WHERE batch = ?'
+            params = (batch,)
+        with self._cond:
+            counts = dict(self._db.execute(sql + ' GROUP BY state', params))
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def retry_failed(self):
+        """Queue every failed message again with fresh attempts; returns how many."""
+        with self._cond:
+            with self._db:
+                count = self._db.execute("UPDATE messages SET state = 'queued', attempts = 0, error = '', "
+                                         "due = ? WHERE state = 'failed'", (self.clock(),)).rowcount
+            self._cond.notify()
+            return count
+
+    def run_pending(self):
+        """Send every message that is due now; returns how many were attempted."""
+        attempted = 0
+        while self.owner:
+            with self._cond:
+                batch = self._claim(self.clock())
+            if not batch:
+                break
+            self._deliver(batch)
+            attempted += len(batch)
+        return attempted
+
+    def start(self):
+        with self._cond:
+            if self._thread is None and not self._closed and self.owner:
+                self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """Stop the thread; queued messages stay in the database for the next start."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._db.close()
+            if self._owner_lock is not None:
+                self._owner_lock.release()
+                self._owner_lock, self.owner = None, False
+
+    def _next_due(self):
+        return self._db.execute("SELECT MIN(due) FROM messages WHERE state = 'queued'").fetchone()[0]
+
+    def _claim(self, now):
+        # called with self._cond held; BEGIN IMMEDIATE takes the database's
+        # write lock before reading, so no other connection can pick the
+        # same rows between the SELECT and the UPDATE
+        with self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            rows = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM messages "
+                                    "WHERE state = 'queued' AND due <= ? ORDER BY due, id LIMIT ?",
+                                    (now, self.batch_size)).fetchall()
+            self._db.executemany("UPDATE messages SET state = 'sending' WHERE id = ?",
+                                 [(row[0],) for row in rows])
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def _deliver(self, batch):
+        try:
+            payload = [(m['sender'], m['recipient'], build_message(m['sender'], m['recipient'],
+                                                                   m['subject'], m['body'])) for m in batch]
+            errors = self.transport.send_many(payload)
+        except Exception as e:
+            # the session failed (could not connect or log in): the whole batch shares the error
+            errors = [e] * len(batch)
+        done = []
+        now = self.clock()
+        with self._cond:
+            with self._db:
+                for message, error in zip(batch, errors):
+                    message['attempts'] += 1
+                    if error is None:
+                        message['state'], message['error'] = 'sent', ''
+                    elif is_permanent(error) or message['attempts'] >= self.max_attempts:
+                        message['state'], message['error'] = 'failed', str(error)
+                    else:
+                        message['state'], message['error'] = 'queued', str(error)
+                        message['due'] = now + self.retry_delay * 2 ** (message['attempts'] - 1)
+                    self._db.execute('UPDATE messages SET state = ?, attempts = ?, due = ?, error = ? WHERE id = ?',
+                                     (message['state'], message['attempts'], message['due'],
+                                      message['error'], message['id']))
+                    if message['state'] != 'queued':
+                        done.append((message, error))
+            self._cond.notify_all()
+        if self.on_result is not None:
+            for message, error in done:
+                try:
+                    self.on_result(message, error)
+                except Exception as e:
+                    print(f"[Warning] outbox callback raised: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    due = self._next_due()
+                    wait = None if due is None else due - self.clock()
+                    if wait is not None and wait <= 0:
+                        break
+                    if self.path != ':memory:':
+                        # other processes may have queued messages meanwhile
+                        wait = self.poll_interval if wait is None else min(wait, self.poll_interval)
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            self.run_pending()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox(transport, path=DEFAULT_PATH, resume=False, **kwargs):
+    """Return the shared, started outbox, creating it on first use.
+
+    Only ``resume`` (the interactive assistant) claims the outbox and
+    sends from it; other processes just queue. The transport of an
+    existing outbox is replaced, so changed SMTP settings apply to
+    messages still queued.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(transport, path, claim=False, **kwargs)
+        else:
+            _outbox.transport = transport
+        if resume and not _outbox.claim():
+            print(f"[Email] another Tanu process is sending the outbox at {_outbox.path}; "
+                  f"emails queued here are sent by it")
+        return _outbox.start()
+
+
+def read_recipients(path):
+    """Email addresses from a vCard/CSV address book or a file with one per line."""
+    if path.lower().endswith(('.vcf', '.vcard', '.csv')):
+        addresses = [email for _, _, email in read_contacts(path) if email]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            addresses = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    unique = {}
+    for address in addresses:
+        if re.fullmatch(r'[^\s@]+@[^\s@]+\.\w+', address):
+            unique.setdefault(address.lower(), address)
+    return list(unique.values())
+
+
+def transport_from_env():
+    """SMTPTransport configured from the same variables as the email skill."""
+    return SMTPTransport(os.getenv('SMTP_SERVER', 'smtp.gmail.com'), int(os.getenv('SMTP_PORT', '587')),
+                         os.getenv('SENDER_EMAIL', ''), os.getenv('SENDER_PASSWORD', ''),
+                         starttls=os.getenv('SMTP_STARTTLS', '1') != '0')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and drain the Tanu email outbox")
+    parser.add_argument('--db', default=os.getenv('TANU_OUTBOX', DEFAULT_PATH),
+                        help="database path (default: $TANU_OUTBOX or .cache/outbox.db)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help="count messages per state")
+    lst = sub.add_parser('list', help="show queued or failed messages")
+    lst.add_argument('--state', choices=STATES)
+    lst.add_argument('--limit', type=int, default=50)
+    sub.add_parser('retry', help="queue failed messages again")
+    bulk = sub.add_parser('bulk', help="queue one message to every address in a file")
+    bulk.add_argument('recipients', help="vCard/CSV address book, or one address per line")
+    bulk.add_argument('--subject', required=True)
+    bulk.add_argument('--body', required=True)
+    sub.add_parser('drain', help="send everything due now (SMTP settings from the environment)")
+    args = parser.parse_args(argv)
+
+    transport = transport_from_env()
+    # only drain takes the outbox over; the rest is safe next to a running Tanu
+    outbox = Outbox(transport, args.db, claim=args.command == 'drain')
+    if args.command == 'drain' and not outbox.owner:
+        print("[Outbox] Tanu is running and sends these messages itself", file=sys.stderr)
+        outbox.close()
+        sys.exit(1)
+    if args.command == 'status':
+        print('  '.join(f"{state} {count}" for state, count in outbox.stats().items()))
+    elif args.command == 'list':
+        for m in outbox.messages(args.state, limit=args.limit):
+            print(f"{m['id']:>6}  {m['state']:<8} {m['attempts']}  {m['recipient']}  {m['subject']}  {m['error']}")
+    elif args.command == 'retry':
+        print(f"[Outbox] {outbox.retry_failed()} messages queued again")
+    elif args.command == 'bulk':
+        if not transport.username:
+            print("[Outbox] set SENDER_EMAIL (and SENDER_PASSWORD) first", file=sys.stderr)
+            sys.exit(1)
+        recipients = read_recipients(args.recipients)
+        batch = outbox.enqueue(transport.username, recipients, args.subject, args.body)
+        print(f"[Outbox] {len(recipients)} messages queued as batch {batch}; "
+              f"Tanu sends them, or run: python -m skills._outbox drain")
+    else:
+        start = time.perf_counter()
+        sent = outbox.run_pending()
+        print(f"[Outbox] {sent} messages attempted in {time.perf_counter() - start:.1f}s; "
+              + '  '.join(f"{state} {count}" for state, count in outbox.stats().items()))
+    outbox.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import smtplib
+import threading
+import time
+
+# errors after which a pooled connection is considered dead (SMTPException
+# itself derives from OSError, so plain OSError can not be listed here)
+_DISCONNECTS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _Conn:
+    __slots__ = ('server', 'last_used')
+
+    def __init__(self, server):
+        self.server = server
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Pool of authenticated SMTP sessions shared by the email skill.
+
+    Sessions are opened (connect, STARTTLS, login) on demand and returned to
+    the pool after each send instead of being closed. Idle sessions are kept
+    warm with NOOP every ``keepalive`` seconds and closed after
+    ``idle_timeout`` seconds; a session the server dropped is reconnected
+    transparently on the next send.
+    """
+
+    def __init__(self, host, port, username='', password='', starttls=True,
+                 max_size=2, keepalive=30.0, idle_timeout=300.0, timeout=30.0,
+                 smtp_factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_size = max_size
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.smtp_factory = smtp_factory
+        self.stats = {'connects': 0, 'reconnects': 0, 'sent': 0, 'noops': 0, 'evicted': 0}
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reaper = None
+
+    def _connect(self):
+        server = self.smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()  # Enable encryption
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        self.stats['connects'] += 1
+        return _Conn(server)
+
+    def _quit(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                idle = time.monotonic() - conn.last_used
+                if idle >= self.idle_timeout:
+                    self._evict(conn)
+                    continue
+                if idle >= self.keepalive and not self._noop(conn):
+                    continue
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn, healthy=True):
+        try:
+            if healthy and not self._closed:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+                    self._start_reaper()
+            else:
+                self._quit(conn.server)
+        finally:
+            self._slots.release()
+
+    def _noop(self, conn):
+        """Probe an idle session; close it and return False if it is dead."""
+        try:
+            code, _ = conn.server.noop()
+            self.stats['noops'] += 1
+            if code == 250:
+                conn.last_used = time.monotonic()
+                return True
+        except (smtplib.SMTPException,) + _DISCONNECTS:
+            pass
+        self._quit(conn.server)
+        return False
+
+    def _evict(self, conn):
+        self.stats['evicted'] += 1
+        self._quit(conn.server)
+
+    def _sendmail(self, conn, from_addr, to_addrs, msg):
+        conn.server.sendmail(from_addr, to_addrs, msg)
+        self.stats['sent'] += 1
+
+    def send(self, from_addr, to_addrs, msg):
+        """Send one message over a pooled session."""
+        self.send_many([(from_addr, to_addrs, msg)], raise_errors=True)
+
+    def send_many(self, messages, raise_errors=False):
+        """Send consecutive messages over the same session.
+
+        ``messages`` is a list of (from_addr, to_addrs, msg) tuples. Returns a
+        list holding None for each delivered message and the exception for
+        each rejected one. A dropped connection is reopened once per message.
+        """
+        results = []
+        conn = self._checkout()
+        healthy = True
+        try:
+            for from_addr, to_addrs, msg in messages:
+                try:
+                    try:
+                        self._sendmail(conn, from_addr, to_addrs, msg)
+                    except _DISCONNECTS:
+                        self._quit(conn.server)
+                        conn = self._connect()
+                        self.stats['reconnects'] += 1
+                        self._sendmail(conn, from_addr, to_addrs, msg)
+                    results.append(None)
+                except smtplib.SMTPResponseException as e:
+                    # the session is still usable after a rejected message
+                    conn.server.rset()
+                    if raise_errors:
+                        raise
+                    results.append(e)
+                except smtplib.SMTPRecipientsRefused as e:
+                    if raise_errors:
+                        raise
+                    results.append(e)
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._checkin(conn, healthy)
+        return results
+
+    def evict_idle(self):
+        """Ping idle sessions due a keepalive and close expired ones."""
+        now = time.monotonic()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        keep = []
+        for conn in idle:
+            age = now - conn.last_used
+            if age >= self.idle_timeout:
+                self._evict(conn)
+            elif age < self.keepalive or self._noop(conn):
+                keep.append(conn)
+        with self._lock:
+            self._idle.extend(keep)
+            return len(self._idle)
+
+    def _start_reaper(self):
+        # called with self._lock held
+        if self._reaper is not None or not self.keepalive:
+            return
+        self._reaper = threading.Thread(target=self._reap, name='smtp-pool', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        # background keepalive; exits once no idle session is left
+        interval = max(1.0, min(self.keepalive, self.idle_timeout) / 2)
+        while True:
+            time.sleep(interval)
+            if not self._closed:
+                self.evict_idle()
+            with self._lock:
+                if self._closed or not self._idle:
+                    self._reaper = None
+                    return
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._quit(conn.server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, port, username='', password='', **kwargs):
+    """Return the shared pool for a server/account, creating it on first use."""
+    key = (host, port, username)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            pool = _pools[key] = SMTPPool(host, port, username, password, **kwargs)
+        return pool
@@ -0,0 +1,533 @@
+"""Offline full-text index used by the web search skill to answer locally.
+
+Documents (a Wikipedia abstracts dump, JSONL exports, a folder of text or
+Markdown notes) are read as a stream and indexed in blocks: postings are
+collected in memory until ``block_postings`` of them are buffered, then
+written as a sorted run to a temporary file. At the end the runs are
+merged into one postings file; docids only grow, so merging a term's
+blocks just re-encodes the first gap of each block and copies the rest.
+Postings are (docid gap, term frequency) varints.
+
+Queries memory-map the index: the lexicon is a sorted array of fixed-size
+records searched by bisection, postings are decoded straight from the map
+and documents are ranked with BM25. With NumPy installed a postings list
+is decoded and scored as whole arrays; without it, one posting at a time.
+Results carry a snippet, the window of the document with the most query
+words.
+
+    python -m skills._text_index build wiki_index enwiki-latest-abstract.xml.gz
+    python -m skills._text_index query wiki_index "alan turing"
+
+The skill reads the index at $TANU_SEARCH_INDEX.
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+
+from skills._numpy import load_numpy
+
+# NumPy, bound from load_numpy() when an index is opened; None when missing
+np = None
+
+INDEX_VERSION = 1
+
+# lexicon record: term offset, term length, postings offset, postings length, df
+_LEXICON = struct.Struct('<QIQII')
+# docs.idx record: offset in docs.bin, record length
+_DOC = struct.Struct('<QI')
+# run file record header: term length, df, first docid, last docid, payload length
+_RUN = struct.Struct('<HIIII')
+
+_TOKEN = re.compile(r'\w+')
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his how i if in is it its me my of on or our
+she so that the their them there these they this to was we were what when where which who why will
+with you your about into than then also can could would should do does did not no yes
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens, minus stopwords and single characters."""
+    return [t for t in _TOKEN.findall(text.casefold())
+            if len(t) > 1 and t not in STOPWORDS and len(t) <= 64]
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def decode_postings(buf, pos, count):
+    """[(docid, tf)] of a postings list starting at buf[pos]."""
+    out = []
+    doc = 0
+    for _ in range(count):
+        gap, pos = _get_varint(buf, pos)
+        tf, pos = _get_varint(buf, pos)
+        doc += gap
+        out.append((doc, tf))
+    return out
+
+
+def decode_postings_array(buf, pos, length):
+    """(docids, tfs) NumPy arrays of the postings list in buf[pos:pos + length]."""
+    raw = np.frombuffer(buf, dtype=np.uint8, count=length, offset=pos)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # each byte's 7-bit payload shifted by its place within its varint
+    place = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    values = np.add.reduceat((raw & 0x7F).astype(np.int64) << (7 * place), starts)
+    return np.cumsum(values[0::2]), values[1::2]
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def read_documents(path):
+    """Stream {'title', 'text', 'url'} documents from a file or folder.
+
+    Understands Wikipedia abstract dumps (.xml), JSONL with title and
+    text/abstract/body fields, and plain text or Markdown files (one
+    document per file, titled by its first line); any of them gzipped.
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fname in sorted(files):
+                if fname.endswith(('.txt', '.md', '.jsonl', '.xml', '.gz')):
+                    yield from read_documents(os.path.join(root, fname))
+        return
+    base = path[:-3] if path.endswith('.gz') else path
+    if base.endswith('.xml'):
+        with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag == 'doc':
+                    title = (elem.findtext('title') or '').removeprefix('Wikipedia: ')
+                    text = elem.findtext('abstract') or ''
+                    if title and text:
+                        yield {'title': title, 'text': text, 'url': elem.findtext('url') or ''}
+                    elem.clear()
+    elif base.endswith('.jsonl'):
+        with _open_text(path) as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                text = obj.get('text') or obj.get('abstract') or obj.get('body') or ''
+                if text:
+                    yield {'title': obj.get('title') or '', 'text': text, 'url': obj.get('url') or ''}
+    else:
+        with _open_text(path) as f:
+            text = f.read()
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if lines:
+            title = lines[0].lstrip('#').strip()
+            yield {'title': title, 'text': ' '.join(lines[1:]) or title, 'url': os.path.abspath(path)}
+
+
+class TextIndexWriter:
+    """Builds an index folder from a stream of documents.
+
+    Memory is bounded by ``block_postings``: full blocks are spilled to
+    sorted run files and merged by close(), which also swaps the finished
+    index into place so readers never see a partial one.
+    """
+
+    def __init__(self, directory, block_postings=2_000_000):
+        self.directory = directory
+        self.block_postings = block_postings
+        self._tmp = directory.rstrip(os.sep) + '.building'
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp)
+        self._docs = open(os.path.join(self._tmp, 'docs.bin'), 'wb')
+        self._doc_index = open(os.path.join(self._tmp, 'docs.idx'), 'wb')
+        self._lengths = open(os.path.join(self._tmp, 'doclens.bin'), 'wb')
+        self._runs = []
+        self._block = {}
+        self._buffered = 0
+        self.documents = 0
+        self.total_tokens = 0
+
+    def add(self, title, text, url=''):
+        tokens = tokenize(title + ' ' + text)
+        doc = self.documents
+        record = json.dumps({'title': title, 'text': text, 'url': url}, ensure_ascii=False).encode('utf-8')
+        self._doc_index.write(_DOC.pack(self._docs.tell(), len(record)))
+        self._docs.write(record)
+        self._lengths.write(struct.pack('<I', len(tokens)))
+        counts = Counter(tokens)
+        block = self._block
+        for term, tf in counts.items():
+            # [first docid, last docid, count, encoded (tf, gap, tf, ...)]
+            entry = block.get(term)
+            if entry is None:
+                payload = bytearray()
+                _put_varint(payload, tf)
+                block[term] = [doc, doc, 1, payload]
+                continue
+            payload = entry[3]
+            gap = doc - entry[1]
+            if gap < 0x80 and tf < 0x80:
+                payload.append(gap)
+                payload.append(tf)
+            else:
+                _put_varint(payload, gap)
+                _put_varint(payload, tf)
+            entry[1] = doc
+            entry[2] += 1
+        self._buffered += len(counts)
+        self.documents += 1
+        self.total_tokens += len(tokens)
+        if self._buffered >= self.block_postings:
+            self._spill()
+        return doc
+
+    def add_many(self, docs):
+        for doc in docs:
+            self.add(doc.get('title', ''), doc.get('text', ''), doc.get('url', ''))
+
+    def _spill(self):
+        """Write the buffered block as a sorted run file."""
+        if not self._block:
+            return
+        fd, path = tempfile.mkstemp(suffix='.run', dir=self._tmp)
+        with os.fdopen(fd, 'wb') as f:
+            for term in sorted(self._block):
+                # the first docid is kept in the header so the merge can rebase it
+                first, last, count, payload = self._block[term]
+                key = term.encode('utf-8')
+                f.write(_RUN.pack(len(key), count, first, last, len(payload)))
+                f.write(key)
+                f.write(payload)
+        self._runs.append(path)
+        self._block = {}
+        self._buffered = 0
+
+    @staticmethod
+    def _read_run(path, run):
+        """Yield (term, run, count, first doc, last doc, payload) from a run file."""
+        with open(path, 'rb', buffering=1 << 20) as f:
+            while True:
+                header = f.read(_RUN.size)
+                if len(header) < _RUN.size:
+                    return
+                size, count, first, last, length = _RUN.unpack(header)
+                term = f.read(size)
+                yield term, run, count, first, last, f.read(length)
+
+    def close(self):
+        """Merge the runs into the final postings and lexicon, then publish the index."""
+        self._spill()
+        self._docs.close()
+        self._doc_index.close()
+        self._lengths.close()
+        tmp = self._tmp
+        terms = 0
+        with open(os.path.join(tmp, 'postings.bin'), 'wb') as postings, \
+                open(os.path.join(tmp, 'terms.bin'), 'wb') as term_file, \
+                open(os.path.join(tmp, 'lexicon.bin'), 'wb') as lexicon:
+            merged = heapq.merge(*(self._read_run(path, i) for i, path in enumerate(self._runs)))
+            current, out, df, last = None, bytearray(), 0, 0
+
+            def flush():
+                lexicon.write(_LEXICON.pack(term_file.tell(), len(current), postings.tell(), len(out), df))
+                term_file.write(current)
+                postings.write(out)
+
+            for term, _, count, first, block_last, payload in merged:
+                if term != current:
+                    if current is not None:
+                        flush()
+                        terms += 1
+                    current, out, df, last = term, bytearray(), 0, 0
+                # runs hold increasing docids: only the first gap of a block changes
+                _put_varint(out, first - last)
+                out += payload
+                df += count
+                last = block_last
+            if current is not None:
+                flush()
+                terms += 1
+        for path in self._runs:
+            os.remove(path)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'documents': self.documents, 'terms': terms,
+                       'total_tokens': self.total_tokens}, f)
+        old = self.directory.rstrip(os.sep) + '.old'
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(self.directory):
+            os.replace(self.directory, old)
+        os.replace(tmp, self.directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return self.documents
+
+
+def build_index(directory, paths, block_postings=2_000_000):
+    """Index every document under paths into directory; returns the document count."""
+    writer = TextIndexWriter(directory, block_postings)
+    for path in paths:
+        writer.add_many(read_documents(path))
+    return writer.close()
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class TextIndex:
+    """Read side of an index folder; every file is memory-mapped."""
+
+    def __init__(self, directory):
+        global np
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"unsupported index version in {directory}")
+        self.documents = meta['documents']
+        self.terms = meta['terms']
+        self.avgdl = meta['total_tokens'] / self.documents if self.documents else 0.0
+        self._lexicon = _map(os.path.join(directory, 'lexicon.bin'))
+        self._term_bytes = _map(os.path.join(directory, 'terms.bin'))
+        self._postings = _map(os.path.join(directory, 'postings.bin'))
+        self._doc_index = _map(os.path.join(directory, 'docs.idx'))
+        self._docs = _map(os.path.join(directory, 'docs.bin'))
+        # document lengths in tokens, indexed by docid
+        lengths = _map(os.path.join(directory, 'doclens.bin'))
+        np = load_numpy()
+        if np is not None:
+            self._lengths = np.frombuffer(lengths, dtype='<u4')
+        elif sys.byteorder == 'little':
+            self._lengths = memoryview(lengths).cast('I')
+        else:
+            self._lengths = array('I', lengths)
+            self._lengths.byteswap()
+        self._maps = [self._lexicon, self._term_bytes, self._postings, self._doc_index, self._docs, lengths]
+
+    def __len__(self):
+        return self.documents
+
+    def close(self):
+        if isinstance(self._lengths, memoryview):
+            self._lengths.release()
+        self._lengths = None
+        for m in self._maps:
+            if isinstance(m, mmap.mmap):
+                try:
+                    m.close()
+                except BufferError:
+                    # a NumPy view is still alive; the map closes with it
+                    pass
+
+    def _term(self, i):
+        toff, tlen, _, _, _ = _LEXICON.unpack_from(self._lexicon, i * _LEXICON.size)
+        return self._term_bytes[toff:toff + tlen]
+
+    def lookup(self, term):
+        """(postings offset, byte length, df) of a term, or None."""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.terms and self._term(lo) == key:
+            return _LEXICON.unpack_from(self._lexicon, lo * _LEXICON.size)[2:]
+        return None
+
+    def postings(self, term):
+        """[(docid, tf)] for a term."""
+        entry = self.lookup(term)
+        if entry is None:
+            return []
+        offset, _, df = entry
+        return decode_postings(self._postings, offset, df)
+
+    def document(self, doc):
+        offset, length = _DOC.unpack_from(self._doc_index, doc * _DOC.size)
+        return json.loads(self._docs[offset:offset + length])
+
+    def _idf(self, df):
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+    def search(self, query, limit=5, k1=1.2, b=0.75):
+        """Best documents for query as dicts with title, url, snippet, score and coverage.
+
+        coverage is the idf-weighted share of the query words the document
+        contains (1.0 = all of them), a scale-free measure of a good hit.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.documents:
+            return []
+        found, total = [], 0.0
+        for term in terms:
+            entry = self.lookup(term)
+            idf = self._idf(entry[2] if entry else 0)
+            total += idf
+            if entry is not None:
+                found.append((idf, entry))
+        if not found:
+            return []
+        norm = (k1 * (1 - b), k1 * b / self.avgdl)
+        rank = self._rank_arrays if np is not None else self._rank_postings
+        results = []
+        for doc, score, matched in rank(found, limit, k1, norm):
+            record = self.document(doc)
+            results.append({
+                'title': record['title'],
+                'url': record['url'],
+                'snippet': snippet(record['text'], terms),
+                'score': score,
+                'coverage': matched / total,
+            })
+        return results
+
+    def _rank_postings(self, found, limit, k1, norm):
+        """Top (docid, score, matched idf) one posting at a time."""
+        scores, matched = {}, {}
+        lengths = self._lengths
+        for idf, (offset, _, df) in found:
+            for doc, tf in decode_postings(self._postings, offset, df):
+                score = idf * tf * (k1 + 1) / (tf + norm[0] + norm[1] * lengths[doc])
+                scores[doc] = scores.get(doc, 0.0) + score
+                matched[doc] = matched.get(doc, 0.0) + idf
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [(doc, score, matched[doc]) for doc, score in top]
+
+    def _rank_arrays(self, found, limit, k1, norm):
+        """Top (docid, score, matched idf) with each postings list scored as arrays."""
+        docs, scores, weights = [], [], []
+        for idf, (offset, length, _) in found:
+            ids, tfs = decode_postings_array(self._postings, offset, length)
+            scores.append(idf * tfs * (k1 + 1) / (tfs + norm[0] + norm[1] * self._lengths[ids]))
+            docs.append(ids)
+            weights.append(np.full(len(ids), idf))
+        if len(docs) == 1:
+            docs, scores, matched = docs[0], scores[0], weights[0]
+        else:
+            docs, slot = np.unique(np.concatenate(docs), return_inverse=True)
+            matched = np.bincount(slot, weights=np.concatenate(weights))
+            scores = np.bincount(slot, weights=np.concatenate(scores))
+        k = min(limit, len(docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # best first, ties to the lower docid like the pure-Python path
+        top = top[np.lexsort((docs[top], -scores[top]))]
+        return [(int(docs[i]), float(scores[i]), float(matched[i])) for i in top]
+
+
+def snippet(text, terms, width=40):
+    """The width-word window of text containing the most query terms."""
+    words = text.split()
+    if len(words) <= width:
+        return text
+    wanted = set(terms)
+    hits = [1 if set(tokenize(w)) & wanted else 0 for w in words]
+    best, best_start, window = -1, 0, sum(hits[:width])
+    for start in range(len(words) - width + 1):
+        if start:
+            window += hits[start + width - 1] - hits[start - 1]
+        if window > best:
+            best, best_start = window, start
+    out = ' '.join(words[best_start:best_start + width])
+    if best_start:
+        out = '… ' + out
+    if best_start + width < len(words):
+        out += ' …'
+    return out
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Shared TextIndex at $TANU_SEARCH_INDEX, reopened after a rebuild; None if there is none."""
+    global _index, _index_key
+    directory = os.getenv('TANU_SEARCH_INDEX')
+    if not directory:
+        return None
+    try:
+        key = (directory, os.stat(os.path.join(directory, 'meta.json')).st_mtime_ns)
+    except OSError:
+        return None
+    with _index_lock:
+        if _index_key != key:
+            try:
+                index = TextIndex(directory)
+            except (OSError, ValueError) as e:
+                print(f"[Warning] could not open search index {directory}: {e}")
+                return None
+            # the previous maps stay valid for searches already running on them
+            _index, _index_key = index, key
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a Tanu offline search index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="index documents (.xml abstracts, .jsonl, .txt/.md, folders)")
+    build.add_argument('index')
+    build.add_argument('inputs', nargs='+')
+    build.add_argument('--block-postings', type=int, default=2_000_000,
+                       help="postings buffered in memory before spilling a block (default: 2000000)")
+    query = sub.add_parser('query', help="show the best matches for a query")
+    query.add_argument('index')
+    query.add_argument('text')
+    query.add_argument('--limit', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_index(args.index, args.inputs, args.block_postings)
+        print(f"[Search] indexed {count} documents into {args.index}")
+        return
+    try:
+        index = TextIndex(args.index)
+    except (OSError, ValueError) as e:
+        print(f"[Search] cannot open {args.index}: {e}", file=sys.stderr)
+        sys.exit(1)
+    for hit in index.search(args.text, args.limit):
+        print(f"{hit['score']:6.2f}  {hit['coverage']:.2f}  {hit['title']}  {hit['url']}")
+        print(f"        {hit['snippet']}")
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Spoken YouTube query -> resolved video URL, kept across restarts.
+
+Playing "shape of you" used to fetch a YouTube results page on every
+request just to find the first video. The YouTube skill now asks this
+cache first: queries are keyed after case-folding and collapsing spaces,
+hits open the stored URL straight away, and only misses go to the
+resolver (pywhatkit by default, or any ``module:function`` named in
+$TANU_YOUTUBE_RESOLVER, e.g. a local stub). Entries are evicted least
+recently used first and expire after 30 days, since the top result for a
+query drifts. Every play is appended to a history file, so the queries
+played most can be resolved ahead of time:
+
+    python -m skills._video_cache warm --top 50
+    python -m skills._video_cache list
+    python -m skills._video_cache lookup "shape of you"
+
+The cache lives at $TANU_YOUTUBE_CACHE (default .cache/youtube_cache.json;
+empty keeps it in memory) and the history at $TANU_YOUTUBE_HISTORY
+(default .cache/youtube_history.tsv; empty keeps none).
+"""
+import argparse
+import importlib
+import os
+import threading
+import time
+from collections import Counter
+
+from skills._cache import LRUCache
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+DEFAULT_PATH = os.path.join(_CACHE_DIR, 'youtube_cache.json')
+HISTORY_PATH = os.path.join(_CACHE_DIR, 'youtube_history.tsv')
+
+DEFAULT_SIZE = 1000
+DEFAULT_TTL = 30 * 24 * 3600
+# plays read back from the history file when warming
+HISTORY_LIMIT = 10000
+
+# bumped when the stored format changes; older files are ignored
+_META = {'version': 1}
+
+
+def normalize(query):
+    """Cache key for a query: case-folded with whitespace collapsed."""
+    return ' '.join(query.casefold().split())
+
+
+def pywhatkit_resolver(query):
+    """URL of the first video for query, via pywhatkit's results-page lookup."""
+    import pywhatkit as pwt
+    return pwt.playonyt(query, open_video=False)
+
+
+def resolver_from_env():
+    """The resolver named in $TANU_YOUTUBE_RESOLVER ("module:function"), else pywhatkit."""
+    spec = os.getenv('TANU_YOUTUBE_RESOLVER', '')
+    if not spec:
+        return pywhatkit_resolver
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name or 'resolve')
+
+
+class VideoCache:
+    """Normalized query -> video URL with LRU/TTL eviction and JSON persistence.
+
+    ``resolver(query)`` returns the URL for a miss and may raise; failures
+    are not cached. ``record`` appends a play to the history that ``warm``
+    reads back.
+    """
+
+    def __init__(self, resolver=None, path=DEFAULT_PATH, history_path=HISTORY_PATH,
+                 max_size=DEFAULT_SIZE, ttl=DEFAULT_TTL, clock=time.time):
+        self.resolver = resolver or pywhatkit_resolver
+        self.history_path = history_path
+        self.clock = clock
+        self.resolver_calls = 0
+        self.resolver_seconds = 0.0
+        self._cache = LRUCache(max_size, ttl, path, clock)
+        self._cache.load(_META)
+        self._history_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, query):
+        return normalize(query) in self._cache
+
+    def get(self, query):
+        """Cached URL for query, or None."""
+        return self._cache.get(normalize(query))
+
+    def resolve(self, query):
+        """Return (url, hit); a miss calls the resolver and stores its answer."""
+        key = normalize(query)
+        url = self._cache.get(key)
+        if url is not None:
+            return url, True
+        start = time.perf_counter()
+        try:
+            url = self.resolver(query)
+        finally:
+            self.resolver_calls += 1
+            self.resolver_seconds += time.perf_counter() - start
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise ValueError(f"resolver returned no video URL for {query!r}: {url!r}")
+        self._cache.put(key, url)
+        self._cache.save(_META)
+        return url, False
+
+    def put(self, query, url):
+        self._cache.put(normalize(query), url)
+        self._cache.save(_META)
+
+    def forget(self, query):
+        """Drop query, e.g. when its video turned out to be gone."""
+        if self._cache.pop(normalize(query)) is not None:
+            self._cache.save(_META)
+
+    def clear(self):
+        self._cache.clear()
+        self._cache.save(_META)
+
+    def record(self, query):
+        """Append a play of query to the history file."""
+        if not self.history_path:
+            return
+        line = f"{int(self.clock())}\t{' '.join(query.split())}\n"
+        try:
+            with self._history_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.history_path)), exist_ok=True)
+                with open(self.history_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            print(f"[Warning] could not record play history {self.history_path}: {e}")
+
+    def most_played(self, top=None):
+        """[(query, plays), ...] from the history, most played first.
+
+        Queries that differ only in case or spacing count as one, shown as
+        last spoken.
+        """
+        if not self.history_path:
+            return []
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()[-HISTORY_LIMIT:]
+        except OSError:
+            return []
+        plays, spoken = Counter(), {}
+        for line in lines:
+            _, _, query = line.rstrip('\n').partition('\t')
+            if query:
+                plays[normalize(query)] += 1
+                spoken[normalize(query)] = query
+        return [(spoken[key], n) for key, n in plays.most_common(top)]
+
+    def warm(self, queries=None, top=50):
+        """Resolve queries not cached yet (default: the top most played).
+
+        Returns (resolved, failed) counts; failures are reported and skipped.
+        """
+        if queries is None:
+            queries = [query for query, _ in self.most_played(top)]
+        resolved = failed = 0
+        for query in queries:
+            if query in self:
+                continue
+            try:
+                self.resolve(query)
+                resolved += 1
+            except Exception as e:
+                failed += 1
+                print(f"[Warning] could not resolve {query!r}: {e}")
+        return resolved, failed
+
+    def entries(self):
+        """[(query key, url), ...] of live entries, least recently used first."""
+        return self._cache.items()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['resolver_calls'] = self.resolver_calls
+        stats['resolver_seconds'] = self.resolver_seconds
+        return stats
+
+
+_video_cache = None
+_video_cache_lock = threading.Lock()
+
+
+def get_video_cache():
+    """Shared VideoCache at $TANU_YOUTUBE_CACHE, using the resolver from the environment."""
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None:
+            _video_cache = VideoCache(resolver_from_env(), os.getenv('TANU_YOUTUBE_CACHE', DEFAULT_PATH),
+                                      os.getenv('TANU_YOUTUBE_HISTORY', HISTORY_PATH))
+        return _video_cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and pre-warm the Tanu YouTube cache")
+    parser.add_argument('--cache', default=os.getenv('TANU_YOUTUBE_CACHE', DEFAULT_PATH),
+                        help="cache path (default: $TANU_YOUTUBE_CACHE or .cache/youtube_cache.json)")
+    parser.add_argument('--history', default=os.getenv('TANU_YOUTUBE_HISTORY', HISTORY_PATH),
+                        help="play history (default: $TANU_YOUTUBE_HISTORY or .cache/youtube_history.tsv)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    warm = sub.add_parser('warm', help="resolve the most played (or the given) queries ahead of time")
+    warm.add_argument('queries', nargs='*')
+    warm.add_argument('--top', type=int, default=50)
+    sub.add_parser('list', help="show cached queries, most recently used first")
+    sub.add_parser('history', help="show the most played queries")
+    lookup = sub.add_parser('lookup', help="resolve one query (cached or not)")
+    lookup.add_argument('query')
+    sub.add_parser('clear', help="forget every cached URL")
+    args = parser.parse_args(argv)
+
+    cache = VideoCache(resolver_from_env(), args.cache, args.history)
+    if args.command == 'warm':
+        start = time.perf_counter()
+        resolved, failed = cache.warm(args.queries or None, args.top)
+        print(f"[YouTube] {resolved} queries resolved, {failed} failed in "
+              f"{time.perf_counter() - start:.1f}s; {len(cache)} cached")
+    elif args.command == 'list':
+        for key, url in reversed(cache.entries()):
+            print(f"{key:<40} {url}")
+    elif args.command == 'history':
+        for query, plays in cache.most_played(50):
+            print(f"{plays:>5}  {query}{'' if query in cache else '  (not cached)'}")
+    elif args.command == 'lookup':
+        start = time.perf_counter()
+        url, hit = cache.resolve(args.query)
+        print(f"{url}  ({'cached' if hit else 'resolved'} in {(time.perf_counter() - start) * 1e3:.1f} ms)")
+    else:
+        cache.clear()
+        print("[YouTube] cache cleared")
+
+
+if __name__ == '__main__':
+    main()
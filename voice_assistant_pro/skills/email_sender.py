@@ -1,14 +1,47 @@
-import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
+import re
+
+from skills._contacts import get_store
+from skills._grammar import SlotGrammar
+from skills._outbox import SMTPTransport, get_outbox
+
+# emails wait here until sent, across restarts; TANU_OUTBOX overrides it
+# (set it empty to keep the outbox in memory only)
+OUTBOX_PATH = os.getenv('TANU_OUTBOX', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'outbox.db'))
+
+# recipient address as spoken in a command
+ADDRESS = r'[^\s@]+@[^\s@]+\.\w+'
+# one or more addresses: "a@x.com, b@y.com and c@z.com"
+ADDRESSES = ADDRESS + r'(?:\s*,\s*' + ADDRESS + r'|\s*,?\s+and\s+' + ADDRESS + r')*'
+# recipient contact name; only used before an explicit "subject"/"about"
+NAME = r'[^@]+?'
 
 class EmailSenderSkill:
     intent_phrases = [
         'send email', 'email', 'send mail', 'mail', 'email to', 'send email to'
     ]
+    # the body is free text: in a compound command it runs to the end
+    free_text_slots = ('body',)
     
+    # Command templates, most specific first; compiled once for all instances
+    grammar = SlotGrammar([
+        # "send email to [email] subject [subject] message [body]"
+        ('subject_message', r'send\s+email\s+to\s+(?P<recipient>' + ADDRESSES + r')\s+subject\s+(?P<subject>.+?)\s+message\s+(?P<body>.+)$'),
+        # "email to [email] subject [subject] [body]"
+        ('subject', r'email\s+to\s+(?P<recipient>' + ADDRESSES + r')\s+subject\s+(?P<subject>.+?)\s+(?P<body>.+)$'),
+        # "send mail to [email] [subject] [body]" - simpler format
+        ('mail_to', r'send\s+mail\s+to\s+(?P<recipient>' + ADDRESSES + r')\s+(?P<subject>.+?)\s+(?P<body>.+)$'),
+        # "send email to [email] about [subject] [body]"
+        ('about', r'send\s+email\s+to\s+(?P<recipient>' + ADDRESSES + r')\s+about\s+(?P<subject>.+?)\s+(?P<body>.+)$'),
+        # More flexible - "email [email] [subject] [body]"
+        ('free_form', r'email\s+(?P<recipient>' + ADDRESSES + r')\s+(?P<remaining>.+)$'),
+        # The same with a contact name instead of an address
+        ('name_subject_message', r'send\s+e?mail\s+to\s+(?P<recipient>' + NAME + r')\s+subject\s+(?P<subject>.+?)\s+message\s+(?P<body>.+)$'),
+        ('name_subject', r'e?mail\s+to\s+(?P<recipient>' + NAME + r')\s+subject\s+(?P<subject>.+?)\s+(?P<body>.+)$'),
+        ('name_about', r'e?mail\s+to\s+(?P<recipient>' + NAME + r')\s+about\s+(?P<subject>.+?)\s+(?P<body>.+)$'),
+    ])
+
     def __init__(self):
         # You can set these via environment variables or configuration
         # For Gmail, you'll need an App Password (not regular password)
@@ -16,61 +49,50 @@ class EmailSenderSkill:
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.sender_email = os.getenv('SENDER_EMAIL', '')
         self.sender_password = os.getenv('SENDER_PASSWORD', '')
+        self.smtp_starttls = os.getenv('SMTP_STARTTLS', '1') != '0'
+    
+    def outbox(self, resume=False):
+        """Return the shared outgoing email queue (sends in the background)."""
+        transport = SMTPTransport(self.smtp_server, self.smtp_port, self.sender_email,
+                                  self.sender_password, starttls=self.smtp_starttls)
+        return get_outbox(transport, OUTBOX_PATH, resume=resume, on_result=self.report_delivery)
+
+    def resume(self):
+        """Send whatever was still queued when Tanu last stopped (interactive runs only)."""
+        if self.sender_email and self.sender_password:
+            self.outbox(resume=True)
+    
+    @staticmethod
+    def report_delivery(message, error):
+        """Outbox callback: runs on the outbox thread once a message is done."""
+        if error is None:
+            print(f"[Email] Sent to {message['recipient']}: {message['subject']}")
+        else:
+            print(f"[Email Error] Could not send to {message['recipient']} "
+                  f"after {message['attempts']} attempts: {error}")
     
     def extract_email_details(self, text):
         """Extract recipient, subject, and body from voice command."""
-        text_l = text.lower().strip()
-        
-        # Pattern 1: "send email to [email] subject [subject] message [body]"
-        pattern1 = r'send\s+email\s+to\s+([^\s@]+@[^\s@]+\.\w+)\s+subject\s+(.+?)\s+message\s+(.+)$'
-        match1 = re.search(pattern1, text_l)
-        if match1:
-            recipient = match1.group(1).strip()
-            subject = match1.group(2).strip()
-            body = match1.group(3).strip()
-            return recipient, subject, body
-        
-        # Pattern 2: "email to [email] subject [subject] [body]"
-        pattern2 = r'email\s+to\s+([^\s@]+@[^\s@]+\.\w+)\s+subject\s+(.+?)\s+(.+)$'
-        match2 = re.search(pattern2, text_l)
-        if match2:
-            recipient = match2.group(1).strip()
-            subject = match2.group(2).strip()
-            body = match2.group(3).strip()
-            return recipient, subject, body
-        
-        # Pattern 3: "send mail to [email] [subject] [body]" - simpler format
-        pattern3 = r'send\s+mail\s+to\s+([^\s@]+@[^\s@]+\.\w+)\s+(.+?)\s+(.+)$'
-        match3 = re.search(pattern3, text_l)
-        if match3:
-            recipient = match3.group(1).strip()
+        template, slots = self.grammar.match(text)
+        if template is None:
+            return None, None, None
+
+        recipient = slots['recipient']
+        if template == 'mail_to':
             # Try to split subject and body (subject is usually shorter)
-            remaining = match3.group(2).strip()
+            remaining = slots['subject']
             # Assume first few words are subject, rest is body
             parts = remaining.split(' ', 1)
             if len(parts) == 2:
                 subject = parts[0]
-                body = parts[1] + ' ' + match3.group(3).strip()
+                body = parts[1] + ' ' + slots['body']
             else:
                 subject = remaining
-                body = match3.group(3).strip()
-            return recipient, subject, body
-        
-        # Pattern 4: "send email to [email] about [subject] [body]"
-        pattern4 = r'send\s+email\s+to\s+([^\s@]+@[^\s@]+\.\w+)\s+about\s+(.+?)\s+(.+)$'
-        match4 = re.search(pattern4, text_l)
-        if match4:
-            recipient = match4.group(1).strip()
-            subject = match4.group(2).strip()
-            body = match4.group(3).strip()
+                body = slots['body']
             return recipient, subject, body
-        
-        # Pattern 5: More flexible - "email [email] [subject] [body]"
-        pattern5 = r'email\s+([^\s@]+@[^\s@]+\.\w+)\s+(.+)$'
-        match5 = re.search(pattern5, text_l)
-        if match5:
-            recipient = match5.group(1).strip()
-            remaining = match5.group(2).strip()
+
+        if template == 'free_form':
+            remaining = slots['remaining']
             # Try to extract subject (first few words) and body
             words = remaining.split()
             if len(words) > 1:
@@ -82,35 +104,71 @@ class EmailSenderSkill:
                 subject = remaining
                 body = "No message body provided"
             return recipient, subject, body
-        
-        return None, None, None
+
+        return recipient, slots['subject'], slots['body']
     
-    def send_email(self, recipient, subject, body):
-        """Send email using SMTP."""
+    def queue_email(self, recipients, subject, body):
+        """Queue an email to each recipient; it is sent in the background."""
         if not self.sender_email or not self.sender_password:
             return False, "Email credentials not configured. Please set SENDER_EMAIL and SENDER_PASSWORD environment variables."
-        
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = recipient
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Connect to SMTP server and send
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()  # Enable encryption
-            server.login(self.sender_email, self.sender_password)
-            text = msg.as_string()
-            server.sendmail(self.sender_email, recipient, text)
-            server.quit()
-            
-            return True, f"Email sent successfully to {recipient}"
-        except smtplib.SMTPAuthenticationError:
-            return False, "Authentication failed. Check your email and password (use App Password for Gmail)."
+            self.outbox().enqueue(self.sender_email, recipients, subject, body)
+            return True, f"Email queued for {', '.join(recipients)}"
         except Exception as e:
-            return False, f"Error sending email: {str(e)}"
+            return False, f"Error queueing email: {str(e)}"
+    
+    def resolve_recipients(self, recipient):
+        """Turn "a@x.com and John" into email addresses, or None if a name is unknown."""
+        store = get_store()
+        for names in (re.split(r'\s*,\s*|\s+and\s+', recipient), [recipient]):
+            addresses = []
+            for name in names:
+                if '@' not in name:
+                    # a spoken name: use the email address of the closest contact
+                    match = store.resolve(name, field='email') if store is not None else None
+                    if match is None:
+                        break
+                    name = match['email']
+                addresses.append(name)
+            else:
+                return addresses
+        return None
+    
+    def parse_intent(self, text):
+        """Return {'recipients', 'subject', 'body'} (or {'status': True}) for the command, or None."""
+        if re.fullmatch(r'\s*e?mail\s+(?:status|outbox)\s*', text, re.IGNORECASE):
+            return {'status': True}
+        recipient, subject, body = self.extract_email_details(text)
+        if not (recipient and subject and body):
+            return None
+        recipients = self.resolve_recipients(recipient)
+        if not recipients:
+            return None
+        return {'recipients': recipients, 'subject': subject, 'body': body}
+    
+    def report_status(self):
+        stats = self.outbox().stats()
+        print(f"[Email] {stats['queued'] + stats['sending']} waiting, {stats['sent']} sent, "
+              f"{stats['failed']} failed")
+        for message in self.outbox().messages('failed', limit=5):
+            print(f"  - {message['recipient']} ({message['subject']}): {message['error']}")
+        return True
+    
+    def run_intent(self, slots):
+        if slots.get('status'):
+            return self.report_status()
+        recipients, subject, body = slots['recipients'], slots['subject'], slots['body']
+        success, result_msg = self.queue_email(recipients, subject, body)
+        
+        if success:
+            print(f"[Email] {result_msg}")
+            print(f"[Subject]: {subject}")
+            print(f"[Body]: {body}")
+        else:
+            print(f"[Email Error] {result_msg}")
+            print("[Note: For Gmail, use App Password, not regular password]")
+            print("[Set environment variables: SENDER_EMAIL and SENDER_PASSWORD]")
+        return success
     
     def handle_intent(self, text):
         text_l = text.lower()
@@ -120,21 +178,9 @@ class EmailSenderSkill:
             return False
         
         # Extract recipient, subject, and body
-        recipient, subject, body = self.extract_email_details(text)
-        
-        if recipient and subject and body:
-            success, result_msg = self.send_email(recipient, subject, body)
-            
-            if success:
-                print(f"[Email] {result_msg}")
-                print(f"[To]: {recipient}")
-                print(f"[Subject]: {subject}")
-                print(f"[Body]: {body}")
-            else:
-                print(f"[Email Error] {result_msg}")
-                print("[Note: For Gmail, use App Password, not regular password]")
-                print("[Set environment variables: SENDER_EMAIL and SENDER_PASSWORD]")
-            return success
+        slots = self.parse_intent(text)
+        if slots:
+            return self.run_intent(slots)
         
         # If we couldn't parse, provide helpful message
         print("[Email] Could not parse recipient, subject, and message body.")
@@ -142,6 +188,7 @@ class EmailSenderSkill:
         print("  - 'send email to user@example.com subject meeting message let's meet tomorrow'")
         print("  - 'email to friend@email.com about project status the project is complete'")
         print("  - 'send mail to john@test.com urgent reminder check your inbox'")
+        print("  - 'send email to ann@test.com and bob@test.com subject lunch message noon today'")
         return False
 
 def register_skill():
@@ -1,30 +1,53 @@
+import os
+import re
 import subprocess
 
+from skills._app_index import VERBS, get_index
+
+_VERB = re.compile(r'\b(?:%s)\s+(?:the\s+|up\s+)?(?P<name>.+)' % '|'.join(VERBS + ('run',)))
+
 class OpenAppSkill:
-    intent_phrases = [
-        'open notepad', 'open calculator', 'launch paint', 'open chrome', 'open edge', 'open firefox', 'open whatsapp', 'launch spotify', 'open word', 'open excel', 'open powerpoint'
-    ]
-    app_map = {
-        'notepad': 'notepad.exe',
-        'calculator': 'calc.exe',
-        'paint': 'mspaint.exe',
-        'chrome': 'chrome.exe',
-        'edge': 'msedge.exe',
-        'firefox': 'firefox.exe',
-        'whatsapp': r'C:\\Users\\%USERNAME%\\AppData\\Local\\WhatsApp\\WhatsApp.exe',
-        'spotify': r'C:\\Users\\%USERNAME%\\AppData\\Roaming\\Spotify\\Spotify.exe',
-        'word': r'C:\\Program Files\\Microsoft Office\\root\\Office16\\WINWORD.EXE',
-        'excel': r'C:\\Program Files\\Microsoft Office\\root\\Office16\\EXCEL.EXE',
-        'powerpoint': r'C:\\Program Files\\Microsoft Office\\root\\Office16\\POWERPNT.EXE',
-    }
+    # starts a process without waiting for it, so it may run alongside other commands
+    compound_safe = True
+
+    def __init__(self):
+        # every installed app found on PATH, in desktop entries and app folders
+        self.index = get_index()
+        # "open X" for each app only; a bare verb would route "restart the
+        # computer" or "start the washing machine" here
+        self.intent_phrases = self.index.phrases()
+        # the lazy skill registry re-reads the phrases when the index file changes
+        self.phrase_sources = [self.index.path] if self.index.path else []
+
+    def parse_intent(self, text):
+        """Return {'app', 'command'} (or {'app', 'file'}) for the app named right after the verb, or None."""
+        m = _VERB.search(text.lower())
+        if m is None:
+            return None
+        _, app = self.index.find(m.group('name'))
+        if app is None and self.index.refresh():
+            # installed since the index was built
+            _, app = self.index.find(m.group('name'))
+        if app is None:
+            return None
+        if 'file' in app:
+            return {'app': app['name'], 'file': app['file']}
+        return {'app': app['name'], 'command': app['command']}
+
+    def run_intent(self, slots):
+        if 'file' in slots:
+            os.startfile(slots['file'])
+        else:
+            subprocess.Popen(slots['command'], start_new_session=os.name == 'posix')
+        print(f"[Opened {slots['app'].title()}]")
+        return True
+
     def handle_intent(self, text):
-        for name, exe in self.app_map.items():
-            if name in text.lower():
-                subprocess.Popen([exe])
-                print(f"[Opened {name.title()}]")
-                return True
-        print("[App not found]")
-        return False
+        slots = self.parse_intent(text)
+        if slots is None:
+            print("[App not found]")
+            return False
+        return self.run_intent(slots)
 
 def register_skill():
     return OpenAppSkill()
@@ -1,30 +1,65 @@
+import os
 import webbrowser
 import re
 
+from skills._text_index import get_index
+
+# share of the query words (idf-weighted) a local hit must contain to be
+# answered offline; below it the browser is opened as before
+MIN_COVERAGE = float(os.getenv('TANU_SEARCH_MIN_COVERAGE', 0.7))
+
 class WebSearchSkill:
     intent_phrases = [
         'search', 'google', 'wikipedia', 'weather', 'directions'
     ]
-    def handle_intent(self, text):
+    # only opens a browser tab, so it may run alongside other commands
+    compound_safe = True
+
+    def parse_intent(self, text):
+        """Return {'engine', 'query'} for a Google or Wikipedia lookup, or None."""
         text = text.lower()
         if text.startswith('search') or text.startswith('google'):
             m = re.search(r'search(?: for)? (.+)', text)
             if m:
-                q = m.group(1)
-                url = f'https://www.google.com/search?q={q.replace(' ', '+')}'
-                webbrowser.open(url)
-                print(f'[Google search for: {q}]')
-                return True
+                return {'engine': 'google', 'query': m.group(1)}
         if 'wikipedia' in text:
             m = re.search(r'wikipedia(?: for| about)? (.+)', text)
             if m:
-                topic = m.group(1)
-                url = f'https://en.wikipedia.org/wiki/{topic.replace(' ', '_')}'
-                webbrowser.open(url)
-                print(f'[Wikipedia for: {topic}]')
-                return True
-        print('[WebSearchSkill: No match]')
-        return False
+                return {'engine': 'wikipedia', 'query': m.group(1)}
+        return None
+
+    def answer_locally(self, query):
+        """Title and snippet of the best local hit for query, or None when there is no good one."""
+        index = get_index()
+        if index is None:
+            return None
+        hits = index.search(query, limit=1)
+        if not hits or hits[0]['coverage'] < MIN_COVERAGE:
+            return None
+        return f"{hits[0]['title']}: {hits[0]['snippet']}"
+
+    def run_intent(self, slots):
+        answer = self.answer_locally(slots['query'])
+        if answer is not None:
+            return answer
+        if slots['engine'] == 'wikipedia':
+            topic = slots['query']
+            url = f'https://en.wikipedia.org/wiki/{topic.replace(" ", "_")}'
+            webbrowser.open(url)
+            print(f'[Wikipedia for: {topic}]')
+            return True
+        q = slots['query']
+        url = f'https://www.google.com/search?q={q.replace(" ", "+")}'
+        webbrowser.open(url)
+        print(f'[Google search for: {q}]')
+        return True
+
+    def handle_intent(self, text):
+        slots = self.parse_intent(text)
+        if slots is None:
+            print('[WebSearchSkill: No match]')
+            return False
+        return self.run_intent(slots)
 
 def register_skill():
     return WebSearchSkill()
@@ -1,58 +1,62 @@
+import importlib.util
+import os
 import re
-import pywhatkit as pwt
-from datetime import datetime
+import sys
+import time
+
+from skills._contacts import get_store
+from skills._delivery import get_scheduler
+from skills._grammar import SlotGrammar
+
+# queued messages survive restarts here; TANU_WHATSAPP_QUEUE overrides it
+# (set it empty to keep the queue in memory only)
+QUEUE_PATH = os.getenv('TANU_WHATSAPP_QUEUE', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'whatsapp_queue.json'))
 
 class WhatsAppMessageSkill:
     intent_phrases = [
         'whatsapp', 'send message', 'message', 'whatsapp message', 'send whatsapp',
         'send whatsapp message', 'whatsapp send'
     ]
+    # the message is free text: in a compound command it runs to the end
+    free_text_slots = ('message',)
     
+    # Command templates, most specific first; compiled once for all instances
+    grammar = SlotGrammar([
+        # "whatsapp send to [name/phone] [message]" or "send whatsapp to [name/phone] [message]"
+        ('send_to', r'(?:whatsapp\s+send|send\s+whatsapp)\s+to\s+(?P<contact>.+?)\s+(?P<message>.+)$'),
+        # "whatsapp [name/phone] [message]" - simpler format
+        ('whatsapp', r'whatsapp\s+(?P<contact>.+?)\s+(?P<message>.+)$'),
+        # "send message to [name/phone] [message]" or "message to [name/phone] [message]"
+        ('message_to', r'(?:send\s+)?message\s+to\s+(?P<contact>.+?)\s+(?P<message>.+)$'),
+        # "message [name/phone] [message]" - even simpler
+        ('message', r'^message\s+(?P<contact>.+?)\s+(?P<message>.+)$'),
+        # "send to [name/phone] [message]"
+        ('plain_send', r'^send\s+to\s+(?P<contact>.+?)\s+(?P<message>.+)$'),
+    ])
+
     def extract_contact_and_message(self, text):
         """Extract contact name/phone number and message from various command formats."""
-        text_l = text.lower().strip()
-        
-        # Pattern 1: "whatsapp send to [name/phone] [message]" or "send whatsapp to [name/phone] [message]"
-        pattern1 = r'(?:whatsapp\s+send|send\s+whatsapp)\s+to\s+(.+?)\s+(.+)$'
-        match1 = re.search(pattern1, text_l)
-        if match1:
-            contact = match1.group(1).strip()
-            message = match1.group(2).strip()
-            return contact, message
-        
-        # Pattern 2: "whatsapp [name/phone] [message]" - simpler format
-        pattern2 = r'whatsapp\s+(.+?)\s+(.+)$'
-        match2 = re.search(pattern2, text_l)
-        if match2:
-            contact = match2.group(1).strip()
-            message = match2.group(2).strip()
-            return contact, message
-        
-        # Pattern 3: "send message to [name/phone] [message]" or "message to [name/phone] [message]"
-        pattern3 = r'(?:send\s+)?message\s+to\s+(.+?)\s+(.+)$'
-        match3 = re.search(pattern3, text_l)
-        if match3:
-            contact = match3.group(1).strip()
-            message = match3.group(2).strip()
-            return contact, message
-        
-        # Pattern 4: "message [name/phone] [message]" - even simpler
-        pattern4 = r'^message\s+(.+?)\s+(.+)$'
-        match4 = re.search(pattern4, text_l)
-        if match4:
-            contact = match4.group(1).strip()
-            message = match4.group(2).strip()
-            return contact, message
-        
-        # Pattern 5: "send to [name/phone] [message]"
-        pattern5 = r'^send\s+to\s+(.+?)\s+(.+)$'
-        match5 = re.search(pattern5, text_l)
-        if match5:
-            contact = match5.group(1).strip()
-            message = match5.group(2).strip()
+        template, slots = self.grammar.match(text)
+        if template is None:
+            return None, None
+        return slots['contact'], slots['message']
+    
+    def split_contact(self, contact, message):
+        """Move leading message words into the contact when they complete a known name.
+
+        The templates end the contact at its first word, so "whatsapp priya
+        sharma running late" would send "sharma running late" to "priya".
+        """
+        store = get_store()
+        if store is None or re.search(r'\d', contact):
             return contact, message
-        
-        return None, None
+        words = message.split()
+        for n in range(min(2, len(words) - 1), 0, -1):
+            name = ' '.join([contact] + words[:n])
+            if store.resolve(name, field='phone', min_score=0.9) is not None:
+                return name, ' '.join(words[n:])
+        return contact, message
     
     def get_phone_number(self, contact):
         """Convert contact name or phone string to phone number format."""
@@ -63,24 +67,38 @@ class WhatsAppMessageSkill:
         if phone and phone.replace('+', '').isdigit():
             return phone
         
-        # If it's a name, try to extract phone number from it
-        # For now, assume the user provides phone number with country code
-        # You can extend this to use a contacts database
+        # If it's a name, look it up in the imported contacts
+        store = get_store()
+        match = store.resolve(contact, field='phone') if store is not None else None
+        if match is not None:
+            return match['phone']
         return contact
     
+    @staticmethod
+    def report_delivery(delivery, error):
+        """Scheduler callback: runs on the delivery thread once a message is done."""
+        if error is None:
+            print(f"[WhatsApp] Message sent to {delivery['phone']}")
+        else:
+            print(f"[WhatsApp Error] Could not send to {delivery['phone']} "
+                  f"after {delivery['attempts']} attempts: {error}")
+
+    def scheduler(self, resume=False):
+        """Return the shared delivery queue (delay/window from TANU_WHATSAPP_DELAY)."""
+        delay = float(os.getenv('TANU_WHATSAPP_DELAY', '60'))
+        return get_scheduler(QUEUE_PATH, resume=resume, delay=delay, coalesce_window=delay,
+                             on_result=self.report_delivery)
+
+    def resume(self):
+        """Send whatever was still queued when Tanu last stopped (interactive runs only)."""
+        if QUEUE_PATH and importlib.util.find_spec('pywhatkit') is not None:
+            self.scheduler(resume=True)
+    
     def send_whatsapp_message(self, phone, message):
-        """Send WhatsApp message using pywhatkit."""
+        """Queue a WhatsApp message; it is sent in the background by pywhatkit."""
+        if 'pywhatkit' not in sys.modules and importlib.util.find_spec('pywhatkit') is None:
+            return False, "pywhatkit not installed. Install with: pip install pywhatkit"
         try:
-            # Get current time and add 2 minutes delay (pywhatkit requirement)
-            now = datetime.now()
-            hour = now.hour
-            minute = now.minute + 2  # Send after 2 minutes
-            
-            # Handle minute overflow
-            if minute >= 60:
-                minute -= 60
-                hour = (hour + 1) % 24
-            
             # Clean phone number
             phone_clean = re.sub(r'[^\d+]', '', phone)
             if not phone_clean:
@@ -92,15 +110,35 @@ class WhatsAppMessageSkill:
                 # For now, require user to say country code
                 phone_clean = '+' + phone_clean if phone_clean[0] != '0' else phone_clean
             
-            # Send message using pywhatkit
+            # Queue the message; messages to the same contact close together
+            # are sent as one
             # Note: pywhatkit requires WhatsApp Web to be logged in and browser to be open
-            print(f"[Preparing to send WhatsApp message to {phone_clean} at {hour:02d}:{minute:02d}]")
-            pwt.sendwhatmsg(phone_clean, message, hour, minute)
-            
-            return True, f"Message will be sent to {phone_clean} at {hour:02d}:{minute:02d}"
+            delivery = self.scheduler().schedule(phone_clean, message)
+            due = time.strftime('%H:%M:%S', time.localtime(delivery['due']))
+            return True, f"Message will be sent to {phone_clean} at {due}"
         except Exception as e:
             return False, f"Error sending WhatsApp message: {str(e)}"
     
+    def parse_intent(self, text):
+        """Return {'contact', 'phone', 'message'} for the command, or None."""
+        contact, message = self.extract_contact_and_message(text)
+        if not (contact and message):
+            return None
+        contact, message = self.split_contact(contact, message)
+        return {'contact': contact, 'phone': self.get_phone_number(contact), 'message': message}
+    
+    def run_intent(self, slots):
+        message = slots['message']
+        success, result_msg = self.send_whatsapp_message(slots['phone'], message)
+        
+        if success:
+            print(f"[WhatsApp] {result_msg}")
+            print(f"[Message]: {message}")
+            print("[Note: Make sure WhatsApp Web is open and logged in]")
+        else:
+            print(f"[WhatsApp Error] {result_msg}")
+        return success
+    
     def handle_intent(self, text):
         text_l = text.lower()
         
@@ -109,19 +147,9 @@ class WhatsAppMessageSkill:
             return False
         
         # Extract contact name/phone and message
-        contact, message = self.extract_contact_and_message(text)
-        
-        if contact and message:
-            phone = self.get_phone_number(contact)
-            success, result_msg = self.send_whatsapp_message(phone, message)
-            
-            if success:
-                print(f"[WhatsApp] {result_msg}")
-                print(f"[Message]: {message}")
-                print("[Note: Make sure WhatsApp Web is open and logged in]")
-            else:
-                print(f"[WhatsApp Error] {result_msg}")
-            return success
+        slots = self.parse_intent(text)
+        if slots:
+            return self.run_intent(slots)
         
         # If we couldn't parse, provide helpful message
         print("[WhatsApp] Could not parse contact and message.")
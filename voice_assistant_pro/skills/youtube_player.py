@@ -1,83 +1,95 @@
 import re
+import webbrowser
+
+from skills._grammar import SlotGrammar
+from skills._video_cache import get_video_cache
 
 class YouTubePlayerSkill:
     intent_phrases = [
         'play song', 'play music', 'play video', 'play on youtube', 'youtube play',
         'open youtube', 'youtube song', 'play audio', 'youtube', 'play movie'
     ]
+    # only opens a browser tab, so it may run alongside other commands
+    compound_safe = True
     
+    # Patterns ordered by specificity (most specific first); templates marked
+    # 'loose' are less specific and need validation
+    grammar = SlotGrammar([
+        ('youtube', r'youtube\s+(?P<query>.+)'),  # "youtube songname"
+        ('play_kind', r'play\s+(?:song|music|video|audio|movie)\s+(?P<query>.+)'),  # "play song name"
+        ('play_on_youtube', r'play\s+on\s+youtube\s+(?P<query>.+)'),  # "play on youtube name"
+        ('play_youtube', r'play\s+(?P<query>.+)\s+youtube'),  # "play name youtube"
+        ('loose', r'play\s+(?P<query>.+)'),
+    ])
+
     def extract_query(self, text):
         """Extract the song/movie name from various command formats."""
-        original_text = text.lower()
+        template, slots = self.grammar.match(text)
+        if template is None:
+            return None
+
+        # Clean up the query
+        query = re.sub(r'\s+', ' ', slots['query'])  # Normalize whitespace
         
-        # Patterns ordered by specificity (most specific first)
-        # We match against original text to preserve structure
-        patterns = [
-            (r'youtube\s+(.+)', True),  # "youtube songname"
-            (r'play\s+(?:song|music|video|audio|movie)\s+(.+)', True),  # "play song name"
-            (r'play\s+on\s+youtube\s+(.+)', True),  # "play on youtube name"
-            (r'play\s+(.+)\s+youtube', True),  # "play name youtube"
-            (r'play\s+(.+)', False),  # Less specific, needs validation
-        ]
+        # Remove filler words
+        fillers = ['the', 'a', 'an', 'on', 'please', 'now']
+        words = query.split()
+        query = ' '.join([w for w in words if w.lower() not in fillers])
         
-        for pattern, always_valid in patterns:
-            match = re.search(pattern, original_text)
-            if match:
-                query = match.group(1).strip()
-                # Clean up the query
-                query = re.sub(r'\s+', ' ', query)  # Normalize whitespace
-                
-                # Remove filler words
-                fillers = ['the', 'a', 'an', 'on', 'please', 'now']
-                words = query.split()
-                query = ' '.join([w for w in words if w not in fillers])
-                
-                # Remove trailing common words
-                query = re.sub(r'\s+(song|music|video|audio|movie|on|youtube)$', '', query)
-                
-                # Validate query
-                if query and len(query.split()) > 0:
-                    # If it's a less specific pattern, make sure it's reasonable
-                    if not always_valid:
-                        # If query seems too short or is likely a false match, skip
-                        if len(query) < 3:
-                            continue
-                    return query
+        # Remove trailing common words
+        query = re.sub(r'\s+(song|music|video|audio|movie|on|youtube)$', '', query, flags=re.IGNORECASE)
         
-        return None
+        # Validate query
+        if not query:
+            return None
+        # If it's a less specific pattern, make sure it's reasonable
+        if template == 'loose' and len(query) < 3:
+            return None
+        return query
     
-    def handle_intent(self, text):
+    def parse_intent(self, text):
+        """Return {'query'} with the song/video to play, or None."""
+        query = self.extract_query(text)
+        return {'query': query} if query else None
+    
+    def video_cache(self):
+        """Return the shared query -> video URL cache (resolves misses)."""
+        return get_video_cache()
+    
+    def run_intent(self, slots):
+        query = slots['query']
+        cache = self.video_cache()
+        cache.record(query)
         try:
-            import pywhatkit as pwt
+            # A repeated query opens the remembered video; only a new one
+            # pays for the YouTube results-page lookup
+            url, hit = cache.resolve(query)
         except ImportError:
             print('[Error] pywhatkit not installed. Install with: pip install pywhatkit')
             print('[Falling back to basic YouTube search]')
-            import webbrowser
-            query = self.extract_query(text)
-            if query:
-                url = f'https://www.youtube.com/results?search_query={query.replace(" ", "+")}'
-                webbrowser.open(url)
-                print(f'[Searching YouTube: {query}]')
-                return True
-            return False
+            return self.search(query)
+        except Exception as e:
+            print(f'[Error playing video: {e}]')
+            # Fallback to search
+            return self.search(query)
         
+        webbrowser.open(url)
+        print(f'[Playing on YouTube: {query}]' + (' (cached)' if hit else ''))
+        return True
+    
+    @staticmethod
+    def search(query):
+        """Open the YouTube results page for query."""
+        url = f'https://www.youtube.com/results?search_query={query.replace(" ", "+")}'
+        webbrowser.open(url)
+        print(f'[Searching YouTube: {query}]')
+        return True
+    
+    def handle_intent(self, text):
         # Extract the query using the improved method
-        query = self.extract_query(text)
-        
-        if query:
-            try:
-                # Use pywhatkit to play the video directly on YouTube
-                pwt.playonyt(query)
-                print(f'[Playing on YouTube: {query}]')
-                return True
-            except Exception as e:
-                print(f'[Error playing video: {e}]')
-                # Fallback to search
-                import webbrowser
-                url = f'https://www.youtube.com/results?search_query={query.replace(" ", "+")}'
-                webbrowser.open(url)
-                print(f'[Searching YouTube: {query}]')
-                return True
+        slots = self.parse_intent(text)
+        if slots:
+            return self.run_intent(slots)
         
         print('[YouTubePlayerSkill: Could not extract song/video name]')
         return False
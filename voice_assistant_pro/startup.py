@@ -0,0 +1,132 @@
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# a saved calibration older than this is measured again (seconds)
+CALIBRATION_MAX_AGE = float(os.getenv('TANU_CALIBRATION_MAX_AGE', 24 * 3600))
+
+
+class StartupProfile:
+    """Where startup time goes: module imports, skill registration, calibration.
+
+    Stages are timed with ``stage(name)`` (or ``start``/``stop`` around code
+    that can't be indented, like a block of imports) and ``ready()`` marks
+    the point where the agent starts listening. Stage times are always kept
+    for the metrics snapshot. When ``enabled``, every first-time import is
+    also timed through ``builtins.__import__`` and charged, minus its own
+    nested imports, to its top-level package, and ``ready()`` prints the
+    report.
+    """
+
+    def __init__(self, enabled=False, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.started = clock()
+        self.stages = {}
+        self.total = None
+        self.import_times = {}
+        self._open = {}
+        self._local = threading.local()
+        self._original_import = None
+        if enabled:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = self.clock()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = self.clock() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            package = name.partition('.')[0]
+            self.import_times[package] = self.import_times.get(package, 0.0) + elapsed - nested
+
+    def start(self, name):
+        self._open[name] = self.clock()
+
+    def stop(self, name):
+        start = self._open.pop(name, None)
+        if start is not None:
+            self.stages[name] = self.stages.get(name, 0.0) + self.clock() - start
+
+    @contextmanager
+    def stage(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def ready(self):
+        """Record the time to ready (first call only) and stop timing imports."""
+        if self.total is not None:
+            return
+        self.total = self.clock() - self.started
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        if self.enabled:
+            self.report()
+
+    def summary(self):
+        """Seconds per stage plus the total, for the metrics snapshot."""
+        out = dict(self.stages)
+        if self.total is not None:
+            out['total'] = self.total
+        return out
+
+    def report(self, top=10, file=None):
+        """Print the stage breakdown and the slowest imported packages."""
+        file = file or sys.stdout
+        print("[Startup profile]", file=file)
+        for name, seconds in self.stages.items():
+            print(f"  {name:<24} {seconds * 1e3:>8.1f} ms", file=file)
+        if self.total is not None:
+            print(f"  {'time to ready':<24} {self.total * 1e3:>8.1f} ms", file=file)
+        if self.import_times:
+            print("  slowest imports (self time, by package):", file=file)
+            ranked = sorted(self.import_times.items(), key=lambda kv: kv[1], reverse=True)
+            for package, seconds in ranked[:top]:
+                print(f"    {package:<22} {seconds * 1e3:>8.1f} ms", file=file)
+
+
+def load_calibration(path, device=None, max_age=CALIBRATION_MAX_AGE, clock=time.time):
+    """Energy threshold saved by a previous session, or None.
+
+    The saved value is ignored when it is older than max_age seconds or was
+    measured on a different input device.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        threshold = float(data['energy_threshold'])
+        saved = float(data['saved'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if data.get('device') != device or not 0 <= clock() - saved <= max_age:
+        return None
+    return threshold
+
+
+def save_calibration(path, energy_threshold, device=None, clock=time.time):
+    """Atomically record the current energy threshold for the next session."""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'energy_threshold': energy_threshold, 'device': device, 'saved': clock()}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[Warning] could not save calibration: {e}")
@@ -0,0 +1,42 @@
+"""LRUCache persistence when several threads save the same cache."""
+import os
+import tempfile
+import threading
+import unittest
+
+from skills._cache import LRUCache
+
+
+class CacheSaveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_concurrent_saves_keep_every_entry(self):
+        cache = LRUCache(10000, path=self.path)
+
+        def writer(n):
+            for i in range(50):
+                cache.put(f"{n}-{i}", i)
+                cache.save({'version': 1})
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(LRUCache(10000, path=self.path).load({'version': 1}), 400)
+        self.assertEqual(os.listdir(self.tmp.name), ['cache.json'])
+
+    def test_failed_save_leaves_no_temp_file(self):
+        cache = LRUCache(path=self.path)
+        cache.put('song', object())
+        cache.save()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
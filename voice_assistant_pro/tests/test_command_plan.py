@@ -0,0 +1,104 @@
+"""Splitting compound commands, and CommandPlan.run on a SkillExecutor that shuts down mid-plan."""
+import os
+import tempfile
+import threading
+import unittest
+
+from command_plan import CommandPlan, Step
+from executor import SkillExecutor
+from main import VoiceAgent
+
+
+class BuildPlanTest(unittest.TestCase):
+    """The real skills, with no contacts imported."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.saved = os.environ.get('TANU_CONTACTS_DB')
+        os.environ['TANU_CONTACTS_DB'] = os.path.join(cls.tmp.name, 'none.db')
+        cls.agent = VoiceAgent(fuzzy_threshold=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.saved is None:
+            del os.environ['TANU_CONTACTS_DB']
+        else:
+            os.environ['TANU_CONTACTS_DB'] = cls.saved
+        cls.tmp.cleanup()
+
+    def steps(self, text):
+        plan = self.agent.plan(text)
+        if plan is None:
+            resolved = self.agent.resolve(text)
+            return [(resolved['skill'], resolved['slots'])]
+        return [(step['skill'], step['slots']) for step in plan.resolved()]
+
+    def test_email_body_keeps_a_later_command(self):
+        [(skill, slots)] = self.steps("send email to bob@x.com subject plans message lets meet "
+                                      "and play music together")
+        self.assertEqual(skill, 'email_sender')
+        self.assertEqual(slots['body'], 'lets meet and play music together')
+
+    def test_whatsapp_message_keeps_a_later_command(self):
+        [(skill, slots)] = self.steps("whatsapp +15551234 I will be late then search for parking")
+        self.assertEqual(skill, 'whatsapp_message')
+        self.assertEqual(slots['message'], 'I will be late then search for parking')
+
+    def test_commands_before_a_message_still_split(self):
+        steps = self.steps("play song shape of you and whatsapp +15551234 on my way and search parking")
+        self.assertEqual([skill for skill, _ in steps], ['youtube_player', 'whatsapp_message'])
+        self.assertEqual(steps[1][1]['message'], 'on my way and search parking')
+
+    def test_compound_safe_commands_split(self):
+        steps = self.steps("search python and play song hello")
+        self.assertEqual([skill for skill, _ in steps], ['web_search', 'youtube_player'])
+
+
+class BlockingSkill:
+    """Returns only once ``release`` is set."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def handle_intent(self, text):
+        self.started.set()
+        self.release.wait(5)
+        return text
+
+
+class PlanShutdownTest(unittest.TestCase):
+    def setUp(self):
+        self.skill = BlockingSkill()
+        self.executor = SkillExecutor(max_workers=2, per_skill_limit=1, default_timeout=0)
+
+    def tearDown(self):
+        self.skill.release.set()
+        self.executor.shutdown(wait=True)
+
+    def plan(self, *stages):
+        steps = [Step(self.skill, 'say', None, f"step {i}") for i in range(sum(map(len, stages)))]
+        return CommandPlan(steps, [(n > 0, list(indexes)) for n, indexes in enumerate(stages)])
+
+    def test_queued_step_cancelled_by_shutdown_completes_the_plan(self):
+        done = self.plan([0, 1]).run(self.executor)
+        self.assertTrue(self.skill.started.wait(5))
+        self.executor.shutdown()
+        self.skill.release.set()
+        first, second = done.result(timeout=5)
+        self.assertEqual(first.result, 'step 0')
+        self.assertIsNotNone(second.error)
+
+    def test_stage_after_shutdown_is_skipped(self):
+        done = self.plan([0], [1]).run(self.executor)
+        self.assertTrue(self.skill.started.wait(5))
+        self.executor.shutdown()
+        self.skill.release.set()
+        first, second = done.result(timeout=5)
+        self.assertEqual(first.result, 'step 0')
+        self.assertIsNotNone(second.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+"""DeliveryScheduler driven by a fake transport and a fake clock (no thread, no browser)."""
+import json
+import os
+import tempfile
+import unittest
+
+from skills import _delivery
+from skills._delivery import DeliveryScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeTransport:
+    """Records sends; the first ``failures`` calls raise."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+        self.calls = 0
+
+    def send(self, phone, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError(f"send {self.calls} failed")
+        self.sent.append((phone, text))
+
+
+class DeliverySchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.transport = FakeTransport()
+        self.results = []
+
+    def scheduler(self, **kwargs):
+        kwargs.setdefault('on_result', lambda delivery, error: self.results.append((delivery, error)))
+        return DeliveryScheduler(self.transport, clock=self.clock, **kwargs)
+
+    def test_sends_only_when_due(self):
+        scheduler = self.scheduler(delay=60)
+        delivery = scheduler.schedule('+15550001', 'hello')
+        self.assertEqual(delivery['due'], 1060.0)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.clock.advance(59)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.clock.advance(1)
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(self.transport.sent, [('+15550001', 'hello')])
+        self.assertEqual(scheduler.pending(), [])
+        self.assertIsNone(self.results[0][1])
+
+    def test_sends_in_due_order(self):
+        scheduler = self.scheduler(delay=60, coalesce_window=0)
+        scheduler.schedule('+15550001', 'later', delay=30)
+        scheduler.schedule('+15550002', 'sooner', delay=10)
+        self.clock.advance(30)
+        scheduler.run_pending()
+        self.assertEqual([text for _, text in self.transport.sent], ['sooner', 'later'])
+
+    def test_coalesces_same_contact_within_window(self):
+        scheduler = self.scheduler(delay=60, coalesce_window=60)
+        first = scheduler.schedule('+15550001', 'running late')
+        self.clock.advance(30)
+        second = scheduler.schedule('+15550001', 'be there at 8')
+        scheduler.schedule('+15550002', 'other contact')
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(len(scheduler.pending()), 2)
+        self.clock.advance(60)
+        scheduler.run_pending()
+        self.assertIn(('+15550001', 'running late\nbe there at 8'), self.transport.sent)
+        self.assertIn(('+15550002', 'other contact'), self.transport.sent)
+        self.assertEqual(scheduler.stats()['coalesced'], 1)
+
+    def test_does_not_coalesce_outside_window(self):
+        scheduler = self.scheduler(delay=60, coalesce_window=60)
+        scheduler.schedule('+15550001', 'one')
+        self.clock.advance(61)
+        scheduler.schedule('+15550001', 'two')
+        self.assertEqual(len(scheduler.pending()), 2)
+
+    def test_retries_with_exponential_backoff(self):
+        self.transport.failures = 2
+        scheduler = self.scheduler(delay=0, max_attempts=3, retry_delay=30)
+        scheduler.schedule('+15550001', 'hello')
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(scheduler.pending()[0]['due'], self.clock() + 30)
+        self.clock.advance(29)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.clock.advance(1)
+        self.assertEqual(scheduler.run_pending(), 1)
+        # the second retry waits twice as long
+        self.assertEqual(scheduler.pending()[0]['due'], self.clock() + 60)
+        self.clock.advance(60)
+        scheduler.run_pending()
+        self.assertEqual(self.transport.sent, [('+15550001', 'hello')])
+        self.assertEqual(len(self.results), 1)
+        delivery, error = self.results[0]
+        self.assertIsNone(error)
+        self.assertEqual(delivery['attempts'], 3)
+
+    def test_gives_up_after_max_attempts(self):
+        self.transport.failures = 10
+        scheduler = self.scheduler(delay=0, max_attempts=2, retry_delay=5)
+        scheduler.schedule('+15550001', 'hello')
+        scheduler.run_pending()
+        self.clock.advance(5)
+        scheduler.run_pending()
+        self.assertEqual(scheduler.pending(), [])
+        self.assertEqual(scheduler.stats()['failed'], 1)
+        delivery, error = self.results[0]
+        self.assertIsInstance(error, ConnectionError)
+        self.assertEqual(delivery['attempts'], 2)
+
+
+class DeliveryPersistenceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'queue.json')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queue_survives_restart(self):
+        first = DeliveryScheduler(FakeTransport(), self.path, delay=60, clock=self.clock)
+        first.schedule('+15550001', 'hello')
+        first.schedule('+15550002', 'hi', delay=120)
+        first.close()
+
+        transport = FakeTransport()
+        second = DeliveryScheduler(transport, self.path, delay=60, clock=self.clock)
+        self.assertEqual([d['phone'] for d in second.pending()], ['+15550001', '+15550002'])
+        self.clock.advance(60)
+        second.run_pending()
+        self.assertEqual(transport.sent, [('+15550001', 'hello')])
+        second.close()
+
+        third = DeliveryScheduler(FakeTransport(), self.path, clock=self.clock)
+        self.assertEqual([d['phone'] for d in third.pending()], ['+15550002'])
+        third.close()
+
+    def test_retry_state_survives_restart(self):
+        first = DeliveryScheduler(FakeTransport(failures=1), self.path, delay=0, retry_delay=30,
+                                  clock=self.clock)
+        first.schedule('+15550001', 'hello')
+        first.run_pending()
+        first.close()
+
+        second = DeliveryScheduler(FakeTransport(), self.path, clock=self.clock)
+        [delivery] = second.pending()
+        self.assertEqual(delivery['attempts'], 1)
+        self.assertEqual(delivery['due'], self.clock() + 30)
+        second.close()
+
+    def test_delivery_interrupted_mid_send_is_sent_again(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'deliveries': [{'id': 'abc', 'phone': '+15550001', 'text': 'hello',
+                                       'due': self.clock() - 5, 'attempts': 0}]}, f)
+        transport = FakeTransport()
+        scheduler = DeliveryScheduler(transport, self.path, clock=self.clock)
+        scheduler.run_pending()
+        scheduler.close()
+        self.assertEqual(transport.sent, [('+15550001', 'hello')])
+
+    def test_ignores_corrupt_queue_file(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        scheduler = DeliveryScheduler(FakeTransport(), self.path, clock=self.clock)
+        self.assertEqual(scheduler.pending(), [])
+        scheduler.close()
+
+
+class DeliveryOwnerTest(unittest.TestCase):
+    """Only the scheduler holding the queue's lock sends from it."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'queue.json')
+        self.clock = FakeClock()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'deliveries': [{'id': 'abc', 'phone': '+15550001', 'text': 'saved',
+                                       'due': self.clock(), 'attempts': 0}]}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unclaimed_scheduler_leaves_the_saved_queue_alone(self):
+        transport = FakeTransport()
+        scheduler = DeliveryScheduler(transport, self.path, clock=self.clock, claim=False)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.assertEqual(scheduler.pending(), [])
+        self.assertEqual(transport.sent, [])
+
+    def test_second_owner_is_refused(self):
+        owner_transport, other_transport = FakeTransport(), FakeTransport()
+        owner = DeliveryScheduler(owner_transport, self.path, clock=self.clock)
+        other = DeliveryScheduler(other_transport, self.path, clock=self.clock)
+        self.assertTrue(owner.owner)
+        self.assertFalse(other.claim())
+        owner.run_pending()
+        other.run_pending()
+        self.assertEqual(owner_transport.sent, [('+15550001', 'saved')])
+        self.assertEqual(other_transport.sent, [])
+        owner.close()
+        self.assertTrue(other.claim())
+        other.close()
+
+    def test_messages_are_handed_to_the_owner(self):
+        owner_transport = FakeTransport()
+        owner = DeliveryScheduler(owner_transport, self.path, delay=0, clock=self.clock)
+        other = DeliveryScheduler(FakeTransport(), self.path, delay=0, clock=self.clock, claim=False)
+        other.schedule('+15550002', 'from a batch worker')
+        self.assertEqual(other.pending(), [])
+        owner.run_pending()
+        self.assertIn(('+15550002', 'from a batch worker'), owner_transport.sent)
+        self.assertEqual(os.listdir(self.path + '.incoming'), [])
+        owner.close()
+
+    def test_hand_off_waits_for_the_next_owner(self):
+        DeliveryScheduler(FakeTransport(), self.path, delay=0, clock=self.clock,
+                          claim=False).schedule('+15550002', 'later')
+        owner = DeliveryScheduler(FakeTransport(), self.path, clock=self.clock)
+        self.assertEqual(sorted(d['text'] for d in owner.pending()), ['later', 'saved'])
+        owner.close()
+
+
+class SharedSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.saved, _delivery._scheduler = _delivery._scheduler, None
+
+    def tearDown(self):
+        if _delivery._scheduler is not None:
+            _delivery._scheduler.close()
+        _delivery._scheduler = self.saved
+
+    def test_resume_claims_the_queue(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'queue.json')
+            scheduler = _delivery.get_scheduler(path)
+            self.assertFalse(scheduler.owner)
+            self.assertIs(_delivery.get_scheduler(path, resume=True), scheduler)
+            self.assertTrue(scheduler.owner)
+            scheduler.close()
+
+    def test_later_settings_apply_to_the_shared_scheduler(self):
+        scheduler = _delivery.get_scheduler(None, delay=60, coalesce_window=60)
+        self.assertIs(_delivery.get_scheduler(None, delay=5, coalesce_window=5), scheduler)
+        self.assertEqual((scheduler.delay, scheduler.coalesce_window), (5, 5))
+
+    def test_rejects_unknown_settings(self):
+        _delivery.get_scheduler(None)
+        with self.assertRaises(TypeError):
+            _delivery.get_scheduler(None, dealy=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
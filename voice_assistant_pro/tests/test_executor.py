@@ -0,0 +1,58 @@
+"""SkillExecutor shutdown with calls running, waiting in the pool and queued per skill."""
+import threading
+import unittest
+
+from executor import SkillExecutor
+
+
+class BlockingSkill:
+    """Returns only once ``release`` is set."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def handle_intent(self, text):
+        self.started.set()
+        self.release.wait(5)
+        return text
+
+
+class ExecutorShutdownTest(unittest.TestCase):
+    def setUp(self):
+        self.skill = BlockingSkill()
+        self.results = []
+        # one worker, two slots per skill: the second call waits in the pool,
+        # the third in the skill's own queue
+        self.executor = SkillExecutor(max_workers=1, per_skill_limit=2, default_timeout=0,
+                                      on_result=self.results.append)
+
+    def tearDown(self):
+        self.skill.release.set()
+        self.executor.shutdown(wait=True)
+
+    def test_calls_not_started_resolve_as_cancelled(self):
+        running = self.executor.submit(self.skill, 'one')
+        self.assertTrue(self.skill.started.wait(5))
+        in_pool = self.executor.submit(self.skill, 'two')
+        queued = self.executor.submit(self.skill, 'three')
+        self.executor.shutdown()
+        for future in (in_pool, queued):
+            outcome = future.result(timeout=5)
+            self.assertIsNone(outcome.result)
+            self.assertIn('cancelled', str(outcome.error))
+        self.skill.release.set()
+        self.assertEqual(running.result(timeout=5).result, 'one')
+        self.executor.shutdown(wait=True)
+        self.assertEqual(self.executor.stats(), {})
+        self.assertEqual(len(self.results), 3)
+
+    def test_submit_after_shutdown_resolves_as_cancelled(self):
+        self.executor.shutdown()
+        outcome = self.executor.submit(self.skill, 'late').result(timeout=5)
+        self.assertIn('cancelled', str(outcome.error))
+        self.assertEqual(self.executor.stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
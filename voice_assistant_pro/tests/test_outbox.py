@@ -0,0 +1,80 @@
+"""Outbox shared by several processes: one owner sends, the others only queue."""
+import os
+import tempfile
+import unittest
+
+from skills._outbox import Outbox
+
+
+class FakeTransport:
+    """Records every message of every batch; nothing fails."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_many(self, messages):
+        self.sent.extend(recipient for _, recipient, _ in messages)
+        return [None] * len(messages)
+
+
+class OutboxOwnerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'outbox.db')
+        self.opened = []
+
+    def tearDown(self):
+        for outbox in self.opened:
+            outbox.close()
+        self.tmp.cleanup()
+
+    def outbox(self, transport=None, **kwargs):
+        outbox = Outbox(transport or FakeTransport(), self.path, **kwargs)
+        self.opened.append(outbox)
+        return outbox
+
+    def test_only_the_owner_sends(self):
+        owner_transport, other_transport = FakeTransport(), FakeTransport()
+        owner = self.outbox(owner_transport)
+        other = self.outbox(other_transport)
+        self.assertTrue(owner.owner)
+        self.assertFalse(other.owner)
+        other.enqueue('me@x.com', ['a@x.com', 'b@x.com'], 'hi', 'body')
+        self.assertEqual(other.run_pending(), 0)
+        self.assertEqual(owner.run_pending(), 2)
+        self.assertEqual(owner_transport.sent, ['a@x.com', 'b@x.com'])
+        self.assertEqual(other_transport.sent, [])
+
+    def test_opening_does_not_requeue_rows_being_sent(self):
+        owner = self.outbox()
+        owner.enqueue('me@x.com', 'a@x.com', 'hi', 'body')
+        owner._claim(owner.clock())
+        self.assertEqual(self.outbox(claim=False).stats()['sending'], 1)
+        self.assertEqual(self.outbox().stats()['sending'], 1)
+
+    def test_next_owner_requeues_an_interrupted_send(self):
+        owner = self.outbox()
+        owner.enqueue('me@x.com', 'a@x.com', 'hi', 'body')
+        owner._claim(owner.clock())
+        owner.close()
+        transport = FakeTransport()
+        self.assertEqual(self.outbox(transport).run_pending(), 1)
+        self.assertEqual(transport.sent, ['a@x.com'])
+
+    def test_claims_do_not_overlap(self):
+        first = self.outbox(batch_size=3)
+        second = self.outbox(claim=False, batch_size=3)
+        first.enqueue('me@x.com', [f"{n}@x.com" for n in range(5)], 'hi', 'body')
+        ids = [m['id'] for m in first._claim(first.clock())] + [m['id'] for m in second._claim(second.clock())]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_batches_from_two_processes_get_distinct_numbers(self):
+        first, second = self.outbox(), self.outbox(claim=False)
+        numbers = {first.enqueue('me@x.com', 'a@x.com', 'hi', 'body'),
+                   second.enqueue('me@x.com', 'b@x.com', 'hi', 'body')}
+        self.assertEqual(len(numbers), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
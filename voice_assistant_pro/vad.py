@@ -0,0 +1,322 @@
+"""Voice activity gate between the phrase segmenter and the recognizer.
+
+The segmenter cuts a phrase whenever the energy crosses its threshold, so
+door slams, typing, a fan changing speed or music all become "phrases"
+that are sent to the recognizer and come back as UnknownSpeech, each
+costing a round trip (and quota, for online engines). VoiceActivityDetector
+looks at the raw PCM of each phrase in short frames and only lets it
+through when it contains enough voiced frames: well above the room's
+noise floor, with the low zero-crossing rate of voiced sound, and with the
+syllable-rate loudness changes of speech rather than a steady hum. The
+noise floor adapts from the quiet lead-in every phrase starts with.
+
+WakeWord optionally requires the phrase to start with an enrolled word
+("Tanu"): recordings of it are compared with the start of each phrase by
+dynamic time warping over log band energies. Both use NumPy when it is
+installed; the detector falls back to pure Python, the wake word needs it.
+
+The thresholds have only been checked against the synthetic signals of
+benchmarks/bench_vad.py, not against real recordings, so main.py runs the
+gate only when asked to (--vad) and reports every phrase it drops.
+
+    python vad.py recording.wav
+    python vad.py recording.wav --wake-samples tanu1.wav tanu2.wav tanu3.wav
+"""
+import argparse
+import math
+import re
+from array import array
+
+from audio_pipeline import audioop, frame_rms
+from skills._numpy import load_numpy
+
+# NumPy, bound from load_numpy() when a phrase is analyzed
+np = None
+
+# ways a recognizer writes the default wake word
+WAKE_SPELLINGS = {'tanu': ('tanu', 'tanoo', 'tannu', 'tano', 'tan you', 'ta nu', 'tanuj')}
+
+
+def _samples(data, sample_width):
+    """PCM bytes as a float array scaled to [-1, 1)."""
+    if sample_width == 1:
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    dtype = {2: '<i2', 4: '<i4'}[sample_width]
+    data = data[:len(data) - len(data) % sample_width]
+    return np.frombuffer(data, dtype=dtype).astype(np.float32) / float(1 << (8 * sample_width - 1))
+
+
+def frame_features(data, sample_rate, sample_width, frame_ms=20):
+    """Per-frame (energy in dBFS, zero-crossing rate) of PCM data.
+
+    Returns two NumPy arrays, or two lists without NumPy.
+    """
+    global np
+    size = max(1, int(sample_rate * frame_ms / 1000))
+    np = load_numpy()
+    if np is not None:
+        x = _samples(data, sample_width)
+        count = len(x) // size
+        if not count:
+            return np.zeros(0), np.zeros(0)
+        frames = x[:count * size].reshape(count, size)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energy = 20 * np.log10(rms + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / size
+        return energy, zcr
+    full_scale = float(1 << (8 * sample_width - 1))
+    step = size * sample_width
+    energy, zcr = [], []
+    for pos in range(0, len(data) - step + 1, step):
+        frame = data[pos:pos + step]
+        energy.append(20 * math.log10(frame_rms(frame, sample_width) / full_scale + 1e-10))
+        if audioop is not None:
+            crossings = audioop.cross(frame, sample_width)
+        else:
+            s = array('h', frame) if sample_width == 2 else array('b', bytes(b - 128 for b in frame))
+            crossings = sum((a < 0) != (b < 0) for a, b in zip(s, s[1:]))
+        zcr.append(crossings / size)
+    return energy, zcr
+
+
+def _percentile(values, q):
+    if np is not None and not isinstance(values, list):
+        return float(np.percentile(values, q))
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+# why check() dropped a phrase, as shown while listening
+REASONS = {'quiet': 'nothing above the background noise', 'short': 'too little voiced sound',
+           'steady': 'steady sound, not speech', 'wake_word': 'no wake word'}
+
+
+class VoiceActivityDetector:
+    """Decides whether a segmented phrase contains speech.
+
+    A frame is voiced when its energy is ``margin_db`` above the noise floor
+    (and above ``min_db`` absolute) and its zero-crossing rate is below
+    ``max_zcr``. A phrase passes with at least ``min_speech`` seconds of
+    voiced frames whose loudness varies by ``min_modulation_db`` (standard
+    deviation) or more. The floor follows the 10th percentile frame energy
+    of each phrase: down at once, up by ``floor_adapt`` of the difference.
+
+    Instances are callable with a Segment and keep counters in ``stats()``.
+    """
+
+    def __init__(self, margin_db=10.0, min_db=-55.0, max_zcr=0.25, min_speech=0.15,
+                 min_modulation_db=3.0, floor_adapt=0.3, frame_ms=20, wake_word=None):
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.max_zcr = max_zcr
+        self.min_speech = min_speech
+        self.min_modulation_db = min_modulation_db
+        self.floor_adapt = floor_adapt
+        self.frame_ms = frame_ms
+        # optional WakeWord checked after the speech test
+        self.wake_word = wake_word
+        self.noise_floor = None
+        self.counters = {'segments': 0, 'forwarded': 0, 'gated': 0, 'gated_quiet': 0,
+                         'gated_short': 0, 'gated_steady': 0, 'gated_wake_word': 0,
+                         'gated_seconds': 0.0}
+
+    def __call__(self, segment):
+        return self.accepts(segment)
+
+    def accepts(self, segment):
+        """True if segment should go to the recognizer; updates the counters."""
+        return self.check(segment) is None
+
+    def check(self, segment):
+        """None if segment should go to the recognizer, else why not (a REASONS key).
+
+        Updates the counters.
+        """
+        reason = self.classify(segment.data, segment.sample_rate, segment.sample_width)
+        if reason is None and self.wake_word is not None and not self.wake_word.heard(segment):
+            reason = 'wake_word'
+        self.counters['segments'] += 1
+        if reason is None:
+            self.counters['forwarded'] += 1
+            return None
+        self.counters['gated'] += 1
+        self.counters['gated_' + reason] += 1
+        self.counters['gated_seconds'] += len(segment.data) / (segment.sample_rate * segment.sample_width)
+        return reason
+
+    def classify(self, data, sample_rate, sample_width):
+        """None for speech, else why not: 'quiet', 'short' or 'steady'."""
+        energy, zcr = frame_features(data, sample_rate, sample_width, self.frame_ms)
+        if not len(energy):
+            return 'quiet'
+        floor = _percentile(energy, 10)
+        if self.noise_floor is None or floor < self.noise_floor:
+            self.noise_floor = floor
+        else:
+            self.noise_floor += self.floor_adapt * (floor - self.noise_floor)
+        level = max(self.noise_floor + self.margin_db, self.min_db)
+        if np is not None and not isinstance(energy, list):
+            voiced = energy[(energy > level) & (zcr < self.max_zcr)]
+            loud = int(np.count_nonzero(energy > level))
+            spread = float(np.std(voiced)) if len(voiced) > 1 else 0.0
+        else:
+            voiced = [e for e, z in zip(energy, zcr) if e > level and z < self.max_zcr]
+            loud = sum(e > level for e in energy)
+            mean = sum(voiced) / len(voiced) if voiced else 0.0
+            spread = math.sqrt(sum((e - mean) ** 2 for e in voiced) / len(voiced)) if len(voiced) > 1 else 0.0
+        if not loud:
+            return 'quiet'
+        if len(voiced) * self.frame_ms / 1000 < self.min_speech:
+            return 'short'
+        if spread < self.min_modulation_db:
+            return 'steady'
+        return None
+
+    def stats(self):
+        stats = dict(self.counters)
+        if self.noise_floor is not None:
+            stats['noise_floor_db'] = round(float(self.noise_floor), 1)
+        return stats
+
+
+def band_energies(data, sample_rate, sample_width, bands=20, frame_ms=25, hop_ms=10):
+    """Mean-normalized log energies in log-spaced bands, one row per frame."""
+    x = _samples(data, sample_width)
+    size = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    count = 1 + (len(x) - size) // hop if len(x) >= size else 0
+    if count <= 0:
+        return np.zeros((0, bands))
+    index = np.arange(size)[None, :] + hop * np.arange(count)[:, None]
+    frames = x[index] * np.hanning(size).astype(np.float32)
+    n_fft = 1 << (size - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = np.geomspace(100.0, min(7000.0, sample_rate / 2), bands + 1)
+    starts = np.clip(np.searchsorted(freqs, edges[:-1]), 0, len(freqs) - 1)
+    # every band gets at least one bin, even at low sample rates
+    sums = np.add.reduceat(power, starts, axis=1)
+    features = np.log(sums + 1e-10)
+    return features - features.mean(axis=0)
+
+
+def _trim(features, sample_energy_db=30.0):
+    """Drop the quiet lead-in and tail of an enrolled recording."""
+    loudness = features.sum(axis=1)
+    keep = np.flatnonzero(loudness > loudness.max() - sample_energy_db)
+    return features[keep[0]:keep[-1] + 1] if len(keep) else features
+
+
+class WakeWord:
+    """Template match of an enrolled wake word against the start of a phrase.
+
+    ``templates`` are recordings (PCM bytes, sample rate, sample width) of
+    the wake word said alone. A phrase is accepted when the subsequence DTW
+    distance between some template and the phrase's first ``window``
+    seconds is at most ``threshold``; by default that is 1.15 times the
+    largest distance between two templates (so enroll three or more).
+    For ``follow_up`` seconds after a phrase with the wake word, phrases
+    pass without it ("Tanu." ... "open chrome").
+    """
+
+    def __init__(self, templates, threshold=None, window=2.0, follow_up=5.0):
+        global np
+        np = load_numpy()
+        if np is None:
+            raise RuntimeError("the wake word check needs NumPy: pip install numpy")
+        self.window = window
+        self.follow_up = follow_up
+        self._awake_until = 0.0
+        self.templates = [_trim(band_energies(*t)) for t in templates]
+        self.templates = [t for t in self.templates if len(t) >= 5]
+        if not self.templates:
+            raise ValueError("no usable wake word recordings")
+        if threshold is None:
+            pairs = [self.distance(a, b) for i, a in enumerate(self.templates)
+                     for b in self.templates[i + 1:]]
+            threshold = 1.15 * max(pairs) if pairs else 1.0
+        self.threshold = threshold
+
+    @classmethod
+    def from_files(cls, paths, **kwargs):
+        from audio_pipeline import RecordedAudioSource
+        templates = []
+        for path in paths:
+            with RecordedAudioSource(path) as source:
+                data = bytes(source.stream.read(1 << 30))
+                templates.append((data, source.SAMPLE_RATE, source.SAMPLE_WIDTH))
+        return cls(templates, **kwargs)
+
+    @staticmethod
+    def distance(template, features):
+        """Subsequence DTW cost per template frame; steps advance the phrase by 0-2 frames."""
+        if not len(features):
+            return math.inf
+        cost = np.sqrt(((template[:, None, :] - features[None, :, :]) ** 2).mean(axis=2))
+        total = cost[0].copy()
+        for row in cost[1:]:
+            prev = total
+            best = prev.copy()
+            best[1:] = np.minimum(best[1:], prev[:-1])
+            best[2:] = np.minimum(best[2:], prev[:-2])
+            total = row + best
+        return float(total.min()) / len(template)
+
+    def score(self, segment):
+        data = segment.data[:int(self.window * segment.sample_rate) * segment.sample_width]
+        features = band_energies(data, segment.sample_rate, segment.sample_width)
+        return min(self.distance(t, features) for t in self.templates)
+
+    def heard(self, segment):
+        if segment.started is not None and segment.started <= self._awake_until:
+            return True
+        if self.score(segment) > self.threshold:
+            return False
+        if segment.started is not None:
+            seconds = len(segment.data) / (segment.sample_rate * segment.sample_width)
+            self._awake_until = segment.started + seconds + self.follow_up
+        return True
+
+
+def strip_wake_word(text, word='tanu'):
+    """Return text without a leading wake word, or None if it does not start with one."""
+    spellings = WAKE_SPELLINGS.get(word.lower(), (word.lower(),))
+    pattern = r'^\s*(?:hey\s+|ok(?:ay)?\s+)?(?:%s)\b[\s,.!]*' % '|'.join(re.escape(s) for s in spellings)
+    m = re.match(pattern, text, re.IGNORECASE)
+    return text[m.end():] if m else None
+
+
+def main(argv=None):
+    from audio_pipeline import ListenSettings, RecordedAudioSource, StreamingListener
+
+    parser = argparse.ArgumentParser(description="Show which phrases of a recording the VAD gate would drop")
+    parser.add_argument('audio_file', help="mono WAV (or 16 kHz/16-bit raw PCM) recording")
+    parser.add_argument('--margin-db', type=float, default=10.0)
+    parser.add_argument('--wake-samples', nargs='+', metavar='WAV', help="recordings of the wake word")
+    args = parser.parse_args(argv)
+
+    wake = WakeWord.from_files(args.wake_samples) if args.wake_samples else None
+    vad = VoiceActivityDetector(margin_db=args.margin_db, wake_word=wake)
+
+    def gate(segment):
+        reason = vad.classify(segment.data, segment.sample_rate, segment.sample_width)
+        if reason is None and wake is not None:
+            distance = wake.score(segment)
+            if distance > wake.threshold:
+                reason = f"wake_word ({distance:.2f} > {wake.threshold:.2f})"
+        seconds = len(segment.data) / (segment.sample_rate * segment.sample_width)
+        print(f"phrase of {seconds:5.2f}s: {'forward' if reason is None else 'drop, ' + reason}"
+              f"  (noise floor {vad.noise_floor:.1f} dBFS)")
+        return reason is None
+
+    with RecordedAudioSource(args.audio_file) as source:
+        pipeline = StreamingListener(source, ListenSettings(), lambda segment: '', workers=1, gate=gate).start()
+        for _ in pipeline.transcripts():
+            pass
+    stats = pipeline.stats()
+    print(f"{stats['segments']} phrases, {stats['gated']} dropped before recognition")
+
+
+if __name__ == '__main__':
+    main()